@@ -1,34 +1,44 @@
 # Fábrica de la aplicación Flask (Application Factory)
 
-import logging
-from flask import Flask, request, make_response, jsonify
-from .config import Config # Importar la configuración
-from .extensions import cors, init_supabase # Importar instancias/funciones de extensiones
+from flask import Flask, request, make_response, jsonify, Response
+from .config import load_config, validate_config # Importar la configuración
+from .extensions import cors, init_supabase, get_supabase_pool_stats, init_token_cache, init_token_revocations, init_dashboard_cache, init_patient_search_cache, init_availability_cache, init_event_broker, init_stream_slots, init_reference_data, init_fanout_executor, init_request_metrics, get_request_metrics # Importar instancias/funciones de extensiones
 from flask_cors import CORS
+from .utils.http import build_http_client, http2_available
+from .utils.json_provider import init_json_provider
+from .utils.compression import init_compression
+from .utils.tracing import init_request_tracing, record_upstream_call
+from .utils.log_config import configure_logging
+from .utils.decorators import internal_token_valid, internal_token_required
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     """Crea y configura una instancia de la aplicación Flask."""
+    if config_class is None:
+        config_class = load_config() # Lee el .env y el entorno ahora, no al importar
     app = Flask(__name__)
     app.config.from_object(config_class) # Cargar configuración desde el objeto Config
+    validate_config(app.config)
     
+    # Instrumentación por petición (se registra antes que la compresión para medirla también)
+    if app.config.get('METRICS_ENABLED'):
+        init_request_metrics()
+    init_request_tracing(app)
+
+    # JSON rápido (orjson si está disponible) y compresión de respuestas grandes
+    init_json_provider(app)
+    init_compression(app)
+
     # Configuración adicional para CORS
     app.config['CORS_HEADERS'] = 'Content-Type,Authorization'
 
-    # Configurar el logger
-    app.logger.setLevel(logging.INFO)
-    if not app.debug and not app.testing:
-        # Configurar handlers (ej. StreamHandler) solo si no están ya configurados
-        if not app.logger.handlers:
-            stream_handler = logging.StreamHandler()
-            stream_handler.setFormatter(logging.Formatter(
-                '%(asctime)s %(levelname)s %(name)s : %(message)s'
-            ))
-            app.logger.addHandler(stream_handler)
+    # Configurar el logger (nivel, formato texto/JSON y escritura en un hilo aparte)
+    configure_logging(app)
 
     app.logger.info("Flask App Logger Initialized")
 
     # Configurar CORS a nivel global
-    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    # ETag expuesto para que el frontend pueda revalidar con If-None-Match; Server-Timing para DevTools
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, expose_headers=["ETag", "Server-Timing"])
     # No usar la instancia previa de cors para evitar duplicación
     
     # Definir un manejador global para preflight OPTIONS
@@ -44,15 +54,76 @@ def create_app(config_class=Config):
         if request.method == "OPTIONS":
             return make_response()
         return jsonify({"status": "ok", "message": "API funcionando correctamente"})
+
+    # Uso del pool de conexiones hacia Supabase (por worker); requiere METRICS_TOKEN
+    @app.route("/api/v1/health/pool", methods=["GET"])
+    @internal_token_required
+    def pool_stats():
+        stats = get_supabase_pool_stats()
+        if stats is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, **stats})
+
+    # Métricas del worker en formato de texto de Prometheus
+    @app.route("/api/v1/metrics", methods=["GET"])
+    def metrics():
+        registry = get_request_metrics()
+        if registry is None:
+            return jsonify({"message": "Métricas deshabilitadas"}), 404
+        if not internal_token_valid():
+            return jsonify({"message": "No autorizado"}), 401
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
     
+    # Cliente HTTP con pool de conexiones ajustable, compartido por todo Supabase
+    if app.config.get('SUPABASE_HTTP2') and not http2_available():
+        app.logger.warning("SUPABASE_HTTP2 activo pero falta el paquete 'h2'; usando HTTP/1.1")
+        app.config['SUPABASE_HTTP2'] = False
+    tracing = app.config.get('REQUEST_TRACING_ENABLED') or app.config.get('METRICS_ENABLED')
+    http_client, http_transport = build_http_client(app.config, observer=record_upstream_call if tracing else None)
+
+    # Con SUPABASE_LAZY_INIT el cliente se crea en la primera petición que lo usa
+    # (/api/v1/health responde sin tocar Supabase)
+    lazy = app.config.get('SUPABASE_LAZY_INIT', True)
     try:
-        init_supabase(app.config['SUPABASE_URL'], app.config['SUPABASE_KEY'])
-        app.logger.info("Supabase client initialized successfully via Factory.")
+        init_supabase(app.config['SUPABASE_URL'], app.config['SUPABASE_KEY'], http_client=http_client, transport=http_transport, lazy=lazy)
+        app.logger.info("Supabase client %s via Factory.", "configured (lazy)" if lazy else "initialized successfully")
     except Exception as e:
         app.logger.error(f"Failed to initialize Supabase client: {e}")
         # Decidir si la app debe fallar o continuar sin Supabase
         raise e # Fallar si Supabase es esencial
 
+    # Cachés (tokens validados, resultados del dashboard, búsquedas de pacientes y disponibilidad)
+    if app.config.get('AUTH_CACHE_MAXSIZE', 0) > 0 and app.config.get('AUTH_CACHE_TTL', 0) > 0:
+        init_token_cache(app.config['AUTH_CACHE_MAXSIZE'], app.config['AUTH_CACHE_TTL'])
+    init_token_revocations(
+        app.config.get('AUTH_REVOCATION_BACKEND', 'memory'),
+        maxsize=max(app.config.get('AUTH_CACHE_MAXSIZE', 0), 1024),
+        redis_url=app.config.get('AUTH_REVOCATION_REDIS_URL'),
+    )
+    init_dashboard_cache(
+        app.config.get('DASHBOARD_CACHE_BACKEND', 'none'),
+        maxsize=app.config.get('DASHBOARD_CACHE_MAXSIZE', 256),
+        redis_url=app.config.get('DASHBOARD_CACHE_REDIS_URL'),
+    )
+    if app.config.get('PATIENT_SEARCH_CACHE_MAXSIZE', 0) > 0 and app.config.get('PATIENT_SEARCH_CACHE_TTL', 0) > 0:
+        init_patient_search_cache(app.config['PATIENT_SEARCH_CACHE_MAXSIZE'], app.config['PATIENT_SEARCH_CACHE_TTL'])
+    if app.config.get('AVAILABILITY_CACHE_MAXSIZE', 0) > 0 and app.config.get('AVAILABILITY_CACHE_TTL', 0) > 0:
+        init_availability_cache(app.config['AVAILABILITY_CACHE_MAXSIZE'], app.config['AVAILABILITY_CACHE_TTL'])
+
+    # Tablas de referencia (doctores) en memoria del worker
+    init_reference_data(app.config.get('REFERENCE_DATA_TTL', 300))
+
+    # Broker de eventos para los streams SSE
+    init_event_broker(
+        app.config.get('EVENTS_BACKEND', 'none'),
+        queue_size=app.config.get('EVENTS_QUEUE_SIZE', 100),
+        redis_url=app.config.get('EVENTS_REDIS_URL'),
+    )
+    init_stream_slots(app.config.get('EVENTS_MAX_STREAMS', 0))
+
+    # Pool de hilos para consultas independientes en paralelo
+    init_fanout_executor(app.config.get('FANOUT_MAX_WORKERS', 8))
+
     # Registrar Blueprints
     # Importar Blueprints aquí para evitar importaciones circulares
     from .auth import auth_bp
@@ -0,0 +1,161 @@
+# Disponibilidad de doctores: índice ordenado de citas por (doctor, día)
+#
+# Cada día de un doctor se guarda como una lista ordenada de horas de cita; la
+# comprobación de solapamiento es una búsqueda binaria (bisect), O(log n). El
+# índice vive en memoria del proceso con TTL corto y se invalida en cada escritura
+# de citas. El PUT con RPC descarta con él los choques evidentes sin una consulta
+# extra (la comprobación definitiva la hace update_appointment); create y el PUT
+# sin RPC releen el día (fresh), porque el trigger de inserción puede no estar
+# desplegado.
+#
+# Cada worker de gunicorn tiene su propia caché y solo invalida lo que escribe él:
+# en los demás workers, los huecos libres y el pre-chequeo pueden ir hasta
+# AVAILABILITY_CACHE_TTL segundos por detrás de la base de datos.
+
+from bisect import bisect_left
+from datetime import datetime, date, time, timedelta, timezone
+from app.extensions import get_supabase, get_availability_cache
+from app.dashboard.aggregation import parse_timestamp
+
+# Mismo criterio que la API al crear/editar: dos citas del doctor chocan si distan ≤ 30 minutos
+CONFLICT_WINDOW = timedelta(minutes=30)
+
+
+class DoctorDayIndex:
+    """Horas de cita ordenadas de un doctor en un día (más el margen de los días vecinos)."""
+
+    def __init__(self, bookings):
+        # bookings: [(datetime, appointment_id)]
+        self._times = []
+        self._ids = []
+        for start, appointment_id in sorted(bookings):
+            self._times.append(start)
+            self._ids.append(appointment_id)
+
+    def __len__(self):
+        return len(self._times)
+
+    def conflicts(self, start: datetime, exclude_id=None) -> list:
+        """Ids de las citas a ≤ CONFLICT_WINDOW de `start` (búsqueda binaria)."""
+        position = bisect_left(self._times, start - CONFLICT_WINDOW)
+        found = []
+        limit = start + CONFLICT_WINDOW
+        while position < len(self._times) and self._times[position] <= limit:
+            if self._ids[position] != exclude_id:
+                found.append(self._ids[position])
+            position += 1
+        return found
+
+    def is_free(self, start: datetime, exclude_id=None) -> bool:
+        return not self.conflicts(start, exclude_id)
+
+    def booked_between(self, start: datetime, end: datetime) -> list:
+        return self._times[bisect_left(self._times, start):bisect_left(self._times, end)]
+
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _load_day(doctor_id: int, day: date) -> DoctorDayIndex:
+    """Consulta las citas del doctor en el día (UTC) con el margen de conflicto a cada lado."""
+    day_start, day_end = _day_bounds(day)
+    response = get_supabase().table('appointments')\
+        .select('id, appointment_time')\
+        .eq('doctor_id', doctor_id)\
+        .gte('appointment_time', (day_start - CONFLICT_WINDOW).isoformat())\
+        .lte('appointment_time', (day_end + CONFLICT_WINDOW).isoformat())\
+        .execute()
+    bookings = []
+    for row in response.data or []:
+        start = parse_timestamp(row.get('appointment_time'))
+        if start is not None:
+            bookings.append((start.astimezone(timezone.utc), row.get('id')))
+    return DoctorDayIndex(bookings)
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Fecha con zona UTC; sin zona se interpreta como UTC (igual que Postgres en Supabase)."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def get_doctor_day(doctor_id: int, day: date, fresh: bool = False) -> DoctorDayIndex:
+    """Índice del día del doctor, desde la caché del proceso o cargado de Supabase (siempre con fresh)."""
+    cache = get_availability_cache()
+    key = (doctor_id, day)
+    if cache is not None and not fresh:
+        index = cache.get(key)
+        if index is not None:
+            return index
+    index = _load_day(doctor_id, day)
+    if cache is not None:
+        cache.set(key, index)
+    return index
+
+
+def find_conflicts(doctor_id: int, start: datetime, exclude_id=None, load: bool = True, fresh: bool = False):
+    """
+    Ids de las citas del doctor a ≤ CONFLICT_WINDOW de `start`, según el índice del día.
+    Un choque encontrado en la caché se confirma releyendo el día antes de devolverlo
+    (la caché puede conservar una cita ya movida o borrada en otro worker).
+    Con load=False, si el día no está en caché devuelve None sin consultar Supabase.
+    Con fresh=True el día siempre se relee.
+    """
+    start = as_utc(start)
+    day = start.date()
+    cache = get_availability_cache()
+    index = cache.get((doctor_id, day)) if cache is not None and not fresh else None
+    if index is None:
+        if not load and not fresh:
+            return None
+        return get_doctor_day(doctor_id, day, fresh=True).conflicts(start, exclude_id)
+    found = index.conflicts(start, exclude_id)
+    if found:
+        found = get_doctor_day(doctor_id, day, fresh=True).conflicts(start, exclude_id)
+    return found
+
+
+def free_slots(doctor_id: int, day: date, slot_minutes: int, day_start: time, day_end: time) -> dict:
+    """Huecos libres del doctor en el día (UTC) entre day_start y day_end, cada slot_minutes."""
+    index = get_doctor_day(doctor_id, day)
+    start = datetime.combine(day, day_start, tzinfo=timezone.utc)
+    end = datetime.combine(day, day_end, tzinfo=timezone.utc)
+    step = timedelta(minutes=slot_minutes)
+    slots = []
+    slot = start
+    while slot < end:
+        if index.is_free(slot):
+            slots.append(slot.isoformat())
+        slot += step
+    return {
+        "doctor_id": doctor_id,
+        "date": day.isoformat(),
+        "slot_minutes": slot_minutes,
+        "conflict_window_minutes": int(CONFLICT_WINDOW.total_seconds() // 60),
+        "booked": [booked.isoformat() for booked in index.booked_between(start, end)],
+        "free_slots": slots,
+    }
+
+
+def invalidate_availability(appointment_times=(), doctor_ids=None):
+    """
+    Descarta los días afectados por una escritura de citas. Se invalidan también los días
+    vecinos cuando la cita cae dentro del margen de conflicto. Con doctor_ids=None se
+    invalidan todos los doctores de esos días (p. ej. si el doctor anterior es desconocido).
+    """
+    cache = get_availability_cache()
+    if cache is None:
+        return
+    days = set()
+    for value in appointment_times:
+        moment = parse_timestamp(value) if isinstance(value, str) else value
+        if moment is None:
+            continue
+        moment = moment.astimezone(timezone.utc)
+        for shifted in (moment - CONFLICT_WINDOW, moment, moment + CONFLICT_WINDOW):
+            days.add(shifted.date())
+    if not days:
+        return
+    doctors = None if doctor_ids is None else {int(d) for d in doctor_ids if d not in (None, '')}
+    cache.delete_matching(lambda key: key[1] in days and (doctors is None or key[0] in doctors))
@@ -0,0 +1,110 @@
+# Sincronización incremental de citas (GET /appointments/changes?since=)
+#
+# El cursor guarda dos posiciones keyset: (updated_at, id) en appointments y
+# (deleted_at, appointment_id) en appointment_tombstones. Solo se devuelven filas
+# anteriores a "ahora - APPOINTMENT_CHANGES_SETTLE_SECONDS": una transacción que
+# confirma con algo de retraso no queda detrás de un cursor que ya avanzó.
+
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from app.extensions import get_supabase
+from app.utils.helpers import calculate_durations, is_missing_column_error, is_missing_relation_error
+from app.utils.pagination import encode_cursor, decode_cursor, apply_keyset
+from app.dashboard.aggregation import parse_timestamp
+from .recurrence import mark_recurring_patients
+
+TOMBSTONES_TABLE = 'appointment_tombstones'
+
+# Mismos campos que el listado, más los de sincronización
+CHANGE_FIELDS = '''
+    id, appointment_time, status, notes, created_at,
+    arrival_time, consultation_start_time, consultation_end_time,
+    version, updated_at,
+    patient:patients (id, name),
+    doctor:doctors (id, name)
+'''
+
+_changes_available = True
+
+
+class ChangesUnavailable(Exception):
+    """La migración de sincronización (updated_at / tombstones) no está aplicada."""
+
+
+def changes_available() -> bool:
+    return _changes_available
+
+
+def _horizon() -> datetime:
+    settle = current_app.config.get('APPOINTMENT_CHANGES_SETTLE_SECONDS', 2)
+    return datetime.now(timezone.utc) - timedelta(seconds=settle)
+
+
+def initial_cursor() -> str:
+    """Cursor desde "ahora": el cliente lo pide antes de cargar la lista completa."""
+    start = _horizon().isoformat()
+    return encode_cursor({"u": [start, 0], "d": [start, 0]})
+
+
+def parse_changes_cursor(cursor: str) -> dict:
+    """Valida un cursor de cambios. Lanza ValueError si no es válido."""
+    values = decode_cursor(cursor, require_id=False)
+    positions = {}
+    for key in ('u', 'd'):
+        position = values.get(key)
+        if (not isinstance(position, list) or len(position) != 2
+                or not isinstance(position[1], int) or parse_timestamp(position[0]) is None):
+            raise ValueError("Cursor inválido")
+        positions[key] = position
+    return positions
+
+
+def cursor_expired(positions: dict) -> bool:
+    """Las marcas de borrado se purgan: un cursor más viejo que la retención exige recarga completa."""
+    retention = current_app.config.get('APPOINTMENT_CHANGES_RETENTION_DAYS', 30)
+    oldest = min(parse_timestamp(positions['u'][0]), parse_timestamp(positions['d'][0]))
+    return oldest < datetime.now(timezone.utc) - timedelta(days=retention)
+
+
+def _fetch_after(table: str, fields: str, ts_column: str, id_column: str, position: list, horizon: str, limit: int):
+    query = get_supabase().table(table).select(fields).lt(ts_column, horizon)
+    page = {"limit": limit, "cursor": {ts_column: position[0], "id": position[1]}}
+    rows = apply_keyset(query, ts_column, False, page, id_column=id_column).execute().data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1]
+        return rows, [last[ts_column], last[id_column]], True
+    # Todo lo anterior al horizonte ya se entregó
+    return rows, [horizon, 0], False
+
+
+def fetch_changes(positions: dict, limit: int) -> dict:
+    """
+    Citas modificadas y borradas desde el cursor.
+    Devuelve {changes, deleted, cursor, has_more}. Lanza ChangesUnavailable sin la migración.
+    """
+    global _changes_available
+    if not _changes_available:
+        raise ChangesUnavailable()
+    horizon = _horizon().isoformat()
+    try:
+        changed, next_u, more_u = _fetch_after(
+            'appointments', CHANGE_FIELDS, 'updated_at', 'id', positions['u'], horizon, limit)
+        tombstones, next_d, more_d = _fetch_after(
+            TOMBSTONES_TABLE, 'appointment_id, deleted_at', 'deleted_at', 'appointment_id', positions['d'], horizon, limit)
+    except Exception as e:
+        if is_missing_column_error(e) or is_missing_relation_error(e):
+            _changes_available = False
+            current_app.logger.warning("Sincronización incremental no disponible (falta la migración de updated_at/tombstones)")
+            raise ChangesUnavailable()
+        raise
+
+    changed = [calculate_durations(row) for row in changed]
+    mark_recurring_patients(changed)
+    return {
+        "changes": changed,
+        "deleted": [row['appointment_id'] for row in tombstones],
+        "cursor": encode_cursor({"u": next_u, "d": next_d}),
+        "has_more": more_u or more_d,
+    }
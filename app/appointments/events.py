@@ -0,0 +1,48 @@
+# Eventos de cambios en citas para el stream SSE (/appointments/stream)
+#
+# Los handlers de escritura publican un evento pequeño (id, estado, horas); los
+# clientes conectados actualizan su lista en lugar de recargar el día completo.
+
+import itertools
+from datetime import datetime, timezone
+from flask import current_app
+from app.extensions import get_event_broker
+
+CHANNEL = 'appointments'
+
+# Campos de la cita que viajan en el evento
+EVENT_FIELDS = (
+    'appointment_time', 'status', 'arrival_time', 'consultation_start_time',
+    'consultation_end_time', 'version',
+)
+
+_sequence = itertools.count(1)
+
+
+def publish_appointment_change(action: str, appointment_id: int, appointment: dict = None):
+    """
+    Publica 'created', 'updated' o 'deleted' para la cita. Un fallo del broker no
+    debe afectar a la escritura ya hecha: solo se registra.
+    """
+    broker = get_event_broker()
+    if broker is None:
+        return
+    event = {
+        "type": action,
+        "id": appointment_id,
+        "seq": next(_sequence),
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+    if appointment:
+        for field in EVENT_FIELDS:
+            if field in appointment:
+                event[field] = appointment[field]
+        # La fila insertada trae doctor_id; la leída con relaciones trae doctor {id, name}
+        if 'doctor' in appointment:
+            event["doctor_id"] = (appointment.get('doctor') or {}).get('id')
+        elif 'doctor_id' in appointment:
+            event["doctor_id"] = appointment.get('doctor_id')
+    try:
+        broker.publish(CHANNEL, event)
+    except Exception as e:
+        current_app.logger.warning(f"No se pudo publicar el evento de la cita {appointment_id}: {e}")
@@ -0,0 +1,76 @@
+# Detección de pacientes recurrentes (más de una cita) en lote
+
+from collections import Counter
+from flask import current_app, g
+from app.extensions import get_supabase
+from app.utils.helpers import is_missing_rpc_error
+
+# Tamaño de página al contar sin RPC (PostgREST limita las filas por respuesta)
+FALLBACK_PAGE_SIZE = 1000
+
+_rpc_available = True
+
+
+def _count_with_rpc(patient_ids):
+    response = get_supabase().rpc('count_appointments_by_patient', {"patient_ids": patient_ids}).execute()
+    return {row['patient_id']: row['appointment_count'] for row in (response.data or [])}
+
+
+def _count_with_select(patient_ids):
+    """Alternativa sin RPC: trae solo patient_id de las citas de esos pacientes y cuenta en Python."""
+    counts = Counter()
+    offset = 0
+    while True:
+        response = get_supabase().table('appointments')\
+            .select('patient_id')\
+            .in_('patient_id', patient_ids)\
+            .order('id')\
+            .range(offset, offset + FALLBACK_PAGE_SIZE - 1)\
+            .execute()
+        rows = response.data or []
+        counts.update(row['patient_id'] for row in rows)
+        if len(rows) < FALLBACK_PAGE_SIZE:
+            return counts
+        offset += FALLBACK_PAGE_SIZE
+
+
+def get_patient_appointment_counts(patient_ids) -> dict:
+    """
+    Devuelve {patient_id: número total de citas} con una sola consulta.
+    Los conteos se memorizan durante la petición para no repetir pacientes.
+    """
+    global _rpc_available
+    memo = g.setdefault('patient_appointment_counts', {})
+    pending = sorted({pid for pid in patient_ids if pid is not None and pid not in memo})
+    if not pending:
+        return memo
+
+    counts = None
+    if _rpc_available:
+        try:
+            counts = _count_with_rpc(pending)
+        except Exception as e:
+            if is_missing_rpc_error(e):
+                _rpc_available = False
+                current_app.logger.warning("RPC count_appointments_by_patient no disponible, usando consulta alternativa")
+            else:
+                current_app.logger.error(f"Error en RPC count_appointments_by_patient: {e}")
+    if counts is None:
+        counts = _count_with_select(pending)
+
+    for pid in pending:
+        memo[pid] = counts.get(pid, 0)
+    return memo
+
+
+def mark_recurring_patients(appointments):
+    """Añade 'is_recurring_patient' a cada cita con paciente, usando un único conteo en lote."""
+    patient_ids = [appt['patient']['id'] for appt in appointments if appt.get('patient')]
+    if not patient_ids:
+        return appointments
+    counts = get_patient_appointment_counts(patient_ids)
+    for appt in appointments:
+        if appt.get('patient'):
+            # Si tiene más de 1 cita, es recurrente
+            appt['is_recurring_patient'] = counts.get(appt['patient']['id'], 0) > 1
+    return appointments
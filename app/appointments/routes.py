@@ -1,20 +1,125 @@
 # Rutas para Citas
 
-from flask import request, jsonify, current_app
+import json
+from flask import request, jsonify, current_app, Response, stream_with_context
+from werkzeug.local import LocalProxy
 from datetime import datetime, timezone, timedelta # Asegúrate de importar timedelta
 from . import appointments_bp
 from app.extensions import get_supabase
-from app.utils.decorators import token_required
+from app.utils.decorators import token_required, stream_token_required, conditional_get, CACHE_REVALIDATE
 from app.utils.helpers import calculate_durations # Importar helper
+from app.utils.log_config import summarize_response
+from app.utils.pagination import get_page_params, apply_keyset, build_page, cursor_offset, apply_offset, build_offset_page
+from .recurrence import mark_recurring_patients
+from .transitions import (update_appointment_atomic, AppointmentUpdateError, doctor_unavailable_body, is_doctor_unavailable_error,
+                          versioning_available, version_select, version_required_body, version_conflict_body)
+from .sorting import PATIENT_SORT_VIEW, PATIENT_SORT_COLUMN, patient_sort_view_available
+from app.dashboard.cache import invalidate_for_appointment_times
+from .availability import invalidate_availability, find_conflicts
+from .events import CHANNEL as EVENTS_CHANNEL, publish_appointment_change
+from .changes import initial_cursor, parse_changes_cursor, cursor_expired, fetch_changes, ChangesUnavailable
+from app.extensions import get_event_broker, get_stream_slots
+from app.utils.jwt_auth import token_cache_key
+from app.utils.stream_tickets import issue_stream_ticket
+
+# Proxy: el cliente se crea en el primer uso, no al importar el blueprint
+supabase = LocalProxy(get_supabase)
+
+@appointments_bp.route("/stream/ticket", methods=["POST"])
+@token_required
+def create_stream_ticket(current_user):
+    """
+    Ticket de un solo uso para abrir /appointments/stream ('?ticket=').
+    Así el JWT no viaja en la URL (logs de acceso, proxies, historial).
+    """
+    token = request.headers['Authorization'].split(" ")[1]
+    ttl = current_app.config.get('EVENTS_TICKET_TTL', 30)
+    ticket = issue_stream_ticket(current_user, token_cache_key(token), current_app.config['SECRET_KEY'], ttl)
+    return jsonify({"ticket": ticket, "expires_in": ttl}), 201
+
+@appointments_bp.route("/stream", methods=["GET"])
+@stream_token_required
+def stream_appointment_changes(current_user):
+    """
+    Stream SSE de cambios en citas (created/updated/deleted).
+    EventSource no envía headers: se abre con '?ticket=' (POST /appointments/stream/ticket).
+    """
+    broker = get_event_broker()
+    if broker is None:
+        return jsonify({"message": "Los eventos en tiempo real están deshabilitados"}), 503
+    slots = get_stream_slots()
+    if slots is not None and not slots.acquire():
+        current_app.logger.warning("Cupo de streams lleno (%s abiertos en el worker)", slots.limit)
+        response = jsonify({"message": "Demasiados streams abiertos, reintente más tarde"})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    current_app.logger.info("Stream /appointments/stream abierto por user ID: %s", current_user.id)
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT', 15)
+    subscription = broker.subscribe(EVENTS_CHANNEL)
+
+    def generate():
+        try:
+            # Reintento del navegador tras un corte (ms) y confirmación de conexión
+            yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                if subscription.overflowed:
+                    # El cliente no consumió a tiempo y se perdieron eventos: debe recargar
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: appointment\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    if slots is not None:
+        # Al cerrar la respuesta, aunque el generador no llegue a arrancar
+        response.call_on_close(slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Evita el buffering de nginx
+    return response
+
+@appointments_bp.route("/changes", methods=["GET"])
+@token_required
+def get_appointment_changes(current_user):
+    """
+    Citas modificadas o borradas desde el cursor 'since'.
+    Sin 'since' devuelve solo el cursor actual (pedirlo antes de cargar la lista).
+    """
+    current_app.logger.debug("Solicitud GET /appointments/changes por user ID: %s", current_user.id)
+    since = request.args.get('since')
+    limit = request.args.get('limit', current_app.config.get('PAGINATION_MAX_LIMIT', 200), type=int)
+    if limit is None or limit < 1:
+        return jsonify({"message": "'limit' debe ser un número entero mayor que 0"}), 400
+    limit = min(limit, current_app.config.get('PAGINATION_MAX_LIMIT', 200))
+
+    if not since:
+        return jsonify({"changes": [], "deleted": [], "cursor": initial_cursor(), "has_more": False}), 200
+    try:
+        positions = parse_changes_cursor(since)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if cursor_expired(positions):
+        # Pueden faltar borrados ya purgados: el cliente debe recargar la lista completa
+        return jsonify({"reset": True, "changes": [], "deleted": [], "cursor": initial_cursor(), "has_more": False}), 200
 
-supabase = get_supabase()
+    try:
+        return jsonify(fetch_changes(positions, limit)), 200
+    except ChangesUnavailable:
+        return jsonify({"message": "La sincronización incremental no está disponible"}), 501
+    except Exception as e:
+        current_app.logger.exception("Error obteniendo los cambios de citas")
+        return jsonify({"message": "Error obteniendo los cambios de citas"}), 500
 
 # CORRECCIÓN: Ruta base del blueprint debe ser "" si el prefijo ya tiene el nombre
 @appointments_bp.route("", methods=["POST"])
 @token_required
 def create_appointment(current_user):
     """Endpoint para crear una nueva cita."""
-    current_app.logger.info(f"Solicitud POST /appointments por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud POST /appointments por user ID: %s", current_user.id)
     data = request.get_json()
 
     required_fields = ["patient_id", "appointment_time"]
@@ -28,29 +133,20 @@ def create_appointment(current_user):
         except ValueError:
             return jsonify({"message": "Formato inválido para appointment_time. Usar formato ISO 8601 (ej: geliştirmeler-MM-DDTHH:mm:ssZ)"}), 400
 
-        # Verificar si el doctor ya tiene una cita en la misma hora
+        # Verificar si el doctor ya tiene una cita en la misma hora (±30 minutos). El día se
+        # relee de Supabase (fresh): la caché del índice de este worker puede no tener una
+        # cita creada en otro, y sin el trigger de inserción (migración opcional) nada más
+        # lo impediría. Con el trigger, un choque entre esta lectura y el insert da 409 igual
         doctor_id = data.get("doctor_id")
         if doctor_id is not None and doctor_id != "":
-            # Definir ventana de tiempo para verificar (±30 minutos)
-            time_window = timedelta(minutes=30)
-            start_time = (appointment_dt - time_window).isoformat()
-            end_time = (appointment_dt + time_window).isoformat()
-            
-            # Buscar citas del doctor en la ventana de tiempo
-            existing_appointments = supabase.table('appointments')\
-                .select('id, appointment_time')\
-                .eq('doctor_id', doctor_id)\
-                .gte('appointment_time', start_time)\
-                .lte('appointment_time', end_time)\
-                .execute()
-                
-            if hasattr(existing_appointments, 'data') and existing_appointments.data:
-                current_app.logger.info(f"Doctor ID {doctor_id} ya tiene cita(s) en horario similar: {existing_appointments.data}")
-                return jsonify({
-                    "message": "El doctor seleccionado ya tiene una cita programada en este horario.",
-                    "error_type": "doctor_unavailable",
-                    "conflict_time": data["appointment_time"]
-                }), 409  # Conflict status code
+            try:
+                doctor_id = int(doctor_id)
+            except (ValueError, TypeError):
+                return jsonify({"message": "doctor_id debe ser un número entero o null"}), 400
+            conflicts = find_conflicts(doctor_id, appointment_dt, fresh=True)
+            if conflicts:
+                current_app.logger.info("Doctor ID %s ya tiene cita(s) en horario similar: %s", doctor_id, conflicts)
+                return jsonify(doctor_unavailable_body(data["appointment_time"])), 409  # Conflict status code
 
         appointment_data = {
             "patient_id": data.get("patient_id"),
@@ -64,11 +160,21 @@ def create_appointment(current_user):
         appointment_data_filtered = {k: v for k, v in appointment_data.items() if k == "doctor_id" or v is not None}
 
         # Ejecutar insert SIN encadenar .select()
-        response = supabase.table('appointments').insert(appointment_data_filtered).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (create appointment): {response}")
+        try:
+            response = supabase.table('appointments').insert(appointment_data_filtered).execute()
+        except Exception as e:
+            if is_doctor_unavailable_error(e):
+                current_app.logger.info("Doctor ID %s ya tiene cita en horario similar (trigger)", doctor_id)
+                invalidate_availability([data["appointment_time"]], [doctor_id])
+                return jsonify(doctor_unavailable_body(data["appointment_time"])), 409
+            raise
+        current_app.logger.debug("Respuesta de Supabase (create appointment): %s", summarize_response(response))
 
         if response.data:
-            current_app.logger.info(f"Cita creada con ID: {response.data[0]['id']}")
+            current_app.logger.info("Cita creada con ID: %s", response.data[0]['id'])
+            invalidate_for_appointment_times(data["appointment_time"])
+            invalidate_availability([data["appointment_time"]], [data.get("doctor_id")])
+            publish_appointment_change('created', response.data[0]['id'], response.data[0])
             return jsonify(response.data[0]), 201
         else:
             error_message = "Error al crear la cita"
@@ -89,9 +195,10 @@ def create_appointment(current_user):
 # CORRECCIÓN: Ruta base del blueprint debe ser "" si el prefijo ya tiene el nombre
 @appointments_bp.route("", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_appointments(current_user):
     """Endpoint para obtener la lista de citas, con filtros opcionales."""
-    current_app.logger.info(f"Solicitud GET /appointments por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud GET /appointments por user ID: %s", current_user.id)
     try:
         # Determinar campo y dirección de ordenamiento
         sort_by = request.args.get('sort_by', 'appointment_time')  # Por defecto ordenar por fecha
@@ -106,25 +213,34 @@ def get_appointments(current_user):
         if sort_dir.lower() not in ['asc', 'desc']:
             sort_dir = 'asc'  # Valor seguro por defecto
             
-        # Para ordenar por nombre de paciente, vamos a realizar un ordenamiento manual
-        # después de obtener los datos, así que para ese caso no incluimos ordenamiento en la consulta
-        if sort_by == 'patient.name':
-            query = supabase.table('appointments').select('''
+        # Paginación opcional por cursor (limit/after); sin ella se devuelve la lista completa
+        page, error_response = get_page_params()
+        if error_response:
+            return error_response
+        # El total solo se calcula en la primera página (con cursor contaría las filas restantes)
+        count_method = page["count"] if page and not page["cursor"] else None
+
+        # Para ordenar por nombre de paciente se consulta la vista que expone la clave de orden
+        use_sort_view = sort_by == 'patient.name' and patient_sort_view_available()
+        # version: el cliente la devuelve al editar (control optimista del PUT)
+        version_field = version_select()
+        if use_sort_view:
+            query = supabase.table(PATIENT_SORT_VIEW).select(f'''
                 id, appointment_time, status, notes, created_at,
-                arrival_time, consultation_start_time, consultation_end_time,
+                arrival_time, consultation_start_time, consultation_end_time, {version_field}
+                {PATIENT_SORT_COLUMN},
                 patient:patients (id, name),
                 doctor:doctors (id, name)
-            ''')
+            ''', count=count_method)
         else:
-            # Para otros campos, aplicamos el ordenamiento directamente en la consulta
-            query = supabase.table('appointments').select('''
+            query = supabase.table('appointments').select(f'''
                 id, appointment_time, status, notes, created_at,
-                arrival_time, consultation_start_time, consultation_end_time,
+                arrival_time, consultation_start_time, consultation_end_time, {version_field}
                 patient:patients (id, name),
                 doctor:doctors (id, name)
-            ''').order(sort_by, desc=(sort_dir.lower() == 'desc'))
-            
-        current_app.logger.info(f"Ordenando por {sort_by} ({sort_dir})")
+            ''', count=count_method)
+
+        current_app.logger.debug("Ordenando por %s (%s)", sort_by, sort_dir)
 
         # Aplicar filtros desde los query parameters
         filter_date = request.args.get('date')
@@ -148,7 +264,7 @@ def get_appointments(current_user):
                 start_dt_iso = start_dt.isoformat()
                 end_dt_iso = end_dt.isoformat()
 
-                current_app.logger.info(f"Filtrando citas por fecha UTC: >= {start_dt_iso} y < {end_dt_iso}")
+                current_app.logger.debug("Filtrando citas por fecha UTC: >= %s y < %s", start_dt_iso, end_dt_iso)
                 # Aplicar filtros gte (>=) y lt (<)
                 query = query.gte('appointment_time', start_dt_iso)
                 query = query.lt('appointment_time', end_dt_iso)
@@ -161,13 +277,13 @@ def get_appointments(current_user):
         # Filtro por estado
         if filter_status:
             query = query.eq('status', filter_status)
-            current_app.logger.info(f"Filtrando citas por estado: {filter_status}")
+            current_app.logger.debug("Filtrando citas por estado: %s", filter_status)
         
         # Filtro para excluir estados
         if filter_exclude_statuses:
             for status_to_exclude in filter_exclude_statuses:
                 query = query.neq('status', status_to_exclude)
-            current_app.logger.info(f"Excluyendo citas con estados: {filter_exclude_statuses}")
+            current_app.logger.debug("Excluyendo citas con estados: %s", filter_exclude_statuses)
         
         # Filtro para incluir solo ciertos estados
         if filter_include_statuses:
@@ -178,14 +294,14 @@ def get_appointments(current_user):
             
             if status_conditions:
                 query = query.or_(",".join(status_conditions))
-                current_app.logger.info(f"Incluyendo solo citas con estados: {filter_include_statuses}")
+                current_app.logger.debug("Incluyendo solo citas con estados: %s", filter_include_statuses)
         
         # Filtro por doctor_id
         if filter_doctor_id:
             try:
                 doctor_id = int(filter_doctor_id)
                 query = query.eq('doctor_id', doctor_id)
-                current_app.logger.info(f"Filtrando citas por doctor_id: {doctor_id}")
+                current_app.logger.debug("Filtrando citas por doctor_id: %s", doctor_id)
             except ValueError:
                 return jsonify({"message": "doctor_id debe ser un número entero"}), 400
         
@@ -194,53 +310,53 @@ def get_appointments(current_user):
             # Usamos Postgres ilike para búsqueda case-insensitive
             # Necesitamos usar la sintaxis especial para filtrar en relaciones anidadas
             query = query.filter('patient.name', 'ilike', f'%{filter_patient_name}%')
-            current_app.logger.info(f"Filtrando citas por nombre de paciente: {filter_patient_name}")
+            current_app.logger.debug("Filtrando citas por nombre de paciente: %s", filter_patient_name)
+
+        # Ordenamiento en la consulta (keyset si se pidió paginación)
+        sort_desc = sort_dir.lower() == 'desc'
+        sort_column = PATIENT_SORT_COLUMN if use_sort_view else sort_by
+        offset_paging = sort_by == 'patient.name' and not use_sort_view
+        if offset_paging:
+            # Sin la vista: orden por la relación a uno (PostgREST 11+). No hay columna para
+            # un keyset, así que se pagina por posición (una cita creada entre páginas puede
+            # repetirse o saltarse; la lista se recarga con los eventos de cambios)
+            query = query.order('patient(name)', desc=sort_desc).order('id', desc=sort_desc)
+            if page:
+                try:
+                    cursor_offset(page)
+                except ValueError as e:
+                    return jsonify({"message": str(e)}), 400
+                query = apply_offset(query, page)
+        elif page:
+            query = apply_keyset(query, sort_column, sort_desc, page)
+        else:
+            query = query.order(sort_column, desc=sort_desc).order('id', desc=sort_desc)
 
         response = query.execute()
-        current_app.logger.debug(f"Respuesta de Supabase (get appointments): {response}")
+        current_app.logger.debug("Respuesta de Supabase (get appointments): %s", summarize_response(response))
+
+        rows = response.data or []
+        page_result = None
+        if page:
+            if offset_paging:
+                page_result = build_offset_page(rows, page, total=response.count)
+            else:
+                page_result = build_page(rows, sort_column, page, total=response.count)
+            rows = page_result["items"]
+        if use_sort_view:
+            for row in rows:
+                row.pop(PATIENT_SORT_COLUMN, None)
 
         appointments_with_times = []
-        if response.data:
-            # Procesar cada cita y verificar si el paciente es recurrente
-            for appt in response.data:
-                appt_with_times = calculate_durations(appt)
-                
-                # Verificar si el paciente es recurrente
-                if 'patient' in appt and appt['patient']:
-                    patient_id = appt['patient']['id']
-                    appointments_count = supabase.table('appointments')\
-                        .select('id', count='exact')\
-                        .eq('patient_id', patient_id)\
-                        .execute()
-                    
-                    # Si tiene más de 1 cita, es recurrente
-                    if appointments_count.count > 1:
-                        appt_with_times['is_recurring_patient'] = True
-                    else:
-                        appt_with_times['is_recurring_patient'] = False
-                
-                appointments_with_times.append(appt_with_times)
-
-            # Ordenar manualmente por nombre de paciente si es necesario
-            if sort_by == 'patient.name':
-                try:
-                    # Ordenar por nombre de paciente, manejando casos donde patient o name sean None
-                    def get_patient_name(appt):
-                        if appt.get('patient') and appt['patient'].get('name'):
-                            return appt['patient']['name'].lower()  # Convertir a minúsculas para ordenar de forma insensible a mayúsculas
-                        return ""  # Si no hay paciente o nombre, usar cadena vacía
-                    
-                    # Ordenar la lista según la dirección solicitada
-                    appointments_with_times = sorted(
-                        appointments_with_times, 
-                        key=get_patient_name,
-                        reverse=(sort_dir.lower() == 'desc')
-                    )
-                    current_app.logger.debug("Ordenamiento manual aplicado por nombre de paciente")
-                except Exception as sort_error:
-                    current_app.logger.error(f"Error al ordenar por nombre de paciente: {sort_error}")
-                    # Continuamos sin ordenar si hay un error
+        if rows:
+            appointments_with_times = [calculate_durations(appt) for appt in rows]
+            # Verificar en lote qué pacientes son recurrentes (una sola consulta para toda la página)
+            mark_recurring_patients(appointments_with_times)
 
+
+        if page_result is not None:
+            page_result["items"] = appointments_with_times
+            return jsonify(page_result), 200
         return jsonify(appointments_with_times), 200
 
     except Exception as e:
@@ -250,44 +366,28 @@ def get_appointments(current_user):
 
 @appointments_bp.route("/<int:appointment_id>", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_appointment_by_id(current_user, appointment_id):
     """Endpoint para obtener una cita por su ID, incluyendo tiempos calculados."""
-    current_app.logger.info(f"Solicitud GET /appointments/{appointment_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud GET /appointments/%s por user ID: %s", appointment_id, current_user.id)
     try:
-        response = supabase.table('appointments').select('''
+        response = supabase.table('appointments').select(f'''
             id, appointment_time, status, notes, created_at,
-            arrival_time, consultation_start_time, consultation_end_time,
+            arrival_time, consultation_start_time, consultation_end_time, {version_select()}
             patient:patients (id, name),
             doctor:doctors (id, name)
         ''').eq('id', appointment_id).maybe_single().execute()
-        current_app.logger.debug(f"Respuesta de Supabase (get appointment by id): {response}")
+        current_app.logger.debug("Respuesta de Supabase (get appointment by id): %s", summarize_response(response))
 
-        if response.data:
+        # maybe_single() devuelve None cuando no hay filas
+        if response and response.data:
             appointment_with_times = calculate_durations(response.data)
             
             # Verificar si el paciente es recurrente (tiene más de una cita)
-            if 'patient' in response.data and response.data['patient']:
-                patient_id = response.data['patient']['id']
-                appointments_count = supabase.table('appointments')\
-                    .select('id', count='exact')\
-                    .eq('patient_id', patient_id)\
-                    .execute()
-                
-                current_app.logger.debug(f"Conteo de citas para paciente {patient_id}: {appointments_count.count}")
-                
-                # Si tiene más de 1 cita, es recurrente
-                if appointments_count.count > 1:
-                    # Agregar indicador de paciente recurrente
-                    appointment_with_times['is_recurring_patient'] = True
-                    # Si no hay notas, inicializar como string vacío
-                    if not appointment_with_times.get('notes'):
-                        appointment_with_times['notes'] = ''
-                    # # Agregar nota solo si no existe ya
-                    # if 'Paciente recurrente' not in str(appointment_with_times.get('notes', '')):
-                    #     prefix = appointment_with_times['notes'] + '\n\n' if appointment_with_times.get('notes') else ''
-                    #     appointment_with_times['notes'] = prefix + 'Paciente recurrente - Ha visitado la clínica anteriormente.'
-                else:
-                    appointment_with_times['is_recurring_patient'] = False
+            mark_recurring_patients([appointment_with_times])
+            if appointment_with_times.get('is_recurring_patient') and not appointment_with_times.get('notes'):
+                # Si no hay notas, inicializar como string vacío
+                appointment_with_times['notes'] = ''
             
             return jsonify(appointment_with_times), 200
         else:
@@ -302,19 +402,12 @@ def get_appointment_by_id(current_user, appointment_id):
 @token_required
 def update_appointment(current_user, appointment_id):
     """Endpoint para actualizar una cita (hora, doctor, notas, estado y timestamps)."""
-    current_app.logger.info(f"Solicitud PUT /appointments/{appointment_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud PUT /appointments/%s por user ID: %s", appointment_id, current_user.id)
     data = request.get_json()
     if not data:
         return jsonify({"message": "Datos requeridos en el body"}), 400
 
     try:
-        # Obtener estado actual para validación
-        current_appointment_response = supabase.table('appointments').select('status, arrival_time, consultation_start_time, consultation_end_time').eq('id', appointment_id).maybe_single().execute()
-        if not current_appointment_response.data:
-             return jsonify({"message": "Cita no encontrada"}), 404
-        current_appointment = current_appointment_response.data
-        current_status = current_appointment.get('status')
-
         # Preparar datos generales para actualizar (excluyendo status por ahora)
         update_data = {}
         allowed_fields_to_update_anytime = ["doctor_id", "appointment_time", "notes"]
@@ -335,46 +428,71 @@ def update_appointment(current_user, appointment_id):
                 else: # Para 'notes'
                     update_data[field] = data[field]
 
+        new_status = data.get("status")
+        expected_version = data.get("version")
+        # bool es subclase de int: true/false no son versiones
+        if expected_version is not None and (isinstance(expected_version, bool) or not isinstance(expected_version, int)):
+            return jsonify({"message": "version debe ser un número entero"}), 400
+        if not update_data and not new_status:
+            return jsonify({"message": "No hay campos válidos para actualizar o el estado no cambió/es inválido"}), 400
+        # Control optimista: con la columna version desplegada la versión es obligatoria;
+        # sin ella, la última escritura ganaría sobre los cambios de otra recepcionista
+        check_version = versioning_available()
+        if check_version and expected_version is None:
+            return jsonify(version_required_body()), 428
+
+        # Choque evidente con el índice en caché (sin consultas); si el día no está
+        # cargado decide el RPC, que es quien comprueba la disponibilidad en la base de datos
+        if update_data.get("doctor_id") is not None and update_data.get("appointment_time"):
+            conflicts = find_conflicts(update_data["doctor_id"], appointment_dt, exclude_id=appointment_id, load=False)
+            if conflicts:
+                current_app.logger.info("Doctor ID %s ya tiene cita(s) en horario similar: %s", update_data["doctor_id"], conflicts)
+                return jsonify(doctor_unavailable_body(update_data["appointment_time"])), 409
+
+        # Camino rápido: validación, transición y lectura con paciente/doctor en un solo RPC
+        try:
+            rpc_result = update_appointment_atomic(appointment_id, update_data, new_status, expected_version)
+        except AppointmentUpdateError as e:
+            if e.status != 404:
+                current_app.logger.info("Actualización rechazada para cita %s: %s", appointment_id, e.body)
+            return jsonify(e.body), e.status
+        if rpc_result is not None:
+            updated_appointment, previous_time = rpc_result
+            invalidate_for_appointment_times(previous_time, updated_appointment.get('appointment_time'))
+            # El doctor anterior no se conoce aquí: se invalidan todos los doctores de esos días
+            invalidate_availability([previous_time, updated_appointment.get('appointment_time')])
+            publish_appointment_change('updated', appointment_id, updated_appointment)
+            current_app.logger.info("Cita actualizada con ID: %s", appointment_id)
+            return jsonify(calculate_durations(updated_appointment)), 200
+
+        # Sin RPC: obtener estado actual para validación (varias consultas)
+        current_appointment_response = supabase.table('appointments').select(f'{version_select()} status, appointment_time, arrival_time, consultation_start_time, consultation_end_time').eq('id', appointment_id).maybe_single().execute()
+        if not current_appointment_response or not current_appointment_response.data:
+             return jsonify({"message": "Cita no encontrada"}), 404
+        current_appointment = current_appointment_response.data
+        current_status = current_appointment.get('status')
+        if check_version and current_appointment.get('version') != expected_version:
+            return jsonify(version_conflict_body(current_appointment.get('version'))), 409
+
         # Verificar disponibilidad del doctor si se está actualizando doctor_id o appointment_time
         if ("doctor_id" in update_data or "appointment_time" in update_data) and "doctor_id" in update_data and update_data["doctor_id"] is not None:
             doctor_id = update_data["doctor_id"]
             
-            # Si solo se actualiza doctor_id, necesitamos obtener el appointment_time actual
-            if "appointment_time" not in update_data:
-                appt_time_query = supabase.table('appointments').select('appointment_time').eq('id', appointment_id).maybe_single().execute()
-                if appt_time_query.data and "appointment_time" in appt_time_query.data:
-                    appointment_dt = datetime.fromisoformat(appt_time_query.data["appointment_time"].replace('Z', '+00:00'))
-                else:
-                    return jsonify({"message": "Error al obtener la hora de la cita"}), 500
-            else:
-                appointment_dt = datetime.fromisoformat(update_data["appointment_time"].replace('Z', '+00:00'))
-            
-            # Definir ventana de tiempo para verificar (±30 minutos)
-            time_window = timedelta(minutes=30)
-            start_time = (appointment_dt - time_window).isoformat()
-            end_time = (appointment_dt + time_window).isoformat()
-            
-            # Buscar citas del doctor en la ventana de tiempo (excluyendo la cita actual)
-            existing_appointments = supabase.table('appointments')\
-                .select('id, appointment_time')\
-                .eq('doctor_id', doctor_id)\
-                .neq('id', appointment_id)\
-                .gte('appointment_time', start_time)\
-                .lte('appointment_time', end_time)\
-                .execute()
-                
-            if hasattr(existing_appointments, 'data') and existing_appointments.data:
-                current_app.logger.info(f"Doctor ID {doctor_id} ya tiene cita(s) en horario similar: {existing_appointments.data}")
-                return jsonify({
-                    "message": "El doctor seleccionado ya tiene una cita programada en este horario.",
-                    "error_type": "doctor_unavailable",
-                    "conflict_time": update_data.get("appointment_time") or appt_time_query.data.get("appointment_time")
-                }), 409  # Conflict status code
+            # Si solo se actualiza doctor_id se usa el appointment_time actual (ya leído arriba)
+            conflict_time = update_data.get("appointment_time") or current_appointment.get("appointment_time")
+            if not conflict_time:
+                return jsonify({"message": "Error al obtener la hora de la cita"}), 500
+            appointment_dt = datetime.fromisoformat(conflict_time.replace('Z', '+00:00'))
 
+            # Sin el RPC no hay comprobación en la base de datos al actualizar: el día se
+            # relee de Supabase (fresh) en lugar de fiarse de la caché del índice
+            conflicts = find_conflicts(doctor_id, appointment_dt, exclude_id=appointment_id, fresh=True)
+            if conflicts:
+                current_app.logger.info("Doctor ID %s ya tiene cita(s) en horario similar: %s", doctor_id, conflicts)
+                return jsonify(doctor_unavailable_body(conflict_time)), 409  # Conflict status code
 
-        # --- VALIDACIÓN Y MANEJO DE ESTADO (CORREGIDO Y APLICADO) ---
-        new_status = data.get("status")
 
+        # --- VALIDACIÓN Y MANEJO DE ESTADO (CORREGIDO Y APLICADO) ---
         if new_status and new_status != current_status:
             # Define allowed transitions
             allowed_transitions = {
@@ -394,13 +512,13 @@ def update_appointment(current_user, appointment_id):
                 now_utc_iso = datetime.now(timezone.utc).isoformat()
                 if new_status == "En Espera" and not current_appointment.get('arrival_time'):
                     update_data["arrival_time"] = now_utc_iso
-                    current_app.logger.info(f"Registrando arrival_time para cita {appointment_id}")
+                    current_app.logger.debug("Registrando arrival_time para cita %s", appointment_id)
                 elif new_status == "En Consulta" and not current_appointment.get('consultation_start_time'):
                     update_data["consultation_start_time"] = now_utc_iso
-                    current_app.logger.info(f"Registrando consultation_start_time para cita {appointment_id}")
+                    current_app.logger.debug("Registrando consultation_start_time para cita %s", appointment_id)
                 elif new_status == "Completada" and not current_appointment.get('consultation_end_time'):
                      update_data["consultation_end_time"] = now_utc_iso
-                     current_app.logger.info(f"Registrando consultation_end_time para cita {appointment_id}")
+                     current_app.logger.debug("Registrando consultation_end_time para cita %s", appointment_id)
         # --- FIN VALIDACIÓN Y MANEJO DE ESTADO ---
 
 
@@ -408,9 +526,9 @@ def update_appointment(current_user, appointment_id):
         if not update_data:
              if "status" in data and data["status"] == current_status:
                   # Devolver los datos actuales sin hacer update si solo se envió el mismo estado
-                  fetch_response = supabase.table('appointments').select('''
+                  fetch_response = supabase.table('appointments').select(f'''
                       id, appointment_time, status, notes, created_at,
-                      arrival_time, consultation_start_time, consultation_end_time,
+                      arrival_time, consultation_start_time, consultation_end_time, {version_select()}
                       patient:patients (id, name),
                       doctor:doctors (id, name)
                   ''').eq('id', appointment_id).maybe_single().execute()
@@ -423,8 +541,17 @@ def update_appointment(current_user, appointment_id):
 
 
         # --- Ejecutar la actualización ---
-        update_response = supabase.table('appointments').update(update_data).eq('id', appointment_id).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (update appointment): {update_response}")
+        update_query = supabase.table('appointments')
+        if check_version:
+            # Solo se actualiza si nadie cambió la versión desde la lectura anterior
+            update_data["version"] = expected_version + 1
+            update_query = update_query.update(update_data).eq('id', appointment_id).eq('version', expected_version)
+        else:
+            update_query = update_query.update(update_data).eq('id', appointment_id)
+        update_response = update_query.execute()
+        current_app.logger.debug("Respuesta de Supabase (update appointment): %s", summarize_response(update_response))
+        if check_version and not update_response.data:
+            return jsonify(version_conflict_body(None)), 409
 
         # Verificar si hubo error en la actualización
         if hasattr(update_response, 'error') and update_response.error:
@@ -437,16 +564,21 @@ def update_appointment(current_user, appointment_id):
             return jsonify({"message": error_message}), 400
 
         # Si la actualización no dio error, obtener los datos actualizados para devolverlos
-        fetch_response = supabase.table('appointments').select('''
+        fetch_response = supabase.table('appointments').select(f'''
             id, appointment_time, status, notes, created_at,
-            arrival_time, consultation_start_time, consultation_end_time,
+            arrival_time, consultation_start_time, consultation_end_time, {version_select()}
             patient:patients (id, name),
             doctor:doctors (id, name)
         ''').eq('id', appointment_id).maybe_single().execute()
-        current_app.logger.debug(f"Respuesta de Supabase (fetch after update appointment): {fetch_response}")
+        current_app.logger.debug("Respuesta de Supabase (fetch after update appointment): %s", summarize_response(fetch_response))
+
+        # Invalidar estadísticas del mes anterior y del nuevo (si cambió la fecha)
+        invalidate_for_appointment_times(current_appointment.get('appointment_time'), update_data.get('appointment_time'))
+        invalidate_availability([current_appointment.get('appointment_time'), update_data.get('appointment_time')])
 
         if fetch_response.data:
-            current_app.logger.info(f"Cita actualizada con ID: {appointment_id}")
+            current_app.logger.info("Cita actualizada con ID: %s", appointment_id)
+            publish_appointment_change('updated', appointment_id, fetch_response.data)
             updated_appointment_with_times = calculate_durations(fetch_response.data) # Calcular tiempos aquí
             return jsonify(updated_appointment_with_times), 200
         else:
@@ -462,20 +594,23 @@ def update_appointment(current_user, appointment_id):
 @token_required
 def delete_appointment(current_user, appointment_id):
     """Endpoint para eliminar una cita."""
-    current_app.logger.info(f"Solicitud DELETE /appointments/{appointment_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud DELETE /appointments/%s por user ID: %s", appointment_id, current_user.id)
     try:
-        check_response = supabase.table('appointments').select('id', count='exact').eq('id', appointment_id).execute()
+        check_response = supabase.table('appointments').select('id, appointment_time', count='exact').eq('id', appointment_id).execute()
         if check_response.count == 0:
              return jsonify({"message": "Cita no encontrada"}), 404
 
         response = supabase.table('appointments').delete().eq('id', appointment_id).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (delete appointment): {response}")
+        current_app.logger.debug("Respuesta de Supabase (delete appointment): %s", summarize_response(response))
 
         if hasattr(response, 'error') and response.error:
              current_app.logger.error(f"Error en Supabase al eliminar cita {appointment_id}: {response.error.message}")
              return jsonify({"message": response.error.message}), 500
 
-        current_app.logger.info(f"Cita eliminada con ID: {appointment_id}")
+        invalidate_for_appointment_times(*(row.get('appointment_time') for row in check_response.data))
+        invalidate_availability([row.get('appointment_time') for row in check_response.data])
+        publish_appointment_change('deleted', appointment_id)
+        current_app.logger.info("Cita eliminada con ID: %s", appointment_id)
         return '', 204
 
     except Exception as e:
@@ -0,0 +1,30 @@
+# Ordenamiento de citas por nombre de paciente en la base de datos
+
+from flask import current_app
+from app.extensions import get_supabase
+from app.utils.helpers import is_missing_relation_error
+
+# Vista con patient_name / patient_sort_name (migración appointments_with_patient)
+PATIENT_SORT_VIEW = 'appointments_with_patient'
+# Clave de orden de la vista: nombre en minúsculas, '' si no hay paciente
+PATIENT_SORT_COLUMN = 'patient_sort_name'
+
+_view_available = None
+
+
+def patient_sort_view_available() -> bool:
+    """
+    Indica si la vista de ordenamiento por paciente está desplegada.
+    Se comprueba una sola vez por proceso.
+    """
+    global _view_available
+    if _view_available is None:
+        try:
+            get_supabase().table(PATIENT_SORT_VIEW).select('id').limit(1).execute()
+            _view_available = True
+        except Exception as e:
+            if not is_missing_relation_error(e):
+                raise
+            _view_available = False
+            current_app.logger.warning(f"Vista {PATIENT_SORT_VIEW} no disponible, ordenando por la relación patient(name)")
+    return _view_available
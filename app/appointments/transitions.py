@@ -0,0 +1,136 @@
+# Actualización atómica de citas mediante el RPC update_appointment
+#
+# Un solo viaje a la base de datos: validación de la máquina de estados, marcas de
+# tiempo, disponibilidad del doctor y control optimista por versión ocurren dentro
+# de la misma transacción, con la fila bloqueada. Con la columna version desplegada
+# toda actualización debe indicar la versión que vio el cliente (si no, 428).
+
+from flask import current_app
+from app.extensions import get_supabase
+from app.utils.helpers import is_missing_rpc_error, is_missing_column_error
+
+UPDATE_RPC = 'update_appointment'
+
+_rpc_available = True
+_version_available = None
+
+
+class AppointmentUpdateError(Exception):
+    """Error de negocio devuelto por el RPC, ya traducido a respuesta HTTP."""
+
+    def __init__(self, body: dict, status: int):
+        super().__init__(body.get("message"))
+        self.body = body
+        self.status = status
+
+
+def update_rpc_available() -> bool:
+    return _rpc_available
+
+
+def versioning_available() -> bool:
+    """
+    Indica si appointments tiene la columna version (migración update_appointment).
+    Se comprueba una sola vez por proceso.
+    """
+    global _version_available
+    if _version_available is None:
+        try:
+            get_supabase().table('appointments').select('version').limit(1).execute()
+            _version_available = True
+        except Exception as e:
+            if not is_missing_column_error(e):
+                raise
+            _version_available = False
+            current_app.logger.warning("Columna appointments.version no disponible, actualizaciones sin control de versión")
+    return _version_available
+
+
+def version_select() -> str:
+    """Campo version para los select de citas ('' sin la migración)."""
+    return 'version,' if versioning_available() else ''
+
+
+def version_required_body() -> dict:
+    """Respuesta 428 cuando una actualización no indica la versión que vio el cliente."""
+    return {
+        "message": "Falta la versión de la cita. Recarga los datos e inténtalo de nuevo.",
+        "error_type": "version_required"
+    }
+
+
+def version_conflict_body(current_version) -> dict:
+    """Respuesta 409 cuando otra persona modificó la cita después de que el cliente la leyera."""
+    return {
+        "message": "La cita fue modificada por otro usuario. Recarga los datos e inténtalo de nuevo.",
+        "error_type": "version_conflict",
+        "current_version": current_version
+    }
+
+
+def doctor_unavailable_body(conflict_time) -> dict:
+    """Respuesta 409 cuando el doctor ya tiene una cita a ±30 minutos."""
+    return {
+        "message": "El doctor seleccionado ya tiene una cita programada en este horario.",
+        "error_type": "doctor_unavailable",
+        "conflict_time": conflict_time
+    }
+
+
+def is_doctor_unavailable_error(error) -> bool:
+    """Error PT409 doctor_unavailable (RPC update_appointment o trigger de inserción)."""
+    return getattr(error, 'code', None) == 'PT409' and getattr(error, 'message', None) == 'doctor_unavailable'
+
+
+def _translate_error(error) -> AppointmentUpdateError:
+    """Convierte los errores PTxxx del RPC en la misma respuesta que da la API sin RPC."""
+    code = getattr(error, 'code', None)
+    message = getattr(error, 'message', None)
+    details = getattr(error, 'details', None)
+    if code == 'PT404':
+        return AppointmentUpdateError({"message": "Cita no encontrada"}, 404)
+    if is_doctor_unavailable_error(error):
+        return AppointmentUpdateError(doctor_unavailable_body(details), 409)
+    if code == 'PT409' and message == 'version_conflict':
+        return AppointmentUpdateError(version_conflict_body(int(details) if details and details.isdigit() else None), 409)
+    if code == 'PT428':
+        return AppointmentUpdateError(version_required_body(), 428)
+    if code == 'PT400':
+        return AppointmentUpdateError({"message": details or "Transición de estado inválida"}, 400)
+    if code == '23503':
+        return AppointmentUpdateError({"message": "ID de doctor inválido"}, 400)
+    return None
+
+
+def update_appointment_atomic(appointment_id: int, changes: dict, status: str = None, expected_version: int = None):
+    """
+    Aplica los cambios y la transición de estado en una sola llamada.
+    Devuelve (cita_con_paciente_y_doctor, appointment_time_anterior), o None si el RPC
+    no está desplegado (el llamador usa entonces el flujo de varias consultas).
+    Lanza AppointmentUpdateError para errores de negocio.
+    """
+    global _rpc_available
+    if not _rpc_available:
+        return None
+    params = {
+        "p_id": appointment_id,
+        "p_changes": changes,
+        "p_status": status,
+        "p_expected_version": expected_version,
+    }
+    try:
+        response = get_supabase().rpc(UPDATE_RPC, params).execute()
+    except Exception as e:
+        if is_missing_rpc_error(e):
+            _rpc_available = False
+            current_app.logger.warning(f"RPC {UPDATE_RPC} no disponible, usando actualización en varias consultas")
+            return None
+        translated = _translate_error(e)
+        if translated is not None:
+            raise translated
+        raise
+
+    data = response.data or {}
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    return data.get("appointment"), data.get("previous_appointment_time")
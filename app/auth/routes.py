@@ -1,9 +1,11 @@
 from flask import request, jsonify, current_app
+from werkzeug.local import LocalProxy
 from . import auth_bp
-from app.extensions import get_supabase
-from app.utils.decorators import token_required
+from app.extensions import get_supabase, get_token_cache
+from app.utils.decorators import token_required, internal_token_required, invalidate_cached_token
 
-supabase = get_supabase()
+# Proxy: el cliente se crea en el primer uso, no al importar el blueprint
+supabase = LocalProxy(get_supabase)
 
 @auth_bp.route("/login", methods=["POST"])
 def login():
@@ -48,7 +50,10 @@ def logout(current_user):
     """Endpoint para cerrar sesión."""
     try:
         token = request.headers['Authorization'].split(" ")[1]
-        supabase.auth.sign_out(token)
+        invalidate_cached_token(token)
+        # Cierra en GoTrue la sesión de este token (revoca sus refresh tokens). auth.sign_out()
+        # solo cierra la sesión propia del cliente compartido y no acepta un token
+        supabase.auth.admin.sign_out(token)
         current_app.logger.info(f"Logout exitoso para user ID: {current_user.id}")
         return jsonify({"message": "Logout exitoso"}), 200
     except Exception as e:
@@ -60,10 +65,20 @@ def logout(current_user):
 @token_required
 def get_me(current_user):
     """Endpoint para obtener datos del usuario autenticado."""
-    current_app.logger.info(f"Solicitud /me para user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud /me para user ID: %s", current_user.id)
     return jsonify({
         "id": current_user.id,
         "email": current_user.email,
         "aud": current_user.aud,
         "created_at": current_user.created_at,
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@auth_bp.route("/cache-stats", methods=["GET"])
+@internal_token_required
+def get_token_cache_stats():
+    """Aciertos/fallos de la caché de tokens del worker; requiere METRICS_TOKEN como las métricas."""
+    cache = get_token_cache()
+    if cache is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **cache.stats()}), 200
@@ -1,21 +1,161 @@
 # Configuración de la aplicación
+#
+# Nada se lee al importar este módulo: load_config() carga el .env y construye la
+# clase Config a partir del entorno en ese momento (la llama create_app). Así la
+# app se importa sin efectos secundarios y cada create_app ve el entorno actual.
 
 import os
-from dotenv import load_dotenv
 
-load_dotenv() # Cargar variables de .env para que estén disponibles aquí
 
-class Config:
-    """Clase base de configuración."""
-    # Clave secreta para sesiones, etc. Cambiar en producción.
-    SECRET_KEY = os.environ.get('SECRET_KEY', 'una-clave-secreta-muy-segura')
+def load_config():
+    """Carga el .env (sin pisar variables ya definidas) y devuelve la clase Config."""
+    from dotenv import load_dotenv
+    load_dotenv() # Cargar variables de .env para que estén disponibles aquí
 
-    # Configuración de Supabase
-    SUPABASE_URL = os.environ.get("SUPABASE_URL")
-    SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+    class Config:
+        """Clase base de configuración."""
+        # Clave secreta para sesiones, etc. Cambiar en producción.
+        SECRET_KEY = os.environ.get('SECRET_KEY', 'una-clave-secreta-muy-segura')
 
-    # Validar configuración esencial
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        raise ValueError("SUPABASE_URL y SUPABASE_KEY deben estar definidas en .env")
+        # Configuración de Supabase
+        SUPABASE_URL = os.environ.get("SUPABASE_URL")
+        SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+        # Crear el cliente de Supabase en el primer uso (arranque más rápido de los workers).
+        # Con gunicorn --preload se crea igualmente en el master (ver gunicorn.conf.py)
+        SUPABASE_LAZY_INIT = os.environ.get('SUPABASE_LAZY_INIT', 'True').lower() == 'true'
+
+        # Verificación de tokens en token_required:
+        # 'remote' consulta a Supabase (auth.get_user) en cada petición,
+        # 'local' verifica firma, expiración y audiencia del JWT con PyJWT.
+        AUTH_VERIFY_MODE = os.environ.get('AUTH_VERIFY_MODE', 'remote').lower()
+        # Secreto HS256 del proyecto (Settings > API > JWT Secret) o, en su lugar, URL del JWKS
+        SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET')
+        SUPABASE_JWKS_URL = os.environ.get('SUPABASE_JWKS_URL') or (
+            f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+        )
+        SUPABASE_JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
+        SUPABASE_JWT_ISSUER = os.environ.get('SUPABASE_JWT_ISSUER') # Opcional
+        # Si la verificación local no se puede realizar (sin clave, JWKS inaccesible...),
+        # recurrir a auth.get_user en lugar de rechazar la petición
+        AUTH_REMOTE_FALLBACK = os.environ.get('AUTH_REMOTE_FALLBACK', 'False').lower() == 'true'
+
+        # Caché en memoria de tokens validados -> usuario (0 para deshabilitar).
+        # El TTL efectivo nunca supera el 'exp' del propio token. La caché es por worker: un
+        # token revocado fuera de esta API (otra sesión, panel de Supabase) se sigue
+        # aceptando hasta AUTH_CACHE_TTL en los workers que ya lo tenían
+        AUTH_CACHE_MAXSIZE = int(os.environ.get('AUTH_CACHE_MAXSIZE', 1024))
+        AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 60)) # segundos
+        # Tokens cerrados con /auth/logout, consultados en cada petición autenticada:
+        # 'redis' (compartidos, el logout vale en todos los workers), 'memory' (solo el
+        # worker que atendió el logout; los demás lo aceptan hasta AUTH_CACHE_TTL) o 'none'
+        AUTH_REVOCATION_BACKEND = os.environ.get('AUTH_REVOCATION_BACKEND', 'memory').lower()
+        AUTH_REVOCATION_REDIS_URL = os.environ.get('AUTH_REVOCATION_REDIS_URL', 'redis://localhost:6379/0')
+
+        # Caché de resultados del dashboard: 'memory' (por worker), 'redis' (compartida) o 'none'
+        DASHBOARD_CACHE_BACKEND = os.environ.get('DASHBOARD_CACHE_BACKEND', 'memory').lower()
+        DASHBOARD_CACHE_REDIS_URL = os.environ.get('DASHBOARD_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        DASHBOARD_CACHE_MAXSIZE = int(os.environ.get('DASHBOARD_CACHE_MAXSIZE', 256))
+        # Meses cerrados (pasados y sin citas pendientes) casi nunca cambian; el mes en curso sí
+        DASHBOARD_CACHE_CLOSED_TTL = int(os.environ.get('DASHBOARD_CACHE_CLOSED_TTL', 86400)) # segundos
+        DASHBOARD_CACHE_OPEN_TTL = int(os.environ.get('DASHBOARD_CACHE_OPEN_TTL', 60)) # segundos
+        # Con 'memory' y varios workers cada uno solo ve sus propias invalidaciones: ningún
+        # panel se guarda más de esto (una edición en un mes cerrado tarda como mucho eso
+        # en verse en los demás workers). Con 'redis' no aplica
+        DASHBOARD_CACHE_MEMORY_MAX_TTL = int(os.environ.get('DASHBOARD_CACHE_MEMORY_MAX_TTL', 60)) # segundos
+        # Procesos que sirven la API (gunicorn.conf.py lo exporta con el número de workers)
+        WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+        # Paginación por cursor de los listados (?limit=&after=)
+        PAGINATION_DEFAULT_LIMIT = int(os.environ.get('PAGINATION_DEFAULT_LIMIT', 50))
+        PAGINATION_MAX_LIMIT = int(os.environ.get('PAGINATION_MAX_LIMIT', 200))
+
+        # Exportación de citas (/dashboard/export): filas por consulta; menor que el max-rows de PostgREST
+        EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', 500))
+
+        # Búsqueda de pacientes (/patients/search): caché LRU por proceso de los textos más buscados
+        PATIENT_SEARCH_MIN_CHARS = int(os.environ.get('PATIENT_SEARCH_MIN_CHARS', 2))
+        PATIENT_SEARCH_CACHE_MAXSIZE = int(os.environ.get('PATIENT_SEARCH_CACHE_MAXSIZE', 512))
+        PATIENT_SEARCH_CACHE_TTL = int(os.environ.get('PATIENT_SEARCH_CACHE_TTL', 60)) # segundos
+
+        # Disponibilidad de doctores (/doctors/<id>/availability); horario en UTC, formato HH:MM
+        AVAILABILITY_DAY_START = os.environ.get('AVAILABILITY_DAY_START', '08:00')
+        AVAILABILITY_DAY_END = os.environ.get('AVAILABILITY_DAY_END', '18:00')
+        AVAILABILITY_CACHE_MAXSIZE = int(os.environ.get('AVAILABILITY_CACHE_MAXSIZE', 1024))
+        # Caché por worker: en los demás workers los huecos libres pueden ir hasta este TTL atrasados
+        AVAILABILITY_CACHE_TTL = int(os.environ.get('AVAILABILITY_CACHE_TTL', 30)) # segundos
+
+        # Sincronización incremental (/appointments/changes?since=)
+        APPOINTMENT_CHANGES_SETTLE_SECONDS = float(os.environ.get('APPOINTMENT_CHANGES_SETTLE_SECONDS', 2)) # margen para transacciones en curso
+        APPOINTMENT_CHANGES_RETENTION_DAYS = int(os.environ.get('APPOINTMENT_CHANGES_RETENTION_DAYS', 30)) # purga de tombstones
+
+        # Tablas de referencia en memoria (doctores); 0 = recargar en cada uso
+        REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 300)) # segundos
 
-    # Podrías añadir otras configuraciones aquí (ej. base de datos, mail)
\ No newline at end of file
+        # Eventos en tiempo real (/appointments/stream): 'memory' (un worker) o 'redis' (entre workers)
+        EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'memory').lower()
+        EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+        EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100)) # eventos pendientes por conexión
+        EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15)) # segundos entre comentarios keep-alive
+        # Streams abiertos por worker (0 = sin límite). Cada uno ocupa un hilo de gunicorn
+        # (GUNICORN_THREADS, 16 por defecto): por encima del cupo se responde 503
+        EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 8))
+        # Validez del ticket de un solo uso con el que EventSource abre el stream
+        EVENTS_TICKET_TTL = int(os.environ.get('EVENTS_TICKET_TTL', 30)) # segundos
+
+        # Consultas independientes en paralelo dentro de una petición (0 = secuencial)
+        FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 8))
+        FANOUT_TIMEOUT = float(os.environ.get('FANOUT_TIMEOUT', 10)) # segundos por llamada
+
+        # Serialización JSON: 'auto' usa orjson si está instalado, 'default' el json de Flask
+        JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto').lower()
+        # Compresión de respuestas grandes (gzip; brotli si está instalado el paquete 'brotli')
+        COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+        COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)) # bytes
+        COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+        COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+        # Conexiones HTTP hacia Supabase (un pool por worker, compartido entre hilos)
+        SUPABASE_HTTP_MAX_CONNECTIONS = int(os.environ.get('SUPABASE_HTTP_MAX_CONNECTIONS', 20))
+        SUPABASE_HTTP_MAX_KEEPALIVE = int(os.environ.get('SUPABASE_HTTP_MAX_KEEPALIVE', 10))
+        SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('SUPABASE_HTTP_KEEPALIVE_EXPIRY', 30)) # segundos
+        SUPABASE_HTTP_CONNECT_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_CONNECT_TIMEOUT', 5)) # segundos
+        SUPABASE_HTTP_READ_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_READ_TIMEOUT', 30)) # segundos
+        SUPABASE_HTTP_POOL_TIMEOUT = float(os.environ.get('SUPABASE_HTTP_POOL_TIMEOUT', 5)) # espera por conexión libre
+        SUPABASE_HTTP_CONNECT_RETRIES = int(os.environ.get('SUPABASE_HTTP_CONNECT_RETRIES', 1))
+        # HTTP/2 multiplexa peticiones concurrentes en una conexión; requiere 'h2' (httpx[http2])
+        SUPABASE_HTTP2 = os.environ.get('SUPABASE_HTTP2', 'false').lower() == 'true'
+
+        # Logging: nivel, formato ('text' o 'json', una línea JSON por registro) y
+        # escritura desde un hilo aparte (QueueHandler/QueueListener)
+        LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+        LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+        LOG_QUEUE = os.environ.get('LOG_QUEUE', 'true').lower() == 'true'
+
+        # Instrumentación por petición: llamadas a Supabase, cabecera Server-Timing y resumen en el log
+        REQUEST_TRACING_ENABLED = os.environ.get('REQUEST_TRACING_ENABLED', 'true').lower() == 'true'
+        SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+        REQUEST_SUMMARY_LOG = os.environ.get('REQUEST_SUMMARY_LOG', 'true').lower() == 'true'
+        # Histogramas Prometheus en /api/v1/metrics (por worker). Desactivados por defecto;
+        # al activarlos METRICS_TOKEN es obligatorio ('Authorization: Bearer <token>'), y el
+        # mismo token protege los endpoints internos (/api/v1/health/pool, /auth/cache-stats,
+        # /doctors/cache/invalidate)
+        METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+        METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+        # Podrías añadir otras configuraciones aquí (ej. base de datos, mail)
+
+    return Config
+
+
+def validate_config(config):
+    """
+    Comprueba la configuración esencial. Se llama desde create_app y no al importar
+    este módulo, para poder importar la app (herramientas, perfiles) sin un .env completo.
+    """
+    if not config.get('SUPABASE_URL') or not config.get('SUPABASE_KEY'):
+        raise ValueError("SUPABASE_URL y SUPABASE_KEY deben estar definidas en .env")
+    if not str(config['SUPABASE_URL']).startswith(('http://', 'https://')):
+        raise ValueError("SUPABASE_URL debe empezar por http:// o https://")
+    if config.get('METRICS_ENABLED') and not config.get('METRICS_TOKEN'):
+        raise ValueError("METRICS_ENABLED requiere METRICS_TOKEN (las métricas exponen datos internos)")
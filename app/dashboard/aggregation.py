@@ -0,0 +1,311 @@
+# Motor de agregación mensual compartido por los endpoints del dashboard
+#
+# Se consulta el mes una sola vez, cada cita se procesa una sola vez y de ese
+# recorrido salen todas las métricas. Los endpoints son proyecciones del resultado.
+# Las métricas resumidas (sin detalle por cita) se piden a Postgres mediante el RPC
+# dashboard_month_summary; si no existe, se usa el agregado en Python.
+
+from calendar import monthrange
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from flask import current_app, g
+from app.extensions import get_supabase, get_doctors_table
+from app.utils.helpers import is_missing_rpc_error
+
+# Columnas necesarias para todas las métricas del mes. El doctor no se embebe:
+# su nombre sale de la tabla de referencia en memoria (get_doctors_table)
+MONTH_APPOINTMENTS_SELECT = (
+    'id, doctor_id, appointment_time, status, '
+    'arrival_time, consultation_start_time, consultation_end_time, '
+    'patient:patients(id, name)'
+)
+
+MONTH_SUMMARY_RPC = 'dashboard_month_summary'
+
+# Estados de una cita, tal como se guardan en appointments.status
+APPOINTMENT_STATUSES = ("Programada", "En Espera", "En Consulta", "Completada", "Cancelada", "No Asistió")
+
+_summary_rpc_available = True
+
+
+def month_bounds(year: int, month: int):
+    """Devuelve (inicio ISO, fin ISO, días del mes) en UTC para el mes indicado."""
+    days_in_month = monthrange(year, month)[1]
+    start_dt = datetime(year, month, 1, tzinfo=timezone.utc)
+    end_dt = datetime(year, month, days_in_month, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    return start_dt.isoformat(), end_dt.isoformat(), days_in_month
+
+
+def parse_timestamp(value):
+    """Convierte un timestamp ISO de Supabase a datetime, o None si no existe o es inválido."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        current_app.logger.warning(f"No se pudo procesar fecha: {value}")
+        return None
+
+
+def minutes_between(start, end):
+    """Minutos enteros entre dos instantes, o None si falta alguno o el orden es incorrecto."""
+    if start is None or end is None or end < start:
+        return None
+    return int((end - start).total_seconds() / 60)
+
+
+def fetch_month_appointments(year: int, month: int) -> list:
+    """Consulta en Supabase todas las citas del mes (una sola petición)."""
+    start_date, end_date, _ = month_bounds(year, month)
+    response = get_supabase().table('appointments')\
+        .select(MONTH_APPOINTMENTS_SELECT)\
+        .gte('appointment_time', start_date)\
+        .lte('appointment_time', end_date)\
+        .execute()
+    return response.data or []
+
+
+def placeholder_doctor_name(doctor_id) -> str:
+    """Nombre mostrado para un doctor que aún no está en la tabla de referencia."""
+    return f"Doctor #{doctor_id}"
+
+
+def _empty_day():
+    return {"count": 0, "wait_sum": 0, "wait_count": 0, "consult_sum": 0, "consult_count": 0}
+
+
+def aggregate_month(appointments: list, year: int, month: int) -> dict:
+    """Calcula todas las métricas del mes en un solo recorrido de las citas."""
+    days_in_month = monthrange(year, month)[1]
+    result = {
+        "year": year,
+        "month": month,
+        "days_in_month": days_in_month,
+        "total": len(appointments),
+        "wait_sum": 0, "wait_count": 0,
+        "consult_sum": 0, "consult_count": 0,
+        "daily": {},             # día -> contadores del día
+        "by_doctor": {},         # doctor_id -> {"name", "count"} (orden de aparición)
+        "status_count": Counter(),
+        "doctor_appointments": {},  # doctor_id -> citas formateadas (doctors-details)
+        "appointments": [],      # citas procesadas (appointments-summary)
+    }
+
+    doctors = get_doctors_table()
+    for appointment in appointments:
+        status = appointment.get('status', 'pendiente')
+        result["status_count"][status] += 1
+
+        appt_time = parse_timestamp(appointment.get('appointment_time'))
+        arrival = parse_timestamp(appointment.get('arrival_time'))
+        start = parse_timestamp(appointment.get('consultation_start_time'))
+        end = parse_timestamp(appointment.get('consultation_end_time'))
+        wait_time = minutes_between(arrival, start)
+        consult_time = minutes_between(start, end)
+
+        if wait_time is not None:
+            result["wait_sum"] += wait_time
+            result["wait_count"] += 1
+        if consult_time is not None:
+            result["consult_sum"] += consult_time
+            result["consult_count"] += 1
+
+        if appt_time is not None:
+            day_stats = result["daily"].setdefault(appt_time.day, _empty_day())
+            day_stats["count"] += 1
+            if wait_time is not None:
+                day_stats["wait_sum"] += wait_time
+                day_stats["wait_count"] += 1
+            if consult_time is not None:
+                day_stats["consult_sum"] += consult_time
+                day_stats["consult_count"] += 1
+            formatted_time = appt_time.strftime("%Y-%m-%d %H:%M")
+        else:
+            formatted_time = appointment.get('appointment_time') or ''
+
+        patient_name = (appointment.get('patient') or {}).get('name', 'Sin nombre')
+        doctor_id = appointment.get('doctor_id')
+        doctor = doctors.get(doctor_id) or {}
+        # Un doctor recién creado puede faltar aún en la tabla en memoria (la recarga por
+        # id desconocido está limitada): la cita cuenta igual, con un nombre provisional
+        doctor_name = doctor.get('name') or (placeholder_doctor_name(doctor_id) if doctor_id else 'Sin asignar')
+        if doctor_id:
+            doctor_stats = result["by_doctor"].setdefault(doctor_id, {"name": doctor_name, "count": 0})
+            doctor_stats["count"] += 1
+
+        if doctor_id:
+            result["doctor_appointments"].setdefault(doctor_id, []).append({
+                "id": appointment.get('id'),
+                "dateTime": formatted_time,
+                "patientName": patient_name,
+                "status": status
+            })
+
+        result["appointments"].append({
+            "id": appointment.get('id'),
+            "dateTime": formatted_time,
+            "status": status,
+            "patientName": patient_name,
+            "doctorName": doctor_name,
+            "waitTime": wait_time,
+            "consultTime": consult_time
+        })
+
+    return result
+
+
+def get_month_aggregate(year: int, month: int) -> dict:
+    """
+    Agregado del mes, calculado como máximo una vez por petición.
+    Los hilos de un fan-out (/bundle) comparten `g`: el memo guarda un Future, el
+    primero que llega consulta el mes y los demás esperan su resultado.
+    """
+    memo = g.setdefault('month_aggregates', {})
+    future = Future()
+    existing = memo.setdefault((year, month), future)
+    if existing is future:
+        try:
+            future.set_result(aggregate_month(fetch_month_appointments(year, month), year, month))
+        except Exception as e:
+            future.set_exception(e)
+    return existing.result()
+
+
+def fetch_month_summary(year: int, month: int) -> dict:
+    """
+    Métricas resumidas del mes calculadas en Postgres (RPC dashboard_month_summary).
+    Devuelve las mismas claves que aggregate_month salvo el detalle por cita.
+    """
+    start_date, end_date, days_in_month = month_bounds(year, month)
+    response = get_supabase().rpc(MONTH_SUMMARY_RPC, {"p_start": start_date, "p_end": end_date}).execute()
+    data = response.data or {}
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    return {
+        "year": year,
+        "month": month,
+        "days_in_month": days_in_month,
+        "total": data.get("total", 0),
+        "wait_sum": data.get("wait_sum", 0), "wait_count": data.get("wait_count", 0),
+        "consult_sum": data.get("consult_sum", 0), "consult_count": data.get("consult_count", 0),
+        "daily": {
+            row["day"]: {field: row[field] for field in _empty_day()}
+            for row in data.get("daily") or [] if row.get("day") is not None
+        },
+        "by_doctor": {
+            row["id"]: {"name": row["name"], "count": row["count"]}
+            for row in data.get("by_doctor") or []
+        },
+        "status_count": Counter({row["status"]: row["count"] for row in data.get("status_count") or []}),
+    }
+
+
+def get_month_summary(year: int, month: int) -> dict:
+    """
+    Métricas resumidas del mes (totales, por día, por doctor y por estado).
+    Usa el RPC si está disponible; si no, el agregado completo en Python.
+    """
+    global _summary_rpc_available
+    memo = g.setdefault('month_summaries', {})
+    key = (year, month)
+    if key in memo:
+        return memo[key]
+    # Si las filas ya se trajeron (o se están trayendo) en esta petición, el agregado completo sirve igual
+    full_aggregate = g.get('month_aggregates', {}).get(key)
+    if full_aggregate is not None:
+        return full_aggregate.result()
+
+    summary = None
+    if _summary_rpc_available:
+        try:
+            summary = fetch_month_summary(year, month)
+        except Exception as e:
+            if is_missing_rpc_error(e):
+                _summary_rpc_available = False
+                current_app.logger.warning(f"RPC {MONTH_SUMMARY_RPC} no disponible, agregando en Python")
+            else:
+                current_app.logger.error(f"Error en RPC {MONTH_SUMMARY_RPC}: {e}")
+    if summary is None:
+        summary = get_month_aggregate(year, month)
+
+    memo[key] = summary
+    return summary
+
+
+# --- Proyecciones (formato de respuesta de cada endpoint) ---
+
+def _average(total, count):
+    return round(total / count) if count else 0
+
+
+def project_stats(agg: dict) -> dict:
+    return {
+        "totalAppointments": agg["total"],
+        "avgWaitTime": _average(agg["wait_sum"], agg["wait_count"]),
+        "avgConsultTime": _average(agg["consult_sum"], agg["consult_count"])
+    }
+
+
+def project_wait_time_by_day(agg: dict) -> list:
+    result = []
+    for day in range(1, agg["days_in_month"] + 1):
+        stats = agg["daily"].get(day, _empty_day())
+        result.append({"day": day, "avgWaitTime": _average(stats["wait_sum"], stats["wait_count"])})
+    return result
+
+
+def project_consult_time_by_day(agg: dict) -> list:
+    result = []
+    for day in range(1, agg["days_in_month"] + 1):
+        stats = agg["daily"].get(day, _empty_day())
+        result.append({"day": day, "avgConsultTime": _average(stats["consult_sum"], stats["consult_count"])})
+    return result
+
+
+def project_appointments_by_doctor(agg: dict) -> list:
+    return [
+        {"doctorName": stats["name"], "appointmentCount": stats["count"]}
+        for stats in agg["by_doctor"].values()
+    ]
+
+
+def project_appointments_by_day(agg: dict) -> list:
+    return [
+        {"day": day, "count": agg["daily"].get(day, {}).get("count", 0)}
+        for day in range(1, agg["days_in_month"] + 1)
+    ]
+
+
+def project_doctors_details(agg: dict, doctors: list) -> list:
+    result = []
+    for doctor in doctors:
+        doctor_id = doctor.get('id')
+        doctor_appointments = agg["doctor_appointments"].get(doctor_id, [])
+        result.append({
+            "id": doctor_id,
+            "name": doctor.get('name', 'Sin nombre'),
+            "specialty": doctor.get('specialty', ''),
+            "email": doctor.get('email', ''),
+            "phoneNumber": doctor.get('phone_number', ''),
+            "totalAppointments": len(doctor_appointments),
+            "appointments": doctor_appointments
+        })
+    return result
+
+
+def project_appointments_summary(agg: dict) -> dict:
+    # Claves = estados guardados (todos, aunque no haya citas); uno desconocido se añade tal cual
+    status_count = {status: 0 for status in APPOINTMENT_STATUSES}
+    for status, count in agg["status_count"].items():
+        key = status or 'Sin estado'
+        status_count[key] = status_count.get(key, 0) + count
+    return {
+        "totalAppointments": agg["total"],
+        "statusCount": status_count,
+        "appointmentsByDay": [
+            {"day": day, "count": stats["count"]}
+            for day, stats in sorted(agg["daily"].items())
+        ],
+        "appointments": agg["appointments"]
+    }
@@ -0,0 +1,120 @@
+# Caché de resultados del dashboard por (endpoint, año, mes)
+#
+# Cada mes tiene un contador de generación guardado en el propio backend; invalidar
+# un mes solo incrementa ese contador, así las claves antiguas dejan de usarse en
+# todos los workers que comparten el backend (Redis) y expiran solas. Con el backend
+# 'memory' los contadores son por proceso: con varios workers el TTL se acota a
+# DASHBOARD_CACHE_MEMORY_MAX_TTL.
+# Además hay una generación global de datos de referencia (doctores): al invalidar
+# los doctores cambian las claves de todos los meses, porque los paneles llevan
+# nombres de doctor resueltos en Python.
+
+from datetime import datetime, timezone
+from flask import current_app
+from app.extensions import get_dashboard_cache, get_reference_data
+from .aggregation import get_month_summary, parse_timestamp
+
+# Estados finales: un mes pasado con todas sus citas en estos estados ya no cambia
+FINAL_STATUSES = {"Completada", "Cancelada", "No Asistió"}
+
+
+REFERENCE_GENERATION_KEY = "dashboard:gen:reference"
+
+_seen_reference_generation = None
+
+
+def _generation_key(year: int, month: int) -> str:
+    return f"dashboard:gen:{year}-{month:02d}"
+
+
+def _reference_generation(cache) -> int:
+    """
+    Generación de los datos de referencia. Si cambió desde la última lectura de este
+    proceso (otro worker invalidó los doctores con un backend compartido), la copia
+    local de las tablas de referencia también se descarta.
+    """
+    global _seen_reference_generation
+    generation = cache.get_counter(REFERENCE_GENERATION_KEY)
+    if _seen_reference_generation is not None and generation != _seen_reference_generation:
+        get_reference_data().invalidate()
+    _seen_reference_generation = generation
+    return generation
+
+
+def is_month_closed(year: int, month: int) -> bool:
+    """Un mes está cerrado si ya terminó y todas sus citas están en un estado final."""
+    now = datetime.now(timezone.utc)
+    if (year, month) >= (now.year, now.month):
+        return False
+    status_count = get_month_summary(year, month)["status_count"]
+    return all(status in FINAL_STATUSES for status in status_count)
+
+
+def cached_panel(endpoint: str, year: int, month: int, builder):
+    """
+    Devuelve el resultado cacheado de `endpoint` para el mes o lo calcula con `builder()`.
+    Los errores del backend de caché nunca rompen el endpoint: se calcula sin caché.
+    """
+    cache = get_dashboard_cache()
+    if cache is None:
+        return builder()
+
+    try:
+        generation = cache.get_counter(_generation_key(year, month))
+        reference_generation = _reference_generation(cache)
+        key = f"dashboard:{year}-{month:02d}:g{generation}.r{reference_generation}:{endpoint}"
+        cached = cache.get(key)
+    except Exception as e:
+        current_app.logger.warning(f"Caché del dashboard no disponible: {e}")
+        return builder()
+    if cached is not None:
+        return cached
+
+    value = builder()
+    config = current_app.config
+    if is_month_closed(year, month):
+        ttl = config.get('DASHBOARD_CACHE_CLOSED_TTL', 86400)
+    else:
+        ttl = config.get('DASHBOARD_CACHE_OPEN_TTL', 60)
+    if config.get('DASHBOARD_CACHE_BACKEND') == 'memory' and config.get('WEB_CONCURRENCY', 1) > 1:
+        ttl = min(ttl, config.get('DASHBOARD_CACHE_MEMORY_MAX_TTL', 60))
+    try:
+        cache.set(key, value, ttl)
+    except Exception as e:
+        current_app.logger.warning(f"No se pudo guardar en la caché del dashboard: {e}")
+    return value
+
+
+def invalidate_month(year: int, month: int):
+    """Descarta todos los resultados cacheados del mes."""
+    cache = get_dashboard_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(_generation_key(year, month))
+    except Exception as e:
+        current_app.logger.warning(f"No se pudo invalidar la caché del dashboard ({year}-{month:02d}): {e}")
+
+
+def invalidate_reference_panels():
+    """Descarta los resultados de todos los meses (cambiaron los doctores)."""
+    global _seen_reference_generation
+    cache = get_dashboard_cache()
+    if cache is None:
+        return
+    try:
+        _seen_reference_generation = cache.incr(REFERENCE_GENERATION_KEY)
+    except Exception as e:
+        current_app.logger.warning("No se pudo invalidar la caché del dashboard (doctores): %s", e)
+
+
+def invalidate_for_appointment_times(*appointment_times):
+    """Invalida los meses de las fechas de cita indicadas (ISO 8601); ignora valores vacíos."""
+    months = set()
+    for value in appointment_times:
+        appt_time = parse_timestamp(value) if isinstance(value, str) else value
+        if appt_time is not None:
+            appt_time = appt_time.astimezone(timezone.utc)
+            months.add((appt_time.year, appt_time.month))
+    for year, month in months:
+        invalidate_month(year, month)
@@ -0,0 +1,101 @@
+# Exportación de citas por rango de fechas (CSV / NDJSON) en streaming
+#
+# Las citas se leen en páginas keyset (appointment_time, id) y cada página se
+# escribe y se entrega antes de pedir la siguiente: la memoria no depende del
+# tamaño del rango.
+
+import csv
+import io
+from flask import current_app
+from app.extensions import get_supabase, get_doctors_table
+from app.utils.pagination import apply_keyset
+from .aggregation import parse_timestamp, minutes_between
+
+EXPORT_SELECT = (
+    'id, appointment_time, status, patient_id, doctor_id, '
+    'arrival_time, consultation_start_time, consultation_end_time, '
+    'patient:patients(name)'
+)
+
+EXPORT_COLUMNS = [
+    'id', 'appointment_time', 'status',
+    'patient_id', 'patient_name', 'doctor_id', 'doctor_name',
+    'arrival_time', 'consultation_start_time', 'consultation_end_time',
+    'wait_minutes', 'consult_minutes',
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_appointment_pages(start_iso: str, end_iso: str, page_size: int):
+    """
+    Páginas de citas con start <= appointment_time < end, en orden (appointment_time, id).
+    page_size debe ser menor que el max-rows de PostgREST (1000 por defecto).
+    """
+    cursor = None
+    while True:
+        query = get_supabase().table('appointments')\
+            .select(EXPORT_SELECT)\
+            .gte('appointment_time', start_iso)\
+            .lt('appointment_time', end_iso)
+        rows = apply_keyset(query, 'appointment_time', False, {"limit": page_size, "cursor": cursor}).execute().data or []
+        # apply_keyset pide una fila de más: si llegó, hay más páginas
+        page, has_more = rows[:page_size], len(rows) > page_size
+        if page:
+            yield page
+        if not has_more:
+            return
+        last = page[-1]
+        cursor = {"appointment_time": last['appointment_time'], "id": last['id']}
+
+
+def export_row(appointment: dict) -> dict:
+    """Fila plana de exportación con los minutos de espera y de consulta calculados."""
+    arrival = parse_timestamp(appointment.get('arrival_time'))
+    start = parse_timestamp(appointment.get('consultation_start_time'))
+    end = parse_timestamp(appointment.get('consultation_end_time'))
+    return {
+        'id': appointment.get('id'),
+        'appointment_time': appointment.get('appointment_time'),
+        'status': appointment.get('status'),
+        'patient_id': appointment.get('patient_id'),
+        'patient_name': (appointment.get('patient') or {}).get('name'),
+        'doctor_id': appointment.get('doctor_id'),
+        'doctor_name': (get_doctors_table().get(appointment.get('doctor_id')) or {}).get('name'),
+        'arrival_time': appointment.get('arrival_time'),
+        'consultation_start_time': appointment.get('consultation_start_time'),
+        'consultation_end_time': appointment.get('consultation_end_time'),
+        'wait_minutes': minutes_between(arrival, start),
+        'consult_minutes': minutes_between(start, end),
+    }
+
+
+def _csv_chunks(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    # BOM para que Excel reconozca UTF-8 (nombres con acentos)
+    buffer.write('\ufeff')
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(export_row(appointment) for appointment in page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(pages):
+    dumps = current_app.json.dumps
+    for page in pages:
+        yield ''.join(f"{dumps(export_row(appointment))}\n" for appointment in page)
+
+
+def export_chunks(export_format: str, pages):
+    """Fragmentos de texto del archivo exportado, una página de citas por fragmento."""
+    if export_format == 'csv':
+        return _csv_chunks(pages)
+    return _ndjson_chunks(pages)
@@ -1,15 +1,26 @@
 # Rutas para Dashboard y Estadísticas
 
-from flask import request, jsonify, current_app, make_response
-from datetime import datetime, timezone
-from calendar import monthrange
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from flask import request, jsonify, current_app, make_response, Response, stream_with_context
 from . import dashboard_bp
-from app.extensions import get_supabase
-from app.utils.decorators import token_required
-from collections import Counter
-from datetime import timedelta
+from app.extensions import get_doctors_table
+from app.utils.decorators import token_required, conditional_get, CACHE_REVALIDATE
+from .aggregation import (
+    get_month_aggregate,
+    get_month_summary,
+    project_stats,
+    project_wait_time_by_day,
+    project_consult_time_by_day,
+    project_appointments_by_doctor,
+    project_appointments_by_day,
+    project_doctors_details,
+    project_appointments_summary,
+)
+from .cache import cached_panel
+from .export import EXPORT_FORMATS, iter_appointment_pages, export_chunks
+from app.utils.concurrency import run_concurrently
 
-supabase = get_supabase()
 
 # Middleware simplificado para manejar solicitudes OPTIONS sin duplicar headers CORS
 @dashboard_bp.before_request
@@ -18,81 +29,65 @@ def handle_preflight():
         response = make_response()
         return response
 
+# Paneles disponibles en /bundle (mismos nombres que los endpoints individuales)
+BUNDLE_PANELS = {
+    "stats": project_stats,
+    "wait-time": project_wait_time_by_day,
+    "consult-time": project_consult_time_by_day,
+    "appointments-by-doctor": project_appointments_by_doctor,
+    "appointments-by-day": project_appointments_by_day,
+    "doctors-details": project_doctors_details,
+    "appointments-summary": project_appointments_summary,
+}
+# Paneles que necesitan el detalle de cada cita; el resto sale del resumen calculado en Postgres
+ROW_LEVEL_PANELS = {"doctors-details", "appointments-summary"}
+# Paneles que muestra DashboardView si no se indica 'panels'
+DEFAULT_BUNDLE_PANELS = ["stats", "wait-time", "consult-time", "appointments-by-doctor", "appointments-by-day"]
+
+def _get_month_params():
+    """
+    Lee y valida los parámetros 'month' y 'year' de la query.
+    Devuelve (month, year, None) o (None, None, respuesta_de_error).
+    """
+    month = request.args.get('month', type=int)
+    year = request.args.get('year', type=int)
+
+    if not month or not year:
+        return None, None, (jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400)
+
+    # Validar rango de mes
+    if month < 1 or month > 12:
+        return None, None, (jsonify({"message": "El mes debe estar entre 1 y 12"}), 400)
+
+    return month, year, None
+
+def _get_panel(panel, year, month):
+    """Resultado de un panel para el mes, desde la caché o calculado a partir del agregado."""
+    if panel == "doctors-details":
+        return cached_panel(panel, year, month, lambda: _build_doctors_details(year, month))
+    get_aggregate = get_month_aggregate if panel in ROW_LEVEL_PANELS else get_month_summary
+    return cached_panel(panel, year, month, lambda: BUNDLE_PANELS[panel](get_aggregate(year, month)))
+
+def _build_doctors_details(year, month):
+    """Doctores y citas del mes son consultas independientes: se lanzan en paralelo."""
+    results = run_concurrently({
+        "aggregate": lambda: get_month_aggregate(year, month),
+        "doctors": _fetch_doctors,
+    })
+    return project_doctors_details(results["aggregate"], results["doctors"])
+
 @dashboard_bp.route("/stats", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_dashboard_stats(current_user):
     """Endpoint para obtener estadísticas generales del dashboard."""
     try:
-        # Obtener parámetros de consulta
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Consultar total de citas en el mes
-        appointments_query = supabase.table('appointments')\
-            .select('id, status, arrival_time, consultation_start_time, consultation_end_time')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments = appointments_query.data
-        total_appointments = len(appointments)
-        
-        # Calcular tiempos promedio
-        wait_times = []
-        consult_times = []
-        
-        for appointment in appointments:
-            # Calcular tiempo de espera (desde llegada hasta inicio de consulta)
-            if appointment.get('arrival_time') and appointment.get('consultation_start_time'):
-                try:
-                    arrival = datetime.fromisoformat(appointment['arrival_time'].replace('Z', '+00:00'))
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    if start >= arrival:
-                        wait_time_minutes = int((start - arrival).total_seconds() / 60)
-                        wait_times.append(wait_time_minutes)
-                except Exception as e:
-                    current_app.logger.error(f"Error calculando tiempo de espera: {e}")
-            
-            # Calcular tiempo de consulta
-            if appointment.get('consultation_start_time') and appointment.get('consultation_end_time'):
-                try:
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    end = datetime.fromisoformat(appointment['consultation_end_time'].replace('Z', '+00:00'))
-                    if end >= start:
-                        consult_time_minutes = int((end - start).total_seconds() / 60)
-                        consult_times.append(consult_time_minutes)
-                except Exception as e:
-                    current_app.logger.error(f"Error calculando tiempo de consulta: {e}")
-        
-        # Calcular promedios
-        avg_wait_time = round(sum(wait_times) / len(wait_times)) if wait_times else 0
-        avg_consult_time = round(sum(consult_times) / len(consult_times)) if consult_times else 0
-        
-        # Preparar respuesta
-        stats = {
-            "totalAppointments": total_appointments,
-            "avgWaitTime": avg_wait_time,
-            "avgConsultTime": avg_consult_time
-        }
-        
-        return jsonify(stats), 200
-        
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("stats", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo estadísticas del dashboard: {e}")
         return jsonify({"message": f"Error interno: {str(e)}"}), 500
@@ -100,77 +95,16 @@ def get_dashboard_stats(current_user):
 
 @dashboard_bp.route("/wait-time", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_wait_time_by_day(current_user):
     """Endpoint para obtener tiempo promedio de espera por día."""
     try:
-        # Obtener parámetros de consulta
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Consultar citas en el mes
-        appointments_query = supabase.table('appointments')\
-            .select('id, appointment_time, arrival_time, consultation_start_time')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments = appointments_query.data
-        
-        # Agrupar por día y calcular promedios
-        daily_wait_times = {}
-        
-        for appointment in appointments:
-            if appointment.get('arrival_time') and appointment.get('consultation_start_time'):
-                try:
-                    # Extraer fecha del appointment_time
-                    appointment_datetime = datetime.fromisoformat(appointment['appointment_time'].replace('Z', '+00:00'))
-                    day = appointment_datetime.day
-                    
-                    # Calcular tiempo de espera
-                    arrival = datetime.fromisoformat(appointment['arrival_time'].replace('Z', '+00:00'))
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    
-                    if start >= arrival:
-                        wait_time_minutes = int((start - arrival).total_seconds() / 60)
-                        
-                        # Agregar al diccionario por día
-                        if day not in daily_wait_times:
-                            daily_wait_times[day] = []
-                        daily_wait_times[day].append(wait_time_minutes)
-                except Exception as e:
-                    current_app.logger.error(f"Error procesando tiempo de espera: {e}")
-        
-        # Calcular promedios por día
-        result = []
-        for day in range(1, days_in_month + 1):
-            if day in daily_wait_times and daily_wait_times[day]:
-                avg_wait_time = round(sum(daily_wait_times[day]) / len(daily_wait_times[day]))
-            else:
-                avg_wait_time = 0
-                
-            result.append({
-                "day": day,
-                "avgWaitTime": avg_wait_time
-            })
-        
-        return jsonify(result), 200
-        
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("wait-time", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo tiempos de espera por día: {e}")
         return jsonify({"message": f"Error interno: {str(e)}"}), 500
@@ -178,77 +112,16 @@ def get_wait_time_by_day(current_user):
 
 @dashboard_bp.route("/consult-time", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_consult_time_by_day(current_user):
     """Endpoint para obtener tiempo promedio de consulta por día."""
     try:
-        # Obtener parámetros de consulta
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Consultar citas en el mes
-        appointments_query = supabase.table('appointments')\
-            .select('id, appointment_time, consultation_start_time, consultation_end_time')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments = appointments_query.data
-        
-        # Agrupar por día y calcular promedios
-        daily_consult_times = {}
-        
-        for appointment in appointments:
-            if appointment.get('consultation_start_time') and appointment.get('consultation_end_time'):
-                try:
-                    # Extraer fecha del appointment_time
-                    appointment_datetime = datetime.fromisoformat(appointment['appointment_time'].replace('Z', '+00:00'))
-                    day = appointment_datetime.day
-                    
-                    # Calcular tiempo de consulta
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    end = datetime.fromisoformat(appointment['consultation_end_time'].replace('Z', '+00:00'))
-                    
-                    if end >= start:
-                        consult_time_minutes = int((end - start).total_seconds() / 60)
-                        
-                        # Agregar al diccionario por día
-                        if day not in daily_consult_times:
-                            daily_consult_times[day] = []
-                        daily_consult_times[day].append(consult_time_minutes)
-                except Exception as e:
-                    current_app.logger.error(f"Error procesando tiempo de consulta: {e}")
-        
-        # Calcular promedios por día
-        result = []
-        for day in range(1, days_in_month + 1):
-            if day in daily_consult_times and daily_consult_times[day]:
-                avg_consult_time = round(sum(daily_consult_times[day]) / len(daily_consult_times[day]))
-            else:
-                avg_consult_time = 0
-                
-            result.append({
-                "day": day,
-                "avgConsultTime": avg_consult_time
-            })
-        
-        return jsonify(result), 200
-        
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("consult-time", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo tiempos de consulta por día: {e}")
         return jsonify({"message": f"Error interno: {str(e)}"}), 500
@@ -256,318 +129,159 @@ def get_consult_time_by_day(current_user):
 
 @dashboard_bp.route("/appointments-by-doctor", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_appointments_by_doctor(current_user):
     """Endpoint para obtener número de citas por doctor."""
     try:
-        
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Consultar citas en el mes con información del doctor
-        appointments_query = supabase.table('appointments')\
-            .select('id, doctor:doctors(id, name)')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .not_.is_('doctor_id', None)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments = appointments_query.data
-        
-        # Contar citas por doctor
-        doctor_counts = {}
-        
-        for appointment in appointments:
-            if appointment.get('doctor') and appointment['doctor'].get('id'):
-                doctor_id = appointment['doctor']['id']
-                doctor_name = appointment['doctor']['name']
-                
-                if doctor_id not in doctor_counts:
-                    doctor_counts[doctor_id] = {
-                        "doctorName": doctor_name,
-                        "appointmentCount": 0
-                    }
-                
-                doctor_counts[doctor_id]["appointmentCount"] += 1
-        
-        # Convertir a lista para la respuesta
-        result = list(doctor_counts.values())
-        
-        return jsonify(result), 200
-    
-    
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("appointments-by-doctor", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo citas por doctor: {e}")
         return jsonify({"message": f"Error interno: {str(e)}"}), 500
-    
+
 @dashboard_bp.route("/appointments-by-day", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_appointments_by_day(current_user):
     """Endpoint para obtener número de citas por día."""
     try:
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-
-        days_in_month = monthrange(year, month)[1]
-        # Asegúrate que el formato coincida con tu columna y zona horaria
-        start_dt = datetime(year, month, 1, tzinfo=timezone.utc)
-        end_dt = datetime(year, month, days_in_month, 23, 59, 59, 999999, tzinfo=timezone.utc)
-        start_date_str = start_dt.isoformat()
-        end_date_str = end_dt.isoformat()
-
-
-        # Consultar solo las fechas de las citas en el mes
-        appointments_query = supabase.table('appointments')\
-            .select('appointment_time')\
-            .gte('appointment_time', start_date_str)\
-            .lte('appointment_time', end_date_str)\
-            .execute()
-
-        if not hasattr(appointments_query, 'data'):
-             error_details = getattr(appointments_query, 'error', 'Unknown Supabase error')
-             current_app.logger.error(f"Error en Supabase al consultar citas por día: {error_details}")
-             return jsonify({"message": "Error al consultar datos de citas"}), 500
-
-        appointments = appointments_query.data
-        daily_counts = Counter()
-        for app in appointments:
-            try:
-                app_time = datetime.fromisoformat(app['appointment_time'])
-                day = app_time.day
-                daily_counts[day] += 1
-            except (ValueError, TypeError, KeyError):
-                 current_app.logger.warning(f"No se pudo procesar fecha: {app.get('appointment_time')}")
-                 continue 
-
-        
-        result = []
-        for day_num in range(1, days_in_month + 1):
-            result.append({
-                "day": day_num,
-                "count": daily_counts.get(day_num, 0) 
-            })
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
 
-        return jsonify(result), 200
+        return jsonify(_get_panel("appointments-by-day", year, month)), 200
 
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo citas por día: {e}")
         return jsonify({"message": "Error interno del servidor"}), 500
 
+def _fetch_doctors():
+    """Todos los doctores por id (para doctors-details), desde la tabla de referencia en memoria."""
+    return sorted(get_doctors_table().rows(), key=lambda doctor: doctor.get('id'))
+
 @dashboard_bp.route("/doctors-details", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_doctors_details(current_user):
     """Endpoint para obtener detalles completos de los doctores y sus citas."""
     try:
-        # Obtener parámetros de consulta
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Obtener todos los doctores
-        doctors_query = supabase.table('doctors')\
-            .select('id, name, specialty, email, phone_number')\
-            .execute()
-            
-        if hasattr(doctors_query, 'error') and doctors_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar doctores: {doctors_query.error}")
-            return jsonify({"message": "Error al consultar datos de doctores"}), 500
-            
-        doctors_data = doctors_query.data
-        
-        # Obtener citas para el periodo seleccionado
-        appointments_query = supabase.table('appointments')\
-            .select('id, doctor_id, appointment_time, status, patient:patients(id, name)')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments_data = appointments_query.data
-        
-        # Organizar citas por doctor
-        appointments_by_doctor = {}
-        for appointment in appointments_data:
-            doctor_id = appointment.get('doctor_id')
-            if doctor_id:
-                if doctor_id not in appointments_by_doctor:
-                    appointments_by_doctor[doctor_id] = []
-                    
-                # Formatear la fecha para mejor legibilidad
-                try:
-                    appt_time = datetime.fromisoformat(appointment['appointment_time'].replace('Z', '+00:00'))
-                    formatted_time = appt_time.strftime("%Y-%m-%d %H:%M")
-                except:
-                    formatted_time = appointment['appointment_time']
-                    
-                patient_name = appointment.get('patient', {}).get('name', 'Sin nombre')
-                
-                appointments_by_doctor[doctor_id].append({
-                    "id": appointment.get('id'),
-                    "dateTime": formatted_time,
-                    "patientName": patient_name,
-                    "status": appointment.get('status', 'pendiente')
-                })
-        
-        # Preparar respuesta con detalles de doctores y sus citas
-        result = []
-        for doctor in doctors_data:
-            doctor_id = doctor.get('id')
-            doctor_details = {
-                "id": doctor_id,
-                "name": doctor.get('name', 'Sin nombre'),
-                "specialty": doctor.get('specialty', ''),
-                "email": doctor.get('email', ''),
-                "phoneNumber": doctor.get('phone_number', ''),
-                "totalAppointments": len(appointments_by_doctor.get(doctor_id, [])),
-                "appointments": appointments_by_doctor.get(doctor_id, [])
-            }
-            result.append(doctor_details)
-        
-        return jsonify(result), 200
-        
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("doctors-details", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo detalles de doctores: {e}")
         return jsonify({"message": f"Error interno: {str(e)}"}), 500
 
 @dashboard_bp.route("/appointments-summary", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_appointments_summary(current_user):
     """Endpoint para obtener un resumen detallado de todas las citas."""
     try:
-        # Obtener parámetros de consulta
-        month = request.args.get('month', type=int)
-        year = request.args.get('year', type=int)
-        
-        if not month or not year:
-            return jsonify({"message": "Se requieren los parámetros 'month' y 'year'"}), 400
-            
-        # Validar rango de mes
-        if month < 1 or month > 12:
-            return jsonify({"message": "El mes debe estar entre 1 y 12"}), 400
-            
-        # Calcular primer y último día del mes
-        days_in_month = monthrange(year, month)[1]
-        start_date = f"{year}-{month:02d}-01T00:00:00Z"
-        end_date = f"{year}-{month:02d}-{days_in_month}T23:59:59Z"
-        
-        # Consultar citas en el mes con información detallada
-        appointments_query = supabase.table('appointments')\
-            .select('id, appointment_time, status, arrival_time, consultation_start_time, consultation_end_time, patient:patients(id, name), doctor:doctors(id, name)')\
-            .gte('appointment_time', start_date)\
-            .lte('appointment_time', end_date)\
-            .execute()
-            
-        if hasattr(appointments_query, 'error') and appointments_query.error:
-            current_app.logger.error(f"Error en Supabase al consultar citas: {appointments_query.error}")
-            return jsonify({"message": "Error al consultar datos de citas"}), 500
-            
-        appointments = appointments_query.data
-        
-        # Contadores para estadísticas
-        total_appointments = len(appointments)
-        status_count = Counter()
-        appointments_by_day = Counter()
-        
-        # Datos procesados de citas
-        processed_appointments = []
-        
-        for appointment in appointments:
-            # Contar por estado
-            status = appointment.get('status', 'pendiente')
-            status_count[status] += 1
-            
-            # Contar por día
-            try:
-                appt_time = datetime.fromisoformat(appointment['appointment_time'].replace('Z', '+00:00'))
-                day = appt_time.day
-                appointments_by_day[day] += 1
-                formatted_time = appt_time.strftime("%Y-%m-%d %H:%M")
-            except:
-                formatted_time = appointment.get('appointment_time', '')
-                day = 0
-            
-            # Calcular tiempo de espera si existe
-            wait_time = None
-            if appointment.get('arrival_time') and appointment.get('consultation_start_time'):
-                try:
-                    arrival = datetime.fromisoformat(appointment['arrival_time'].replace('Z', '+00:00'))
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    if start >= arrival:
-                        wait_time = int((start - arrival).total_seconds() / 60)
-                except Exception as e:
-                    current_app.logger.error(f"Error calculando tiempo de espera: {e}")
-            
-            # Calcular duración de consulta si existe
-            consult_time = None
-            if appointment.get('consultation_start_time') and appointment.get('consultation_end_time'):
-                try:
-                    start = datetime.fromisoformat(appointment['consultation_start_time'].replace('Z', '+00:00'))
-                    end = datetime.fromisoformat(appointment['consultation_end_time'].replace('Z', '+00:00'))
-                    if end >= start:
-                        consult_time = int((end - start).total_seconds() / 60)
-                except Exception as e:
-                    current_app.logger.error(f"Error calculando tiempo de consulta: {e}")
-            
-            # Agregar cita procesada
-            processed_appointments.append({
-                "id": appointment.get('id'),
-                "dateTime": formatted_time,
-                "status": status,
-                "patientName": appointment.get('patient', {}).get('name', 'Sin nombre'),
-                "doctorName": appointment.get('doctor', {}).get('name', 'Sin asignar'),
-                "waitTime": wait_time,
-                "consultTime": consult_time
-            })
-        
-        # Resultado final
-        result = {
-            "totalAppointments": total_appointments,
-            "statusCount": {
-                "pendiente": status_count.get('pendiente', 0),
-                "completada": status_count.get('completada', 0),
-                "cancelada": status_count.get('cancelada', 0),
-                "noAsistio": status_count.get('no_asistio', 0)
-            },
-            "appointmentsByDay": [{"day": day, "count": count} for day, count in sorted(appointments_by_day.items())],
-            "appointments": processed_appointments
-        }
-        
-        return jsonify(result), 200
-        
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        return jsonify(_get_panel("appointments-summary", year, month)), 200
+
     except Exception as e:
         current_app.logger.exception(f"Error obteniendo resumen de citas: {e}")
-        return jsonify({"message": f"Error interno: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"message": f"Error interno: {str(e)}"}), 500
+
+@dashboard_bp.route("/bundle", methods=["GET"])
+@token_required
+@conditional_get(CACHE_REVALIDATE)
+def get_dashboard_bundle(current_user):
+    """
+    Endpoint que devuelve varios paneles del dashboard en una sola respuesta.
+    Parámetro opcional 'panels': lista separada por comas (ej. stats,wait-time).
+    """
+    try:
+        month, year, error_response = _get_month_params()
+        if error_response:
+            return error_response
+
+        panels_param = request.args.get('panels')
+        if panels_param:
+            panels = [panel.strip() for panel in panels_param.split(',') if panel.strip()]
+        else:
+            panels = DEFAULT_BUNDLE_PANELS
+        unknown_panels = [panel for panel in panels if panel not in BUNDLE_PANELS]
+        if unknown_panels:
+            return jsonify({
+                "message": f"Paneles desconocidos: {unknown_panels}",
+                "available_panels": list(BUNDLE_PANELS)
+            }), 400
+
+        # Dos grupos independientes en paralelo: paneles del resumen (RPC) y paneles por cita.
+        # Dentro de cada grupo los paneles no cacheados comparten una sola consulta del mes
+        groups = {}
+        for panel in panels:
+            groups.setdefault("rows" if panel in ROW_LEVEL_PANELS else "summary", []).append(panel)
+        group_results = run_concurrently({
+            group: (lambda names=names: {panel: _get_panel(panel, year, month) for panel in names})
+            for group, names in groups.items()
+        })
+        result = {"month": month, "year": year}
+        for panel in panels:
+            group = "rows" if panel in ROW_LEVEL_PANELS else "summary"
+            result[panel] = group_results[group][panel]
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        current_app.logger.exception(f"Error obteniendo bundle del dashboard: {e}")
+        return jsonify({"message": f"Error interno: {str(e)}"}), 500
+
+@dashboard_bp.route("/export", methods=["GET"])
+@token_required
+def export_appointments(current_user):
+    """
+    Exporta las citas entre 'from' y 'to' (YYYY-MM-DD, ambos incluidos, UTC) en CSV o NDJSON.
+    La respuesta se genera en streaming, página a página.
+    """
+    current_app.logger.debug("Solicitud GET /dashboard/export por user ID: %s", current_user.id)
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": f"'format' debe ser uno de {sorted(EXPORT_FORMATS)}"}), 400
+    try:
+        date_from = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d')
+        date_to = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"message": "Se requieren 'from' y 'to' con formato YYYY-MM-DD"}), 400
+    if date_to < date_from:
+        return jsonify({"message": "'to' debe ser igual o posterior a 'from'"}), 400
+
+    start_iso = date_from.replace(tzinfo=timezone.utc).isoformat()
+    end_iso = (date_to + timedelta(days=1)).replace(tzinfo=timezone.utc).isoformat()
+    page_size = current_app.config.get('EXPORT_PAGE_SIZE', 500)
+
+    try:
+        # La primera página se pide antes de responder: un error de Supabase aún puede ser un 500
+        pages = iter_appointment_pages(start_iso, end_iso, page_size)
+        first_page = next(pages, None)
+    except Exception as e:
+        current_app.logger.exception(f"Error iniciando la exportación de citas: {e}")
+        return jsonify({"message": "Error exportando las citas"}), 500
+
+    def generate():
+        try:
+            all_pages = chain([first_page], pages) if first_page is not None else iter(())
+            yield from export_chunks(export_format, all_pages)
+        except Exception:
+            # Con la respuesta ya empezada no se puede cambiar el código: el archivo queda truncado
+            current_app.logger.exception("Error durante la exportación de citas; archivo truncado")
+            raise
+
+    filename = f"citas_{date_from:%Y-%m-%d}_{date_to:%Y-%m-%d}.{export_format}"
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -1,21 +1,64 @@
-from flask import jsonify, current_app
+from datetime import datetime
+from flask import request, jsonify, current_app
 from . import doctors_bp
-from app.extensions import get_supabase
-from app.utils.decorators import token_required
+from app.extensions import get_doctors_table, get_reference_data
+from app.utils.decorators import token_required, internal_token_required, conditional_get, CACHE_REFERENCE, CACHE_REVALIDATE
+from app.appointments.availability import free_slots
+from app.dashboard.cache import invalidate_reference_panels
 
-supabase = get_supabase()
 
 # CORRECCIÓN: Ruta base del blueprint debe ser "" si el prefijo ya tiene el nombre
 @doctors_bp.route("", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REFERENCE)
 def get_doctors(current_user):
     """Endpoint para obtener la lista de doctores."""
-    current_app.logger.info(f"Solicitud GET /doctors por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud GET /doctors por user ID: %s", current_user.id)
     try:
-        response = supabase.table('doctors').select('*').order('name').execute()
-        current_app.logger.debug(f"Respuesta de Supabase (doctores): {response}")
-        return jsonify(response.data or []), 200
+        # Tabla de referencia en memoria del worker (TTL: REFERENCE_DATA_TTL)
+        return jsonify(get_doctors_table().rows()), 200
 
     except Exception as e:
         current_app.logger.exception("Error obteniendo la lista de doctores")
-        return jsonify({"message": "Error obteniendo la lista de doctores"}), 500
\ No newline at end of file
+        return jsonify({"message": "Error obteniendo la lista de doctores"}), 500
+
+@doctors_bp.route("/cache/invalidate", methods=["POST"])
+@internal_token_required
+def invalidate_doctors_cache():
+    """
+    Descarta la copia en memoria de los doctores (tras editarlos en Supabase) y los
+    paneles del dashboard cacheados, que llevan nombres de doctor. Con la caché del
+    dashboard en Redis, los demás workers recargan sus doctores en su siguiente panel;
+    si no, se actualizan al vencer REFERENCE_DATA_TTL.
+    Endpoint interno de operación: requiere METRICS_TOKEN, no un token de usuario.
+    """
+    current_app.logger.info("Invalidación de la caché de doctores")
+    reference_data = get_reference_data()
+    invalidated = reference_data.invalidate('doctors')
+    invalidate_reference_panels()
+    return jsonify({"invalidated": invalidated, "stats": reference_data.stats()}), 200
+
+@doctors_bp.route("/<int:doctor_id>/availability", methods=["GET"])
+@token_required
+@conditional_get(CACHE_REVALIDATE)
+def get_doctor_availability(current_user, doctor_id):
+    """Endpoint para obtener los huecos libres de un doctor en un día (UTC)."""
+    current_app.logger.debug("Solicitud GET /doctors/%s/availability por user ID: %s", doctor_id, current_user.id)
+    try:
+        day = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"message": "Se requiere 'date' con formato YYYY-MM-DD"}), 400
+    slot_minutes = request.args.get('slot_minutes', 30, type=int)
+    if slot_minutes is None or slot_minutes < 5 or slot_minutes > 240:
+        return jsonify({"message": "'slot_minutes' debe estar entre 5 y 240"}), 400
+    try:
+        day_start = datetime.strptime(request.args.get('start', current_app.config.get('AVAILABILITY_DAY_START', '08:00')), '%H:%M').time()
+        day_end = datetime.strptime(request.args.get('end', current_app.config.get('AVAILABILITY_DAY_END', '18:00')), '%H:%M').time()
+    except ValueError:
+        return jsonify({"message": "'start' y 'end' deben tener formato HH:MM"}), 400
+
+    try:
+        return jsonify(free_slots(doctor_id, day, slot_minutes, day_start, day_end)), 200
+    except Exception as e:
+        current_app.logger.exception(f"Error obteniendo disponibilidad del doctor {doctor_id}")
+        return jsonify({"message": "Error obteniendo la disponibilidad del doctor"}), 500
@@ -1,27 +1,206 @@
 # Inicialización de extensiones y clientes externos
 
-from supabase import create_client, Client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+import httpx
 from flask_cors import CORS
+from app.utils.cache import TTLCache, MemoryCacheBackend, RedisCacheBackend
+from app.utils.events import MemoryEventBroker, RedisEventBroker, StreamSlots
+from app.utils.reference_data import ReferenceDataCache
+from app.utils.metrics import MetricsRegistry, CALL_COUNT_BUCKETS
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Crear instancias globales (se inicializarán en la fábrica de la app)
 # CORS ahora se inicializa directamente en create_app(), no aquí
 cors = CORS()
-supabase: Client = None # Se inicializará en create_app
+supabase: 'Client' = None # Se crea en el primer get_supabase() (o en init_supabase si no es perezoso)
+_supabase_settings: tuple = None # (url, key, http_client) guardados por init_supabase
+_supabase_lock = threading.Lock()
+supabase_http: httpx.Client = None # Cliente HTTP compartido por los subclientes de Supabase
+supabase_transport = None # Transporte con el pool de conexiones (estadísticas / reinicio tras fork)
+token_cache: TTLCache = None # Caché token -> usuario para token_required
+token_revocations = None # Backend de caché con los tokens cerrados por logout
+dashboard_cache = None # Backend de caché de resultados del dashboard
+patient_search_cache: TTLCache = None # Caché (texto, límite) -> resultados de /patients/search
+availability_cache: TTLCache = None # Caché (doctor_id, día) -> índice de citas para disponibilidad
+reference_data: ReferenceDataCache = None # Tablas de referencia en memoria (doctores)
+event_broker = None # Broker pub/sub de los streams SSE
+stream_slots: StreamSlots = None # Cupo de streams SSE abiertos en el worker
+fanout_executor: ThreadPoolExecutor = None # Pool compartido para consultas concurrentes
+request_metrics: MetricsRegistry = None # Histogramas por worker expuestos en /api/v1/metrics
 
-def init_supabase(url: str, key: str):
-    """Inicializa el cliente global de Supabase."""
-    global supabase
+def init_supabase(url: str, key: str, http_client: httpx.Client = None, transport=None, lazy: bool = False):
+    """
+    Configura el cliente global de Supabase.
+    Si se pasa `http_client`, todos los subclientes (postgrest, auth, storage, functions) lo comparten.
+    Con `lazy`, el cliente se crea en el primer get_supabase(): el paquete supabase
+    (postgrest, realtime, storage3, functions...) no se importa al arrancar.
+    """
+    global supabase, supabase_http, supabase_transport, _supabase_settings
     if not url or not key:
          raise ValueError("Supabase URL y Key son requeridos para inicializar el cliente.")
-    try:
+    with _supabase_lock:
+        supabase = None
+        supabase_http = http_client
+        supabase_transport = transport
+        _supabase_settings = (url, key, http_client)
+        if not lazy:
+            _create_supabase()
+
+def _create_supabase():
+    """Construye el cliente con los datos de init_supabase (con _supabase_lock tomado)."""
+    global supabase
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+    url, key, http_client = _supabase_settings
+    if http_client is not None:
+        supabase = create_client(url, key, options=SyncClientOptions(httpx_client=http_client))
+    else:
         supabase = create_client(url, key)
-        # print("Supabase client initialized via extensions.") # Debug print
-    except Exception as e:
-        # print(f"Error initializing Supabase client via extensions: {e}") # Debug print
-        raise e # Relanzar excepción para que la app falle si no se puede conectar
-
-def get_supabase() -> Client:
-    """Devuelve la instancia inicializada del cliente Supabase."""
-    if supabase is None:
-        raise RuntimeError("Supabase client no ha sido inicializado.")
-    return supabase
\ No newline at end of file
+
+def get_supabase() -> 'Client':
+    """Devuelve el cliente Supabase, creándolo en el primer uso."""
+    client = supabase
+    if client is not None:
+        return client
+    with _supabase_lock:
+        if supabase is None:
+            if _supabase_settings is None:
+                raise RuntimeError("Supabase client no ha sido inicializado.")
+            _create_supabase()
+        return supabase
+
+def reset_supabase_connections():
+    """Abre un pool de conexiones nuevo para este proceso (p. ej. en el worker tras el fork)."""
+    if supabase_transport is not None:
+        supabase_transport.reset()
+
+def get_supabase_pool_stats() -> dict:
+    """Estadísticas del pool de conexiones HTTP hacia Supabase, o None si usa el cliente por defecto."""
+    if supabase_transport is None:
+        return None
+    return supabase_transport.stats()
+
+def init_token_cache(maxsize: int, ttl: float):
+    """Inicializa la caché global de tokens validados."""
+    global token_cache
+    token_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+def get_token_cache() -> TTLCache:
+    """Devuelve la caché de tokens, o None si está deshabilitada."""
+    return token_cache
+
+def init_token_revocations(backend: str, maxsize: int = 1024, redis_url: str = None):
+    """Inicializa la lista de tokens revocados ('memory', 'redis' o 'none')."""
+    global token_revocations
+    if backend == 'redis':
+        token_revocations = RedisCacheBackend(redis_url)
+    elif backend == 'memory':
+        token_revocations = MemoryCacheBackend(maxsize=maxsize)
+    else:
+        token_revocations = None
+
+def get_token_revocations():
+    """Devuelve el backend de tokens revocados, o None si está deshabilitado."""
+    return token_revocations
+
+def init_dashboard_cache(backend: str, maxsize: int = 256, redis_url: str = None):
+    """Inicializa la caché de resultados del dashboard ('memory', 'redis' o 'none')."""
+    global dashboard_cache
+    if backend == 'redis':
+        dashboard_cache = RedisCacheBackend(redis_url)
+    elif backend == 'memory':
+        dashboard_cache = MemoryCacheBackend(maxsize=maxsize)
+    else:
+        dashboard_cache = None
+
+def get_dashboard_cache():
+    """Devuelve el backend de caché del dashboard, o None si está deshabilitado."""
+    return dashboard_cache
+
+def init_patient_search_cache(maxsize: int, ttl: float):
+    """Inicializa la caché LRU de búsquedas de pacientes."""
+    global patient_search_cache
+    patient_search_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+def get_patient_search_cache() -> TTLCache:
+    """Devuelve la caché de búsquedas de pacientes, o None si está deshabilitada."""
+    return patient_search_cache
+
+def init_fanout_executor(max_workers: int):
+    """Inicializa el pool de hilos compartido para consultas concurrentes (0 lo deshabilita)."""
+    global fanout_executor
+    if fanout_executor is not None:
+        fanout_executor.shutdown(wait=False)
+    fanout_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout') if max_workers > 0 else None
+
+def get_fanout_executor() -> ThreadPoolExecutor:
+    """Devuelve el pool de consultas concurrentes, o None si está deshabilitado."""
+    return fanout_executor
+
+def init_availability_cache(maxsize: int, ttl: float):
+    """Inicializa la caché de índices de disponibilidad por doctor y día."""
+    global availability_cache
+    availability_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+def get_availability_cache() -> TTLCache:
+    """Devuelve la caché de disponibilidad, o None si está deshabilitada."""
+    return availability_cache
+
+def init_event_broker(backend: str, queue_size: int = 100, redis_url: str = None):
+    """Inicializa el broker de eventos ('memory', 'redis' o 'none')."""
+    global event_broker
+    if backend == 'redis':
+        event_broker = RedisEventBroker(redis_url)
+    elif backend == 'memory':
+        event_broker = MemoryEventBroker(queue_size=queue_size)
+    else:
+        event_broker = None
+
+def get_event_broker():
+    """Devuelve el broker de eventos, o None si está deshabilitado."""
+    return event_broker
+
+def init_stream_slots(limit: int):
+    """Inicializa el cupo de streams SSE por worker (0 = sin límite)."""
+    global stream_slots
+    stream_slots = StreamSlots(limit) if limit > 0 else None
+
+def get_stream_slots() -> StreamSlots:
+    """Devuelve el cupo de streams SSE, o None si no hay límite."""
+    return stream_slots
+
+def init_reference_data(ttl: float):
+    """Inicializa la caché de tablas de referencia y registra las tablas conocidas."""
+    global reference_data
+    reference_data = ReferenceDataCache(get_supabase, ttl=ttl)
+    # Mismo orden que GET /doctors
+    reference_data.register('doctors', select='*', order='name')
+
+def get_reference_data() -> ReferenceDataCache:
+    """Devuelve la caché de tablas de referencia."""
+    if reference_data is None:
+        raise RuntimeError("La caché de datos de referencia no ha sido inicializada.")
+    return reference_data
+
+def get_doctors_table():
+    """Atajo a la tabla de referencia de doctores."""
+    return get_reference_data().table('doctors')
+
+def init_request_metrics():
+    """Inicializa el registro de métricas y los histogramas de la instrumentación por petición."""
+    global request_metrics
+    request_metrics = MetricsRegistry()
+    request_metrics.histogram('http_request_duration_seconds', 'Duración de las peticiones a la API',
+                              ('method', 'endpoint', 'status'))
+    request_metrics.histogram('http_request_supabase_calls', 'Llamadas a Supabase por petición a la API',
+                              ('method', 'endpoint'), buckets=CALL_COUNT_BUCKETS)
+    request_metrics.histogram('supabase_request_duration_seconds', 'Duración de las llamadas a Supabase por operación',
+                              ('operation', 'status'))
+
+def get_request_metrics() -> MetricsRegistry:
+    """Devuelve el registro de métricas, o None si están deshabilitadas."""
+    return request_metrics
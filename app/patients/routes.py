@@ -1,16 +1,21 @@
 from flask import request, jsonify, current_app
+from werkzeug.local import LocalProxy
 from . import patients_bp
 from app.extensions import get_supabase
-from app.utils.decorators import token_required
+from app.utils.decorators import token_required, conditional_get, CACHE_REVALIDATE
+from app.utils.pagination import get_page_params, apply_keyset, build_page
+from app.utils.log_config import summarize_response
+from .search import search_patients as search_patient_names, invalidate_patient_search, MAX_SEARCH_LIMIT
 
-supabase = get_supabase()
+# Proxy: el cliente se crea en el primer uso, no al importar el blueprint
+supabase = LocalProxy(get_supabase)
 
 # CORRECCIÓN: Ruta base del blueprint debe ser "" si el prefijo ya tiene el nombre
 @patients_bp.route("", methods=["POST"])
 @token_required
 def create_patient(current_user):
     """Endpoint para crear un nuevo paciente."""
-    current_app.logger.info(f"Solicitud POST /patients por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud POST /patients por user ID: %s", current_user.id)
     data = request.get_json()
 
     if not data or not data.get('name'):
@@ -25,10 +30,11 @@ def create_patient(current_user):
         patient_data = {k: v for k, v in patient_data.items() if v is not None}
 
         response = supabase.table('patients').insert(patient_data).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (create patient): {response}")
+        current_app.logger.debug("Respuesta de Supabase (create patient): %s", summarize_response(response))
 
         if response.data:
             current_app.logger.info(f"Paciente creado con ID: {response.data[0]['id']}")
+            invalidate_patient_search()
             return jsonify(response.data[0]), 201
         else:
             error_message = "Error al crear el paciente"
@@ -44,18 +50,32 @@ def create_patient(current_user):
 # CORRECCIÓN: Ruta base del blueprint debe ser "" si el prefijo ya tiene el nombre
 @patients_bp.route("", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_patients(current_user):
     """Endpoint para obtener la lista de pacientes."""
-    current_app.logger.info(f"Solicitud GET /patients por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud GET /patients por user ID: %s", current_user.id)
     try:
         search_term = request.args.get('search')
-        query = supabase.table('patients').select('*').order('name')
+        # Paginación opcional por cursor sobre (name, id); sin ella se devuelve la lista completa
+        page, error_response = get_page_params()
+        if error_response:
+            return error_response
+        count_method = page["count"] if page and not page["cursor"] else None
+
+        query = supabase.table('patients').select('*', count=count_method)
 
         if search_term:
             query = query.ilike('name', f'%{search_term}%')
 
+        if page:
+            query = apply_keyset(query, 'name', False, page)
+        else:
+            query = query.order('name')
+
         response = query.execute()
-        current_app.logger.debug(f"Respuesta de Supabase (get patients): {response}")
+        current_app.logger.debug("Respuesta de Supabase (get patients): %s", summarize_response(response))
+        if page:
+            return jsonify(build_page(response.data or [], 'name', page, total=response.count)), 200
         return jsonify(response.data or []), 200
 
     except Exception as e:
@@ -63,16 +83,39 @@ def get_patients(current_user):
         return jsonify({"message": "Error obteniendo la lista de pacientes"}), 500
 
 
+@patients_bp.route("/search", methods=["GET"])
+@token_required
+def search_patients(current_user):
+    """Endpoint de búsqueda rápida (type-ahead): devuelve [{id, name}] de los mejores resultados."""
+    query = (request.args.get('q') or '').strip()
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"message": "'limit' debe ser un número entero"}), 400
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        return jsonify({"message": f"'limit' debe estar entre 1 y {MAX_SEARCH_LIMIT}"}), 400
+
+    if len(query) < current_app.config.get('PATIENT_SEARCH_MIN_CHARS', 2):
+        return jsonify([]), 200
+
+    try:
+        return jsonify(search_patient_names(query, limit)), 200
+    except Exception as e:
+        current_app.logger.exception("Error buscando pacientes")
+        return jsonify({"message": "Error buscando pacientes"}), 500
+
 @patients_bp.route("/<int:patient_id>", methods=["GET"])
 @token_required
+@conditional_get(CACHE_REVALIDATE)
 def get_patient_by_id(current_user, patient_id):
     """Endpoint para obtener un paciente por su ID."""
-    current_app.logger.info(f"Solicitud GET /patients/{patient_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud GET /patients/%s por user ID: %s", patient_id, current_user.id)
     try:
         response = supabase.table('patients').select('*').eq('id', patient_id).maybe_single().execute()
-        current_app.logger.debug(f"Respuesta de Supabase (get patient by id): {response}")
+        current_app.logger.debug("Respuesta de Supabase (get patient by id): %s", summarize_response(response))
 
-        if response.data:
+        # maybe_single() devuelve None cuando no hay filas
+        if response and response.data:
             return jsonify(response.data), 200
         else:
             return jsonify({"message": "Paciente no encontrado"}), 404
@@ -86,7 +129,7 @@ def get_patient_by_id(current_user, patient_id):
 @token_required
 def update_patient(current_user, patient_id):
     """Endpoint para actualizar un paciente."""
-    current_app.logger.info(f"Solicitud PUT /patients/{patient_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud PUT /patients/%s por user ID: %s", patient_id, current_user.id)
     data = request.get_json()
     if not data:
         return jsonify({"message": "Datos requeridos en el body"}), 400
@@ -104,7 +147,7 @@ def update_patient(current_user, patient_id):
 
         # 1. Ejecutar la actualización (sin .select())
         update_response = supabase.table('patients').update(update_data).eq('id', patient_id).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (update patient): {update_response}")
+        current_app.logger.debug("Respuesta de Supabase (update patient): %s", summarize_response(update_response))
 
         # 2. Verificar si hubo error en la actualización
         if hasattr(update_response, 'error') and update_response.error:
@@ -114,9 +157,11 @@ def update_patient(current_user, patient_id):
                  return jsonify({"message": "Paciente no encontrado para actualizar"}), 404
             return jsonify({"message": error_message}), 400
 
+        invalidate_patient_search()
+
         # 3. Si la actualización no dio error, obtener los datos actualizados para devolverlos
         fetch_response = supabase.table('patients').select('*').eq('id', patient_id).maybe_single().execute()
-        current_app.logger.debug(f"Respuesta de Supabase (fetch after update patient): {fetch_response}")
+        current_app.logger.debug("Respuesta de Supabase (fetch after update patient): %s", summarize_response(fetch_response))
 
         if fetch_response.data:
             current_app.logger.info(f"Paciente actualizado con ID: {patient_id}")
@@ -134,19 +179,20 @@ def update_patient(current_user, patient_id):
 @token_required
 def delete_patient(current_user, patient_id):
     """Endpoint para eliminar un paciente."""
-    current_app.logger.info(f"Solicitud DELETE /patients/{patient_id} por user ID: {current_user.id}")
+    current_app.logger.debug("Solicitud DELETE /patients/%s por user ID: %s", patient_id, current_user.id)
     try:
         check_response = supabase.table('patients').select('id', count='exact').eq('id', patient_id).execute()
         if check_response.count == 0:
              return jsonify({"message": "Paciente no encontrado"}), 404
 
         response = supabase.table('patients').delete().eq('id', patient_id).execute()
-        current_app.logger.debug(f"Respuesta de Supabase (delete patient): {response}")
+        current_app.logger.debug("Respuesta de Supabase (delete patient): %s", summarize_response(response))
 
         if hasattr(response, 'error') and response.error:
              current_app.logger.error(f"Error en Supabase al eliminar paciente {patient_id}: {response.error.message}")
              return jsonify({"message": response.error.message}), 500
 
+        invalidate_patient_search()
         current_app.logger.info(f"Paciente eliminado con ID: {patient_id}")
         return '', 204
 
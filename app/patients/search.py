@@ -0,0 +1,90 @@
+# Búsqueda rápida de pacientes por nombre (type-ahead)
+#
+# Usa el RPC search_patients (índice trigram sin acentos); si no está desplegado
+# se recurre a ilike sobre el texto tal como se escribió (sin espacios en los
+# extremos), con % y _ escapados para buscarlos literalmente. Los resultados se
+# guardan en una LRU por proceso: los prefijos más tecleados se sirven sin
+# consultar Supabase.
+
+import unicodedata
+from flask import current_app
+from app.extensions import get_supabase, get_patient_search_cache
+from app.utils.helpers import is_missing_rpc_error
+
+SEARCH_RPC = 'search_patients'
+MAX_SEARCH_LIMIT = 50
+
+_rpc_available = True
+
+
+def normalize_query(text: str) -> str:
+    """Minúsculas, sin acentos y con espacios simples (misma normalización que el índice)."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    without_accents = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(without_accents.casefold().split())
+
+
+def escape_like(text: str) -> str:
+    """Escapa los comodines de LIKE (\\, % y _) para buscarlos como texto literal."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_with_rpc(term: str, limit: int) -> list:
+    response = get_supabase().rpc(SEARCH_RPC, {"q": term, "max_results": limit}).execute()
+    return [{"id": row['id'], "name": row['name']} for row in (response.data or [])]
+
+
+def _search_with_ilike(raw: str, term: str, limit: int) -> list:
+    """Alternativa sin RPC: ilike sobre el nombre, con los que empiezan por el texto primero.
+
+    Sin el índice unaccent, la columna conserva los acentos: se busca el texto
+    original ("José" no debe convertirse en "jose").
+    """
+    response = get_supabase().table('patients')\
+        .select('id, name')\
+        .ilike('name', f'%{escape_like(raw)}%')\
+        .order('name')\
+        .limit(limit)\
+        .execute()
+    rows = response.data or []
+    rows.sort(key=lambda row: not normalize_query(row.get('name')).startswith(term))
+    return [{"id": row['id'], "name": row['name']} for row in rows]
+
+
+def search_patients(query: str, limit: int) -> list:
+    """Devuelve hasta `limit` pacientes [{id, name}] ordenados por relevancia."""
+    global _rpc_available
+    raw = (query or '').strip()
+    term = normalize_query(query)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    cache = get_patient_search_cache()
+    # ilike distingue acentos: el texto original también forma parte de la clave
+    cache_key = (term, raw.casefold(), limit)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    results = None
+    if _rpc_available:
+        try:
+            results = _search_with_rpc(term, limit)
+        except Exception as e:
+            if is_missing_rpc_error(e):
+                _rpc_available = False
+                current_app.logger.warning(f"RPC {SEARCH_RPC} no disponible, buscando con ilike")
+            else:
+                current_app.logger.error(f"Error en RPC {SEARCH_RPC}: {e}")
+    if results is None:
+        results = _search_with_ilike(raw, term, limit)
+
+    if cache is not None:
+        cache.set(cache_key, results)
+    return results
+
+
+def invalidate_patient_search():
+    """Descarta los resultados cacheados (tras crear, editar o eliminar pacientes)."""
+    cache = get_patient_search_cache()
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,158 @@
+# Cachés en memoria del proceso y backends intercambiables (memoria / Redis)
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada. Segura entre hilos.
+
+    Cada entrada guarda su instante de expiración; al superar `maxsize`
+    se descarta la entrada usada menos recientemente.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def delete_matching(self, predicate) -> int:
+        """Elimina las entradas cuya clave cumple `predicate(key)`. Devuelve cuántas eliminó."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+class MemoryCacheBackend:
+    """Backend de caché en memoria del proceso (un worker). Guarda los objetos tal cual."""
+
+    def __init__(self, maxsize: int = 256, default_ttl: float = 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=default_ttl)
+        self._counters = {}
+        self._counters_lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl: float):
+        self._cache.set(key, value, ttl)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def add(self, key, value, ttl: float) -> bool:
+        """Guarda el valor solo si la clave no existe. True si se guardó."""
+        with self._counters_lock:
+            if self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, ttl)
+            return True
+
+    def get_counter(self, key) -> int:
+        with self._counters_lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key) -> int:
+        with self._counters_lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class RedisCacheBackend:
+    """Backend compatible con Redis (Redis, Valkey, KeyDB...), compartido entre workers.
+
+    Los valores se serializan a JSON. Requiere el paquete opcional 'redis'.
+    """
+
+    def __init__(self, url: str, prefix: str = 'consul:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("El backend de caché 'redis' requiere instalar el paquete 'redis'")
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float):
+        if ttl > 0:
+            self._client.set(self._prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+
+    def add(self, key, value, ttl: float) -> bool:
+        return bool(self._client.set(self._prefix + key, json.dumps(value), ex=max(1, int(ttl)), nx=True))
+
+    def get_counter(self, key) -> int:
+        return int(self._client.get(self._prefix + key) or 0)
+
+    def incr(self, key) -> int:
+        return self._client.incr(self._prefix + key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,67 @@
+# Compresión de respuestas (gzip / brotli) negociada con Accept-Encoding
+#
+# Solo se comprimen respuestas de texto/JSON por encima de COMPRESSION_MIN_SIZE:
+# en cuerpos pequeños el coste de CPU no compensa. Los streams (SSE, exportaciones)
+# se envían tal cual para no retener los fragmentos en un buffer.
+
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError: # Dependencia opcional (pip install brotli)
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+}
+
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+
+def _choose_encoding() -> str:
+    """Mejor codificación aceptada por el cliente, o None."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress_response(response, config):
+    """Comprime el cuerpo si el cliente lo acepta y supera el umbral; marca Vary y ETag débil."""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < config.get('COMPRESSION_MIN_SIZE', 1024):
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=config.get('COMPRESSION_BROTLI_QUALITY', 4))
+    else:
+        compressed = gzip.compress(data, compresslevel=config.get('COMPRESSION_GZIP_LEVEL', 6), mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    # El ETag fuerte identifica los bytes sin comprimir: la versión comprimida es otra representación
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Registra la compresión como after_request si COMPRESSION_ENABLED."""
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, app.config)
@@ -0,0 +1,64 @@
+# Ejecución concurrente de consultas independientes dentro de una petición
+#
+# Las llamadas a Supabase son E/S bloqueante, así que un pool de hilos acotado y
+# compartido basta para que la latencia sea la de la consulta más lenta y no la suma.
+# Cada tarea corre en una copia del contexto (contextvars), por lo que current_app,
+# g y request siguen disponibles dentro de la función.
+
+import contextvars
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import current_app
+from app.extensions import get_fanout_executor
+
+# Marca las tareas que ya corren dentro del pool: un fan-out anidado se ejecuta en
+# línea para no bloquear el pool esperando a hijos que no tienen hilo libre
+_inside_fan_out = contextvars.ContextVar('inside_fan_out', default=False)
+
+
+class FanOutTimeout(TimeoutError):
+    """Una de las llamadas concurrentes superó su tiempo máximo."""
+
+
+def _run_in_worker(func):
+    _inside_fan_out.set(True)
+    return func()
+
+
+def run_concurrently(calls: dict, timeout: float = None) -> dict:
+    """
+    Ejecuta en paralelo las funciones de `calls` ({nombre: callable o (callable, timeout)})
+    y devuelve {nombre: resultado}. Si una llamada falla se propaga su excepción;
+    si supera su timeout se lanza FanOutTimeout.
+    """
+    executor = get_fanout_executor()
+    if timeout is None:
+        timeout = current_app.config.get('FANOUT_TIMEOUT', 10)
+
+    normalized = {}
+    for name, call in calls.items():
+        func, call_timeout = call if isinstance(call, tuple) else (call, timeout)
+        normalized[name] = (func, call_timeout)
+
+    # Sin pool, con una sola llamada o ya dentro del pool: ejecución secuencial
+    if executor is None or len(normalized) < 2 or _inside_fan_out.get():
+        return {name: func() for name, (func, _) in normalized.items()}
+
+    started = time.monotonic()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _run_in_worker, func)
+        for name, (func, _) in normalized.items()
+    }
+    results = {}
+    try:
+        for name, future in futures.items():
+            call_timeout = normalized[name][1]
+            remaining = None if call_timeout is None else max(0, call_timeout - (time.monotonic() - started))
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                raise FanOutTimeout(f"La llamada '{name}' superó {call_timeout}s")
+    finally:
+        for future in futures.values():
+            future.cancel()
+    return results
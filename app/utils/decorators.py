@@ -1,18 +1,125 @@
 # Decoradores personalizados
 
 import functools
-from flask import request, jsonify, current_app # Importar current_app para logger
-from app.extensions import get_supabase # Importar el getter de Supabase
+import hmac
+from flask import request, jsonify, current_app, make_response # Importar current_app para logger
+from app.extensions import get_supabase, get_token_cache, get_token_revocations # Importar el getter de Supabase
+from app.utils.jwt_auth import (
+    verify_token_locally, token_cache_key, token_seconds_left,
+    TokenVerificationError, LocalVerificationUnavailable,
+)
+from app.utils.stream_tickets import read_stream_ticket, mark_ticket_used, ticket_user
+
+def _get_user_remote(token):
+    """Valida el token contra Supabase (auth.get_user) y devuelve el usuario."""
+    user_response = get_supabase().auth.get_user(token)
+    current_user = user_response.user if user_response else None
+    if not current_user:
+        raise Exception("Token inválido o expirado (get_user devolvió None)")
+    return current_user
+
+def authenticate_token(token):
+    """
+    Devuelve el usuario asociado al token según AUTH_VERIFY_MODE.
+    Lanza una excepción si el token no es válido.
+    """
+    config = current_app.config
+    if config.get('AUTH_VERIFY_MODE') != 'local':
+        return _get_user_remote(token)
+
+    try:
+        return verify_token_locally(token, config)
+    except LocalVerificationUnavailable as e:
+        if not config.get('AUTH_REMOTE_FALLBACK'):
+            raise
+        current_app.logger.warning(f"Verificación local no disponible ({e}), usando auth.get_user")
+        return _get_user_remote(token)
+
+def _revocation_key(key: str) -> str:
+    return f"auth:revoked:{key}"
+
+def is_token_revoked(key: str) -> bool:
+    """True si el token (por su hash) se cerró con /auth/logout. Si el backend falla, no bloquea."""
+    revocations = get_token_revocations()
+    if revocations is None:
+        return False
+    try:
+        return revocations.get(_revocation_key(key)) is not None
+    except Exception as e:
+        current_app.logger.warning("Lista de tokens revocados no disponible: %s", e)
+        return False
+
+def authenticate_token_cached(token):
+    """
+    Igual que authenticate_token, pero reutiliza usuarios ya validados.
+    La entrada caduca con AUTH_CACHE_TTL o con el 'exp' del token, lo que ocurra antes.
+    Los tokens revocados por logout se rechazan antes de mirar la caché.
+    """
+    key = token_cache_key(token)
+    if is_token_revoked(key):
+        raise TokenVerificationError("Token revocado (logout)")
+
+    cache = get_token_cache()
+    if cache is None:
+        return authenticate_token(token)
+
+    current_user = cache.get(key)
+    if current_user is not None:
+        return current_user
+
+    current_user = authenticate_token(token)
+    seconds_left = token_seconds_left(token)
+    if seconds_left is not None:
+        cache.set(key, current_user, min(cache.ttl, seconds_left))
+    return current_user
+
+def invalidate_cached_token(token):
+    """
+    Elimina el token de la caché y lo registra como revocado hasta su 'exp' (logout).
+    Con AUTH_REVOCATION_BACKEND=redis la revocación vale en todos los workers.
+    """
+    key = token_cache_key(token)
+    cache = get_token_cache()
+    if cache is not None:
+        cache.delete(key)
+    revocations = get_token_revocations()
+    seconds_left = token_seconds_left(token)
+    # Sin 'exp' legible el token nunca se cachea: cada petición lo valida contra Supabase
+    if revocations is None or seconds_left is None or seconds_left <= 0:
+        return
+    try:
+        revocations.set(_revocation_key(key), True, seconds_left)
+    except Exception as e:
+        current_app.logger.warning("No se pudo registrar la revocación del token: %s", e)
 
 def token_required(f):
     """
     Decorador para verificar el token de autenticación de Supabase.
     El token debe venir en el header 'Authorization: Bearer <token>'
     """
+    return _require_token(f, allow_query_token=False)
+
+def stream_token_required(f):
+    """
+    Igual que token_required, pero acepta también '?ticket=<ticket>' (POST /appointments/stream/ticket).
+    EventSource (SSE) no permite enviar headers desde el navegador; el JWT nunca va en la URL.
+    """
+    return _require_token(f, allow_query_token=True)
+
+def authenticate_stream_ticket(ticket):
+    """Usuario del ticket de stream. Cada ticket se canjea una sola vez y muere con el logout del token."""
+    claims = read_stream_ticket(ticket, current_app.config['SECRET_KEY'])
+    if is_token_revoked(claims['tok']):
+        raise TokenVerificationError("Token revocado (logout)")
+    if not mark_ticket_used(claims, get_token_revocations()):
+        raise TokenVerificationError("Ticket de stream ya utilizado")
+    return ticket_user(claims)
+
+def _require_token(f, allow_query_token: bool):
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
         token = None
-        supabase_client = get_supabase() # Obtener cliente Supabase
+        ticket = None
 
         if 'Authorization' in request.headers:
             auth_header = request.headers['Authorization']
@@ -21,23 +128,71 @@ def token_required(f):
             except IndexError:
                 current_app.logger.warning("Token mal formateado recibido.")
                 return jsonify({"message": "Token inválido o mal formateado"}), 401
+        elif allow_query_token:
+            ticket = request.args.get('ticket')
 
-        if not token:
+        if not token and not ticket:
             current_app.logger.warning("Intento de acceso sin token.")
             return jsonify({"message": "Token de autorización faltante"}), 401
 
         try:
-            user_response = supabase_client.auth.get_user(token)
-            current_user = user_response.user
-            if not current_user:
-                 raise Exception("Token inválido o expirado (get_user devolvió None)")
-
             # Pasar el usuario autenticado a la función de la ruta
-            kwargs['current_user'] = current_user
+            if token:
+                kwargs['current_user'] = authenticate_token_cached(token)
+            else:
+                kwargs['current_user'] = authenticate_stream_ticket(ticket)
 
+        except TokenVerificationError as e:
+            current_app.logger.warning("Token rechazado: %s", e)
+            return jsonify({"message": "Token inválido o expirado"}), 401
         except Exception as e:
             current_app.logger.error(f"Error de autenticación: {e}")
             return jsonify({"message": "Token inválido o expirado"}), 401
 
         return f(*args, **kwargs)
     return decorated_function
+
+def internal_token_valid() -> bool:
+    """Bearer METRICS_TOKEN para los endpoints internos (métricas, pool, cachés); sin token no hay acceso."""
+    expected = current_app.config.get('METRICS_TOKEN')
+    if not expected:
+        return False
+    provided = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
+def internal_token_required(f):
+    """
+    Decorador para endpoints internos de operación: requieren 'Authorization: Bearer <METRICS_TOKEN>'.
+    Sin METRICS_TOKEN configurado el endpoint no existe (404).
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_app.config.get('METRICS_TOKEN'):
+            return jsonify({"message": "No encontrado"}), 404
+        if not internal_token_valid():
+            return jsonify({"message": "No autorizado"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Políticas de Cache-Control (respuestas por usuario: siempre 'private')
+CACHE_REVALIDATE = 'private, no-cache' # El navegador guarda la respuesta pero revalida con If-None-Match
+CACHE_REFERENCE = 'private, max-age=60' # Datos de referencia que cambian poco (doctores)
+
+def conditional_get(cache_control: str = CACHE_REVALIDATE):
+    """
+    Añade un ETag fuerte (hash del cuerpo) y Cache-Control a las respuestas 200 de GET.
+    Si el cliente envía If-None-Match con el mismo ETag responde 304 sin cuerpo.
+    Va debajo de token_required: las respuestas de error no se marcan.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.is_streamed:
+                return response
+            response.add_etag()
+            response.headers['Cache-Control'] = cache_control
+            response.vary.add('Authorization')
+            return response.make_conditional(request)
+        return decorated_function
+    return decorator
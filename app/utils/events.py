@@ -0,0 +1,141 @@
+# Publicación/suscripción de eventos para los streams SSE
+#
+# Los handlers de escritura publican en un canal y cada conexión SSE abierta tiene
+# su propia suscripción. MemoryEventBroker reparte los eventos dentro del proceso;
+# con varios workers (gunicorn) se usa RedisEventBroker para que un cambio hecho en
+# un worker llegue a los clientes conectados a los demás.
+
+import json
+import queue
+import threading
+
+
+class MemoryEventBroker:
+    """Broker en memoria del proceso: una cola acotada por suscriptor."""
+
+    def __init__(self, queue_size: int = 100):
+        self._queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: dict):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, channel: str) -> 'MemorySubscription':
+        subscription = MemorySubscription(self, channel, self._queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: 'MemorySubscription'):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "subscribers": {channel: len(subs) for channel, subs in self._subscribers.items()},
+            }
+
+
+class MemorySubscription:
+    """
+    Cola de eventos de una conexión. Si el cliente no consume a tiempo y la cola se
+    llena, se descartan los eventos y se marca `overflowed`: el cliente debe recargar.
+    """
+
+    def __init__(self, broker: MemoryEventBroker, channel: str, queue_size: int):
+        self._broker = broker
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float):
+        """Siguiente evento, o None si no llegó ninguno en `timeout` segundos."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker._unsubscribe(self)
+
+
+class StreamSlots:
+    """
+    Cupo de streams abiertos en el worker. Cada conexión SSE ocupa un hilo de gunicorn
+    (gthread) mientras dura; sin límite, los streams pueden dejar al worker sin hilos
+    para el resto de peticiones.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Reserva un hueco. False si el worker ya tiene `limit` streams abiertos."""
+        with self._lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+
+class RedisEventBroker:
+    """Broker sobre Redis pub/sub, compartido entre workers. Requiere el paquete opcional 'redis'."""
+
+    def __init__(self, url: str, prefix: str = 'consul:events:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("El broker de eventos 'redis' requiere instalar el paquete 'redis'")
+        self._client = redis.Redis.from_url(url, socket_connect_timeout=0.5)
+        self._prefix = prefix
+
+    def publish(self, channel: str, event: dict):
+        self._client.publish(self._prefix + channel, json.dumps(event, default=str))
+
+    def subscribe(self, channel: str) -> 'RedisSubscription':
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._prefix + channel)
+        return RedisSubscription(pubsub, channel)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class RedisSubscription:
+    """Suscripción a un canal de Redis con la misma interfaz que MemorySubscription."""
+
+    def __init__(self, pubsub, channel: str):
+        self._pubsub = pubsub
+        self.channel = channel
+        self.overflowed = False
+
+    def get(self, timeout: float):
+        message = self._pubsub.get_message(timeout=timeout)
+        if not message or message.get('type') != 'message':
+            return None
+        return json.loads(message['data'])
+
+    def close(self):
+        self._pubsub.close()
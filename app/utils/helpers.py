@@ -34,4 +34,25 @@ def calculate_durations(appointment_data: dict) -> dict:
 
     appointment_data['calculated_wait_time_seconds'] = wait_seconds
     appointment_data['calculated_consultation_time_seconds'] = consult_seconds
-    return appointment_data
\ No newline at end of file
+    return appointment_data
+
+# Códigos de PostgREST/Postgres cuando la función RPC no existe (migración no aplicada)
+MISSING_RPC_ERROR_CODES = {'PGRST202', '42883'}
+
+def is_missing_rpc_error(error: Exception) -> bool:
+    """Indica si el error se debe a que la función RPC no está desplegada."""
+    return getattr(error, 'code', None) in MISSING_RPC_ERROR_CODES
+
+# Códigos de PostgREST/Postgres cuando la tabla o vista no existe (migración no aplicada)
+MISSING_RELATION_ERROR_CODES = {'PGRST205', '42P01'}
+
+def is_missing_relation_error(error: Exception) -> bool:
+    """Indica si el error se debe a que la tabla o vista no está desplegada."""
+    return getattr(error, 'code', None) in MISSING_RELATION_ERROR_CODES
+
+# Códigos de PostgREST/Postgres cuando la columna no existe (migración no aplicada)
+MISSING_COLUMN_ERROR_CODES = {'PGRST204', '42703'}
+
+def is_missing_column_error(error: Exception) -> bool:
+    """Indica si el error se debe a que la columna no está desplegada."""
+    return getattr(error, 'code', None) in MISSING_COLUMN_ERROR_CODES
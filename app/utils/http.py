@@ -0,0 +1,132 @@
+# Cliente HTTP (httpx) compartido por todos los subclientes de Supabase
+#
+# postgrest, auth, storage y functions usan el mismo httpx.Client, así las
+# conexiones (TLS, keep-alive, HTTP/2) se reutilizan entre peticiones e hilos.
+# El transporte detecta un fork (gunicorn) y abre un pool nuevo en el hijo: las
+# conexiones heredadas del padre nunca se comparten entre procesos.
+# Opcionalmente avisa a un observador al terminar cada llamada (instrumentación).
+
+import os
+import threading
+import time
+import httpx
+
+
+def http2_available() -> bool:
+    """HTTP/2 requiere el paquete opcional 'h2' (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ObservedStream(httpx.SyncByteStream):
+    """Cuerpo de respuesta que ejecuta `on_close` una sola vez, cuando se terminó de leer."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class ForkSafeTransport(httpx.BaseTransport):
+    """
+    Transporte con pool de conexiones propio por proceso y contador de uso.
+    `observer(request, status, segundos)` recibe cada llamada (status None si falló
+    la conexión); el tiempo incluye la lectura del cuerpo.
+    """
+
+    def __init__(self, observer=None, **transport_kwargs):
+        self.observer = observer
+        self._transport_kwargs = transport_kwargs
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        self._pid = os.getpid()
+        self._transport = httpx.HTTPTransport(**self._transport_kwargs)
+        self.requests = 0
+
+    def reset(self):
+        """
+        Abre un pool nuevo. El anterior no se cierra: tras un fork sus sockets
+        siguen siendo del proceso padre y cerrarlos afectaría a sus conexiones.
+        """
+        with self._lock:
+            self._build()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._build()
+        self.requests += 1
+        observer = self.observer
+        if observer is None:
+            return self._transport.handle_request(request)
+
+        started = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            observer(request, None, time.perf_counter() - started)
+            raise
+        response.stream = ObservedStream(
+            response.stream,
+            lambda: observer(request, response.status_code, time.perf_counter() - started),
+        )
+        return response
+
+    def close(self):
+        self._transport.close()
+
+    def stats(self) -> dict:
+        """Uso del pool de conexiones (lectura del estado interno de httpcore)."""
+        connections = list(getattr(getattr(self._transport, '_pool', None), 'connections', []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        limits = self._transport_kwargs.get('limits')
+        return {
+            "pid": self._pid,
+            "http2": bool(self._transport_kwargs.get('http2')),
+            "maxConnections": limits.max_connections if limits else None,
+            "maxKeepalive": limits.max_keepalive_connections if limits else None,
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "requests": self.requests,
+        }
+
+
+def build_http_client(config: dict, observer=None):
+    """
+    Crea el httpx.Client para Supabase con los límites y timeouts de la configuración.
+    Devuelve (cliente, transporte); el transporte da las estadísticas y el reinicio tras fork.
+    """
+    limits = httpx.Limits(
+        max_connections=config.get('SUPABASE_HTTP_MAX_CONNECTIONS', 20),
+        max_keepalive_connections=config.get('SUPABASE_HTTP_MAX_KEEPALIVE', 10),
+        keepalive_expiry=config.get('SUPABASE_HTTP_KEEPALIVE_EXPIRY', 30),
+    )
+    timeout = httpx.Timeout(
+        config.get('SUPABASE_HTTP_READ_TIMEOUT', 30),
+        connect=config.get('SUPABASE_HTTP_CONNECT_TIMEOUT', 5),
+        pool=config.get('SUPABASE_HTTP_POOL_TIMEOUT', 5),
+    )
+    transport = ForkSafeTransport(
+        observer=observer,
+        http2=bool(config.get('SUPABASE_HTTP2', False)),
+        limits=limits,
+        retries=config.get('SUPABASE_HTTP_CONNECT_RETRIES', 1),
+    )
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True), transport
@@ -0,0 +1,56 @@
+# Serialización JSON de las respuestas
+#
+# OrjsonProvider usa orjson (escrito en Rust, varias veces más rápido que json de
+# la librería estándar) manteniendo el formato de Flask: claves ordenadas, claves
+# no-string convertidas a texto y fechas en formato HTTP vía el default de Flask.
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError: # Dependencia opcional
+    orjson = None
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask basado en orjson. Requiere el paquete 'orjson'."""
+
+    def __init__(self, app):
+        if orjson is None:
+            raise RuntimeError("El proveedor JSON 'orjson' requiere instalar el paquete 'orjson'")
+        super().__init__(app)
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            self._options |= orjson.OPT_SORT_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Opciones propias de json.dumps (indent, separators...): usar la librería estándar
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            # Salida indentada en modo debug, como el proveedor por defecto
+            options |= orjson.OPT_INDENT_2
+        data = orjson.dumps(obj, default=self.default, option=options)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Registra el proveedor JSON según JSON_PROVIDER ('auto', 'orjson' o 'default')."""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'orjson' or (choice == 'auto' and orjson_available()):
+        app.json = OrjsonProvider(app)
+    return app.json
@@ -0,0 +1,114 @@
+# Verificación local de tokens JWT emitidos por Supabase (GoTrue)
+#
+# PyJWT (y cryptography) se importan en el primer uso y no al arrancar la app.
+
+import hashlib
+import threading
+import time
+
+_jwks_clients = {}
+_jwks_lock = threading.Lock()
+
+
+class TokenVerificationError(Exception):
+    """El token no es válido (firma, expiración, audiencia...). No se debe reintentar."""
+
+
+class LocalVerificationUnavailable(Exception):
+    """La verificación local no se pudo realizar (falta clave, JWKS inaccesible...)."""
+
+
+class TokenUser:
+    """Usuario ligero construido a partir de los claims del JWT.
+
+    Expone los mismos atributos que usan las rutas del objeto User de Supabase.
+    """
+
+    def __init__(self, claims: dict):
+        self.claims = claims
+        self.id = claims.get('sub')
+        self.email = claims.get('email')
+        self.phone = claims.get('phone')
+        self.aud = claims.get('aud')
+        self.role = claims.get('role')
+        self.session_id = claims.get('session_id')
+        self.app_metadata = claims.get('app_metadata') or {}
+        self.user_metadata = claims.get('user_metadata') or {}
+        self.created_at = None # No viene en el token
+
+    def __repr__(self):
+        return f"<TokenUser id={self.id} email={self.email}>"
+
+
+def _get_jwks_client(url: str) -> 'jwt.PyJWKClient':
+    """Devuelve un PyJWKClient compartido por URL (cachea las claves públicas)."""
+    import jwt
+    with _jwks_lock:
+        client = _jwks_clients.get(url)
+        if client is None:
+            client = jwt.PyJWKClient(url, cache_keys=True, lifespan=3600)
+            _jwks_clients[url] = client
+        return client
+
+
+def decode_supabase_token(token: str, config) -> dict:
+    """Verifica firma, expiración y audiencia del token y devuelve sus claims."""
+    import jwt
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as e:
+        raise TokenVerificationError(f"Cabecera JWT inválida: {e}")
+
+    algorithm = header.get('alg')
+    if algorithm == 'HS256':
+        key = config.get('SUPABASE_JWT_SECRET')
+        if not key:
+            raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET no configurado")
+    elif algorithm in ('RS256', 'ES256'):
+        jwks_url = config.get('SUPABASE_JWKS_URL')
+        if not jwks_url:
+            raise LocalVerificationUnavailable("SUPABASE_JWKS_URL no configurado")
+        try:
+            key = _get_jwks_client(jwks_url).get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientError as e:
+            raise LocalVerificationUnavailable(f"No se pudo obtener la clave del JWKS: {e}")
+    else:
+        raise TokenVerificationError(f"Algoritmo JWT no soportado: {algorithm}")
+
+    options = {"require": ["exp", "sub"]}
+    issuer = config.get('SUPABASE_JWT_ISSUER')
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=config.get('SUPABASE_JWT_AUDIENCE'),
+            issuer=issuer,
+            options=options,
+            leeway=5,
+        )
+    except jwt.PyJWTError as e:
+        raise TokenVerificationError(str(e))
+
+
+def verify_token_locally(token: str, config) -> TokenUser:
+    """Verifica el token sin llamar a Supabase y construye el usuario actual."""
+    return TokenUser(decode_supabase_token(token, config))
+
+
+def token_cache_key(token: str) -> str:
+    """Clave de caché para un token (nunca se guarda el token en claro)."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def token_seconds_left(token: str):
+    """Segundos hasta el 'exp' del token (sin verificar firma), o None si no se puede leer."""
+    import jwt
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    exp = claims.get('exp')
+    if exp is None:
+        return None
+    return exp - time.time()
@@ -0,0 +1,152 @@
+# Configuración del logging de la aplicación
+#
+# El hilo de la petición solo encola el registro (QueueHandler); un hilo aparte
+# (QueueListener) lo formatea (texto o JSON, trazas de excepciones) y lo escribe.
+# Los mensajes usan argumentos %s en lugar de f-strings: si el nivel está
+# desactivado no se formatea nada, y las respuestas de Supabase se registran
+# resumidas (summarize_response) en lugar de convertir todas las filas a texto.
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s : %(message)s'
+DEBUG_TEXT_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s' # el de Flask en modo debug
+
+# Atributos añadidos con extra={...} que se copian tal cual a la salida JSON
+STRUCTURED_FIELDS = ('request_summary',)
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos estructurados que traiga (p. ej. request_summary)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que en el hilo de la petición solo resuelve el mensaje (%s).
+    El QueueHandler estándar formatea el registro completo (incluida la traza de la
+    excepción) antes de encolarlo; aquí eso queda para el hilo del listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class ResponseSummary:
+    """Resumen perezoso de una respuesta de Supabase: solo se calcula si el registro se emite."""
+
+    __slots__ = ('response',)
+
+    def __init__(self, response):
+        self.response = response
+
+    def __str__(self) -> str:
+        if self.response is None:
+            return "sin respuesta"
+        data = getattr(self.response, 'data', None)
+        rows = len(data) if isinstance(data, list) else (0 if data is None else 1)
+        count = getattr(self.response, 'count', None)
+        return f"{rows} fila(s)" + (f", count={count}" if count is not None else "")
+
+
+def summarize_response(response) -> ResponseSummary:
+    return ResponseSummary(response)
+
+
+class _LogPipeline:
+    """Cola + listener del proceso; se recrean en el hijo tras un fork (gunicorn --preload)."""
+
+    def __init__(self, handler: logging.Handler):
+        self.target = handler
+        self.queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        self.listener = None
+        self.start()
+
+    def start(self):
+        self.listener = QueueListener(self.queue_handler.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        self.listener = None
+
+    def after_fork(self):
+        # El hilo del listener no existe en el hijo: cola y listener nuevos
+        self.queue_handler.queue = queue.SimpleQueue()
+        self.start()
+
+
+_pipeline: _LogPipeline = None
+
+
+def _after_fork_in_child():
+    if _pipeline is not None:
+        _pipeline.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(lambda: _pipeline.stop() if _pipeline is not None else None)
+
+
+def configure_logging(app):
+    """
+    Configura app.logger según LOG_LEVEL, LOG_FORMAT ('text' | 'json') y LOG_QUEUE.
+    Reemplaza los handlers previos (incluido el de Flask) para no duplicar líneas.
+    """
+    global _pipeline
+    level = logging.getLevelName(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    if app.config.get('LOG_FORMAT', 'text') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(DEBUG_TEXT_FORMAT if app.debug else TEXT_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+    for handler in list(app.logger.handlers):
+        app.logger.removeHandler(handler)
+
+    if app.config.get('LOG_QUEUE', True):
+        _pipeline = _LogPipeline(stream_handler)
+        app.logger.addHandler(_pipeline.queue_handler)
+    else:
+        app.logger.addHandler(stream_handler)
+    app.logger.setLevel(level)
+    app.logger.propagate = False
@@ -0,0 +1,132 @@
+# Paginación por cursor (keyset) para los listados
+#
+# El cursor codifica los valores de la última fila devuelta (columna de orden + id).
+# La página siguiente se pide con un filtro "(col > v) o (col = v y id > id_v)",
+# así Postgres usa el índice y el coste no crece con el número de página.
+# Los órdenes sin columna propia (por una relación) se paginan por posición: el
+# cursor lleva además 'offset'.
+
+import base64
+import json
+from flask import request, jsonify, current_app
+
+# Tipos de conteo que acepta PostgREST (Prefer: count=...)
+COUNT_METHODS = {'exact', 'planned', 'estimated'}
+
+
+def encode_cursor(values: dict) -> str:
+    """Codifica los valores de la última fila en un cursor opaco (base64 url-safe)."""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, require_id: bool = True) -> dict:
+    """
+    Decodifica un cursor generado por encode_cursor. Lanza ValueError si no es válido.
+    Los cursores de listados llevan siempre 'id' (desempate del keyset).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(values, dict) or (require_id and not isinstance(values.get('id'), int)):
+        raise ValueError("Cursor inválido")
+    return values
+
+
+def get_page_params():
+    """
+    Lee 'limit', 'after' y 'count' de la query.
+    Devuelve (page, None), donde page es None si no se pidió paginación,
+    o (None, respuesta_de_error).
+    """
+    limit_param = request.args.get('limit')
+    after = request.args.get('after')
+    count = request.args.get('count')
+    if limit_param is None and after is None:
+        return None, None
+
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 50)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 200)
+    try:
+        limit = int(limit_param) if limit_param is not None else default_limit
+    except ValueError:
+        return None, (jsonify({"message": "'limit' debe ser un número entero"}), 400)
+    if limit < 1:
+        return None, (jsonify({"message": "'limit' debe ser mayor que 0"}), 400)
+    limit = min(limit, max_limit)
+
+    cursor = None
+    if after:
+        try:
+            cursor = decode_cursor(after)
+        except ValueError as e:
+            return None, (jsonify({"message": str(e)}), 400)
+
+    if count and count not in COUNT_METHODS:
+        return None, (jsonify({"message": f"'count' debe ser uno de {sorted(COUNT_METHODS)}"}), 400)
+
+    return {"limit": limit, "cursor": cursor, "count": count or None}, None
+
+
+def _quote(value) -> str:
+    """Entrecomilla un valor para los filtros or=(...) de PostgREST."""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_keyset(query, sort_column: str, desc: bool, page: dict, id_column: str = 'id'):
+    """Ordena por (sort_column, id) y, si hay cursor, filtra las filas posteriores a él."""
+    cursor = page.get("cursor")
+    if cursor:
+        op = 'lt' if desc else 'gt'
+        value = _quote(cursor.get(sort_column))
+        query = query.or_(
+            f"{sort_column}.{op}.{value},"
+            f"and({sort_column}.eq.{value},{id_column}.{op}.{cursor['id']})"
+        )
+    # Se pide una fila de más para saber si hay página siguiente
+    return query.order(sort_column, desc=desc).order(id_column, desc=desc).range(0, page["limit"])
+
+
+def build_page(rows: list, sort_column: str, page: dict, total=None) -> dict:
+    """Recorta la fila extra y arma la respuesta {items, next_cursor, has_more, total}."""
+    has_more = len(rows) > page["limit"]
+    items = rows[:page["limit"]]
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor({sort_column: last.get(sort_column), "id": last.get('id')})
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "limit": page["limit"],
+        "total": total,
+    }
+
+
+def cursor_offset(page: dict) -> int:
+    """Posición guardada en el cursor de una paginación por offset (0 sin cursor). ValueError si no es válida."""
+    cursor = page.get("cursor")
+    if not cursor:
+        return 0
+    offset = cursor.get("offset")
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise ValueError("Cursor inválido")
+    return offset
+
+
+def apply_offset(query, page: dict):
+    """Pide la página por posición (una fila de más para saber si hay página siguiente)."""
+    offset = cursor_offset(page)
+    return query.range(offset, offset + page["limit"])
+
+
+def build_offset_page(rows: list, page: dict, total=None) -> dict:
+    """Como build_page, con un cursor que apunta a la posición siguiente."""
+    result = build_page(rows, 'id', page, total=total)
+    if result["next_cursor"]:
+        result["next_cursor"] = encode_cursor({"offset": cursor_offset(page) + page["limit"], "id": result["items"][-1].get('id')})
+    return result
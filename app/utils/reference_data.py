@@ -0,0 +1,108 @@
+# Caché de datos de referencia (tablas pequeñas que casi no cambian, p. ej. doctores)
+#
+# Cada worker carga la tabla completa una vez y la sirve desde memoria hasta que
+# vence el TTL o se invalida (POST /api/v1/doctors/cache/invalidate, con METRICS_TOKEN). Los joins
+# con estas tablas (p. ej. el nombre del doctor de una cita) se resuelven en Python
+# en lugar de pedir la relación embebida a PostgREST en cada consulta.
+
+import threading
+import time
+
+# Intervalo mínimo entre recargas provocadas por un id desconocido (fila nueva)
+MISS_RELOAD_INTERVAL = 5 # segundos
+
+
+class ReferenceTable:
+    """Copia en memoria de una tabla de referencia, con TTL y recarga bajo demanda."""
+
+    def __init__(self, get_client, table: str, select: str = '*', order: str = 'id', ttl: float = 300):
+        self._get_client = get_client # Devuelve el cliente de Supabase (inicializado después)
+        self.table = table
+        self.select = select
+        self.order = order
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None # (filas, {id: fila}); se reemplaza entera para lecturas sin lock
+        self._loaded_at = 0.0
+        self.loads = 0
+        self.hits = 0
+
+    def _fresh(self, data) -> bool:
+        return data is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _load(self):
+        response = self._get_client().table(self.table).select(self.select).order(self.order).execute()
+        rows = response.data or []
+        self._data = (rows, {row.get('id'): row for row in rows})
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+        return self._data
+
+    def _current(self):
+        data = self._data
+        if self._fresh(data):
+            self.hits += 1
+            return data
+        with self._lock:
+            # Otro hilo pudo cargarla mientras se esperaba el lock
+            data = self._data
+            return data if self._fresh(data) else self._load()
+
+    def rows(self) -> list:
+        """Filas de la tabla en el orden configurado. No modificar la lista devuelta."""
+        return self._current()[0]
+
+    def get(self, row_id):
+        """Fila con ese id, o None. Un id desconocido provoca una recarga (limitada en frecuencia)."""
+        if row_id is None:
+            return None
+        row = self._current()[1].get(row_id)
+        if row is None and time.monotonic() - self._loaded_at >= MISS_RELOAD_INTERVAL:
+            with self._lock:
+                data = self._data
+                if data is None or time.monotonic() - self._loaded_at >= MISS_RELOAD_INTERVAL:
+                    data = self._load()
+            row = data[1].get(row_id)
+        return row
+
+    def invalidate(self):
+        self._data = None
+
+    def stats(self) -> dict:
+        data = self._data
+        return {
+            "rows": len(data[0]) if data is not None else None,
+            "ageSeconds": round(time.monotonic() - self._loaded_at, 1) if data is not None else None,
+            "ttl": self.ttl,
+            "loads": self.loads,
+            "hits": self.hits,
+        }
+
+
+class ReferenceDataCache:
+    """Registro de tablas de referencia del proceso."""
+
+    def __init__(self, get_client, ttl: float = 300):
+        self._get_client = get_client
+        self.ttl = ttl
+        self._tables = {}
+
+    def register(self, table: str, select: str = '*', order: str = 'id') -> ReferenceTable:
+        self._tables[table] = ReferenceTable(self._get_client, table, select=select, order=order, ttl=self.ttl)
+        return self._tables[table]
+
+    def table(self, name: str) -> ReferenceTable:
+        return self._tables[name]
+
+    def names(self) -> list:
+        return list(self._tables)
+
+    def invalidate(self, name: str = None) -> list:
+        """Invalida una tabla (o todas) y devuelve los nombres invalidados."""
+        names = [name] if name else list(self._tables)
+        for table_name in names:
+            self._tables[table_name].invalidate()
+        return names
+
+    def stats(self) -> dict:
+        return {name: table.stats() for name, table in self._tables.items()}
@@ -0,0 +1,74 @@
+# Tickets de un solo uso para abrir streams SSE
+#
+# EventSource no permite enviar headers, así que la credencial del stream viaja en la
+# URL, que acaba en los logs de acceso y de los proxies. En lugar del JWT se usa un
+# ticket: el cliente lo pide con POST (Authorization: Bearer) y lo canjea en segundos.
+# El ticket va firmado con SECRET_KEY, así que cualquier worker puede validarlo; el
+# "un solo uso" se registra en la lista de revocados (compartida con 'redis').
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+
+from app.utils.cache import MemoryCacheBackend
+from app.utils.jwt_auth import TokenVerificationError, TokenUser
+
+# Tickets canjeados cuando AUTH_REVOCATION_BACKEND=none (solo en este worker)
+_used_tickets = MemoryCacheBackend(maxsize=4096)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _signature(payload: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def issue_stream_ticket(user, token_key: str, secret: str, ttl: float) -> str:
+    """Ticket firmado para `user`, ligado al token que lo pidió (por su hash)."""
+    claims = {
+        "sub": user.id,
+        "email": getattr(user, 'email', None),
+        "tok": token_key,
+        "exp": int(time.time() + ttl),
+        "jti": secrets.token_urlsafe(12),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_signature(payload, secret)}"
+
+
+def read_stream_ticket(ticket: str, secret: str) -> dict:
+    """Claims del ticket si la firma es válida y no ha caducado; lanza TokenVerificationError si no."""
+    payload, _, signature = (ticket or '').partition('.')
+    if not payload or not hmac.compare_digest(signature.encode('ascii', 'replace'), _signature(payload, secret).encode('ascii')):
+        raise TokenVerificationError("Ticket de stream inválido")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise TokenVerificationError("Ticket de stream inválido")
+    if not isinstance(claims, dict) or not claims.get('jti') or not claims.get('sub') or not isinstance(claims.get('exp'), int):
+        raise TokenVerificationError("Ticket de stream inválido")
+    if claims['exp'] <= time.time():
+        raise TokenVerificationError("Ticket de stream caducado")
+    return claims
+
+
+def mark_ticket_used(claims: dict, revocations) -> bool:
+    """Registra el ticket como canjeado. False si ya se había usado."""
+    # La marca vive lo que le quede al ticket: después lo rechaza la expiración
+    ttl = max(1, claims['exp'] - time.time())
+    backend = revocations if revocations is not None else _used_tickets
+    return backend.add(f"auth:stream-ticket:{claims['jti']}", True, ttl)
+
+
+def ticket_user(claims: dict) -> TokenUser:
+    """Usuario del stream a partir de los claims del ticket."""
+    return TokenUser({"sub": claims['sub'], "email": claims.get('email')})
@@ -0,0 +1,153 @@
+# Instrumentación por petición: llamadas a Supabase, tiempos y Server-Timing
+#
+# El transporte HTTP compartido (app/utils/http.py) avisa de cada llamada a
+# PostgREST/GoTrue al terminar de leer la respuesta. La llamada se atribuye a la
+# petición en curso mediante una ContextVar (también desde los hilos de
+# run_concurrently, que copian el contexto) y a una operación ("GET appointments",
+# "rpc:update_appointment", "auth:GET user"). Al responder se añade la cabecera
+# Server-Timing, se escribe una línea de resumen en el log y se alimentan los
+# histogramas que expone /api/v1/metrics.
+
+import contextvars
+import logging
+import threading
+import time
+from flask import current_app, request
+from app.extensions import get_request_metrics
+
+# Operaciones que se detallan en Server-Timing (las demás solo cuentan en el total)
+SERVER_TIMING_MAX_OPERATIONS = 8
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+
+def operation_name(method: str, path: str) -> str:
+    """Operación de Supabase a la que se atribuye una llamada, a partir del método y la ruta."""
+    if path.startswith('/rest/v1/rpc/'):
+        return f"rpc:{path[len('/rest/v1/rpc/'):]}"
+    if path.startswith('/rest/v1/'):
+        return f"{method} {path[len('/rest/v1/'):]}"
+    if path.startswith('/auth/v1/'):
+        return f"auth:{method} {path[len('/auth/v1/'):]}"
+    return f"{method} {path}"
+
+
+class RequestTrace:
+    """Llamadas a Supabase de una petición, agrupadas por operación."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations = {} # operación -> [llamadas, segundos]
+        self.errors = 0
+        self._lock = threading.Lock() # las llamadas pueden llegar desde varios hilos
+
+    def record(self, operation: str, seconds: float, failed: bool):
+        with self._lock:
+            entry = self.operations.setdefault(operation, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            if failed:
+                self.errors += 1
+
+    @property
+    def calls(self) -> int:
+        return sum(count for count, _ in self.operations.values())
+
+    @property
+    def upstream_seconds(self) -> float:
+        """Suma de la duración de las llamadas (con llamadas en paralelo puede superar al total)."""
+        return sum(seconds for _, seconds in self.operations.values())
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def record_upstream_call(http_request, status, seconds: float):
+    """Observador del transporte HTTP: registra una llamada a Supabase."""
+    operation = operation_name(http_request.method, http_request.url.path)
+    failed = status is None or status >= 400
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(operation, seconds, failed)
+    metrics = get_request_metrics()
+    if metrics is not None:
+        metrics.get('supabase_request_duration_seconds').observe(
+            (operation, str(status) if status is not None else 'error'), seconds)
+
+
+def server_timing_header(trace: RequestTrace, total_seconds: float) -> str:
+    """Valor de Server-Timing: total, tiempo en Supabase, resto (app) y las operaciones más lentas."""
+    upstream = trace.upstream_seconds
+    entries = [
+        f'total;dur={total_seconds * 1000:.1f}',
+        f'supabase;desc="{trace.calls} llamada{"" if trace.calls == 1 else "s"}";dur={upstream * 1000:.1f}',
+        f'app;dur={max(total_seconds - upstream, 0) * 1000:.1f}',
+    ]
+    slowest = sorted(trace.operations.items(), key=lambda item: item[1][1], reverse=True)
+    for index, (operation, (count, seconds)) in enumerate(slowest[:SERVER_TIMING_MAX_OPERATIONS]):
+        description = operation.replace('"', "'")
+        entries.append(f'sb{index};desc="{description} x{count}";dur={seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def _endpoint_label() -> str:
+    """Regla de la ruta (sin ids concretos) para acotar las series de métricas."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_trace():
+    if request.method != 'OPTIONS':
+        _current_trace.set(RequestTrace())
+
+
+def _finish_trace(response):
+    trace = _current_trace.get()
+    if trace is None:
+        return response
+    config = current_app.config
+    total = trace.elapsed()
+    endpoint = _endpoint_label()
+
+    if config.get('SERVER_TIMING_ENABLED', True):
+        response.headers['Server-Timing'] = server_timing_header(trace, total)
+        response.headers['Timing-Allow-Origin'] = '*'
+
+    metrics = get_request_metrics()
+    if metrics is not None:
+        metrics.get('http_request_duration_seconds').observe((request.method, endpoint, str(response.status_code)), total)
+        metrics.get('http_request_supabase_calls').observe((request.method, endpoint), trace.calls)
+
+    # El resumen se arma solo si se va a emitir (el nivel INFO puede estar desactivado)
+    if config.get('REQUEST_SUMMARY_LOG', True) and current_app.logger.isEnabledFor(logging.INFO):
+        summary = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "duration_ms": round(total * 1000, 1),
+            "supabase_calls": trace.calls,
+            "supabase_ms": round(trace.upstream_seconds * 1000, 1),
+            "supabase_errors": trace.errors,
+            "operations": {op: {"calls": count, "ms": round(seconds * 1000, 1)} for op, (count, seconds) in trace.operations.items()},
+            "streamed": response.is_streamed, # en streaming solo cuenta lo ocurrido antes de empezar a responder
+        }
+        detail = ', '.join(f"{op} x{count} {seconds * 1000:.1f}ms" for op, (count, seconds) in trace.operations.items())
+        current_app.logger.info(
+            f"{request.method} {request.path} {response.status_code} {summary['duration_ms']}ms "
+            f"supabase={trace.calls} ({summary['supabase_ms']}ms) [{detail}]",
+            extra={"request_summary": summary},
+        )
+    return response
+
+
+def _clear_trace(exc=None):
+    _current_trace.set(None)
+
+
+def init_request_tracing(app):
+    """Registra los hooks que abren y cierran la traza de cada petición."""
+    if not app.config.get('REQUEST_TRACING_ENABLED', True):
+        return
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
+    app.teardown_request(_clear_trace)
@@ -0,0 +1,7 @@
+# Benchmarks herméticos de la API
+#
+# Levantan la aplicación (create_app) contra un servidor local que imita el
+# subconjunto de PostgREST/GoTrue que usan los blueprints, con latencia
+# configurable y una clínica sintética. No necesitan un proyecto de Supabase.
+#
+#   python -m benchmarks.run --help
@@ -0,0 +1,425 @@
+# Servidor HTTP local que imita el subconjunto de PostgREST y GoTrue que usan los blueprints
+#
+# Soporta select con columnas, alias y recursos embebidos (a uno), filtros
+# (eq, neq, gt, gte, lt, lte, is, in, like, ilike, not.*, or/and anidados),
+# order, limit/offset, Prefer: count, respuestas de objeto único, insert, update,
+# delete y RPCs registrados en Python. Cada petición espera `latency_ms` antes de
+# responder (simula el viaje de red a Supabase) y se cuenta en `calls`.
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# Relaciones (tabla, recurso embebido) -> columna FK, usadas para embeber recursos
+FOREIGN_KEYS = {
+    ('appointments', 'patients'): 'patient_id',
+    ('appointments', 'doctors'): 'doctor_id',
+}
+
+# Parámetros de la query string que no son filtros
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+
+def postgrest_error(status: int, code: str, message: str, details=None):
+    """Cuerpo de error con la forma de PostgREST (la API lo convierte en APIError)."""
+    return status, {"code": code, "message": message, "details": details, "hint": None}
+
+
+def _parse_value(raw):
+    """Convierte un literal de filtro PostgREST a texto (quitando comillas si las tiene)."""
+    if len(raw) >= 2 and raw[0] == '"' and raw[-1] == '"':
+        return raw[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return raw
+
+
+@lru_cache(maxsize=65536)
+def _timestamp(text: str) -> datetime:
+    # En la query string el '+' de la zona horaria puede llegar como espacio
+    return datetime.fromisoformat(text.replace('Z', '+00:00').replace(' ', '+'))
+
+
+def _comparable(stored, literal):
+    """Normaliza ambos lados de una comparación según el tipo del valor almacenado."""
+    if stored is None or literal is None:
+        return stored, literal
+    if isinstance(stored, bool):
+        return stored, str(literal).lower() == 'true'
+    if isinstance(stored, (int, float)):
+        try:
+            return stored, type(stored)(literal)
+        except (TypeError, ValueError):
+            return str(stored), str(literal)
+    if isinstance(stored, str) and len(stored) >= 10 and stored[4:5] == '-' and stored[7:8] == '-':
+        try:
+            return _timestamp(stored), _timestamp(str(literal))
+        except ValueError:
+            pass
+    return str(stored), str(literal)
+
+
+def _like_to_regex(pattern: str, flags: int = 0):
+    """LIKE de Postgres: % y * (PostgREST) son cualquier texto, _ un carácter, \\ escapa."""
+    parts, chars = [], iter(pattern)
+    for ch in chars:
+        if ch == '\\':
+            parts.append(re.escape(next(chars, '\\')))
+        elif ch in '%*':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    return re.compile(f"^{''.join(parts)}$", flags | re.DOTALL)
+
+
+def _split_top_level(text: str, sep: str = ',') -> list:
+    """Divide por `sep` respetando paréntesis y comillas."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _match_op(value, op: str, literal: str) -> bool:
+    negate = op.startswith('not.')
+    if negate:
+        op = op[4:]
+    if op == 'is':
+        expected = literal.lower()
+        result = value is None if expected == 'null' else value is (expected == 'true')
+    elif op == 'in':
+        items = [_parse_value(item) for item in _split_top_level(literal.strip('()'))]
+        result = value is not None and any(left == right for left, right in (_comparable(value, item) for item in items))
+    elif op in ('like', 'ilike'):
+        regex = _like_to_regex(literal, re.IGNORECASE if op == 'ilike' else 0)
+        result = value is not None and bool(regex.match(str(value)))
+    elif value is None:
+        result = False
+    else:
+        left, right = _comparable(value, _parse_value(literal))
+        result = {
+            'eq': left == right, 'neq': left != right,
+            'gt': left > right, 'gte': left >= right,
+            'lt': left < right, 'lte': left <= right,
+        }[op]
+    return not result if negate else result
+
+
+def eval_condition(row: dict, condition: str) -> bool:
+    """Evalúa una condición `col.op.valor`, `col.not.op.valor`, `and(...)` u `or(...)`."""
+    for logic in ('and', 'or', 'not.and', 'not.or'):
+        if condition.startswith(logic + '('):
+            results = [eval_condition(row, part) for part in _split_top_level(condition[len(logic) + 1:-1])]
+            result = all(results) if logic.endswith('and') else any(results)
+            return not result if logic.startswith('not.') else result
+    column, rest = condition.split('.', 1)
+    if rest.startswith('not.'):
+        op, literal = rest[4:].split('.', 1)
+        op = 'not.' + op
+    else:
+        op, literal = rest.split('.', 1)
+    return _match_op(row.get(column), op, literal)
+
+
+def parse_select(text: str) -> list:
+    """Devuelve una lista de (alias, columna_o_recurso, sub_select o None, es_inner)."""
+    fields = []
+    for part in _split_top_level(re.sub(r'\s+', ' ', text or '*')):
+        alias = None
+        if '(' in part:
+            head, inner = part.split('(', 1)
+            inner = inner.rsplit(')', 1)[0]
+            head = head.strip()
+            if ':' in head:
+                alias, head = [piece.strip() for piece in head.split(':', 1)]
+            is_inner = head.endswith('!inner')
+            head = head.split('!')[0]
+            fields.append((alias or head, head, parse_select(inner), is_inner))
+        else:
+            if ':' in part and '::' not in part:
+                alias, part = [piece.strip() for piece in part.split(':', 1)]
+            fields.append((alias or part, part, None, False))
+    return fields
+
+
+class FakeSupabase:
+    """Tablas en memoria, RPCs registrados y contadores de llamadas del servidor falso."""
+
+    def __init__(self, latency_ms: float = 0.0, rpc_handlers: dict = None, views: dict = None):
+        self.tables = {'doctors': [], 'patients': [], 'appointments': []}
+        self.latency = latency_ms / 1000.0
+        self.calls = Counter() # "GET appointments", "rpc:update_appointment", "auth:GET user", ...
+        self.lock = threading.RLock()
+        # nombre -> handler(fake, body) -> (status, resultado); el resto responde PGRST202
+        self.rpc_handlers = dict(rpc_handlers or {})
+        # nombre -> (tabla base, columns(fake, fila) -> columnas añadidas); solo lectura
+        self.views = dict(views or {})
+        self._index = {} # tabla -> {id: fila}
+        self._server = None
+        self._thread = None
+
+    # --- Datos ---
+    def load(self, table: str, rows: list):
+        self.tables[table] = rows
+        self._index[table] = {row['id']: row for row in rows}
+
+    def next_id(self, table: str) -> int:
+        return max(self._by_id(table), default=0) + 1
+
+    def _by_id(self, table: str) -> dict:
+        index = self._index.get(table)
+        if index is None or len(index) != len(self.tables[table]):
+            index = self._index[table] = {row['id']: row for row in self.tables[table]}
+        return index
+
+    def get_row(self, table: str, row_id):
+        return self._by_id(table).get(row_id)
+
+    def project(self, table: str, row: dict, fields: list) -> dict:
+        """Aplica el select a una fila, resolviendo los recursos embebidos por FK."""
+        out = dict(row) if fields is None or any(f[1] == '*' for f in fields if f[2] is None) else {}
+        for alias, name, sub, _ in fields or []:
+            if sub is None:
+                if name != '*':
+                    out[alias] = row.get(name)
+                continue
+            fk = FOREIGN_KEYS.get((table, name))
+            target = self.get_row(name, row.get(fk)) if fk is not None and row.get(fk) is not None else None
+            out[alias] = self.project(name, target, sub) if target else None
+        return out
+
+    def view_rows(self, view: str) -> list:
+        """Filas de una vista: cada fila de la tabla base con las columnas calculadas."""
+        base, columns = self.views[view]
+        return [{**row, **columns(self, row)} for row in self.tables[base]]
+
+    def query(self, table: str, params: list, rows: list = None):
+        """Filas que cumplen los filtros de primer nivel y los filtros sobre recursos embebidos (sin aplicar)."""
+        rows = list(self.tables.get(table, []) if rows is None else rows)
+        embedded_filters = []
+        for key, value in params:
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ('or', 'and', 'not.or', 'not.and'):
+                rows = [row for row in rows if eval_condition(row, f"{key}{value}")]
+            elif '.' in key:
+                embedded_filters.append((key, value))
+            else:
+                rows = [row for row in rows if eval_condition(row, f"{key}.{value}")]
+        return rows, embedded_filters
+
+    def call_count(self) -> int:
+        return sum(self.calls.values())
+
+    # --- Servidor ---
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Arranca el servidor en un hilo y devuelve su URL (SUPABASE_URL)."""
+        self._server = ThreadingHTTPServer((host, port), FakeSupabaseHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        # poll_interval corto: stop() (shutdown) vuelve enseguida, útil en las pruebas
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name='fake-supabase', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class FakeSupabaseHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive, como PostgREST detrás de un proxy
+    # Cabeceras y cuerpo se escriben por separado: sin TCP_NODELAY, Nagle + ACK retardado
+    # añadirían ~40 ms a cada respuesta y ocultarían la latencia configurada
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fake(self) -> FakeSupabase:
+        return self.server.fake
+
+    def _send(self, status: int, body=None, headers: dict = None):
+        payload = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _json_body(self):
+        return json.loads(self._raw_body) if self._raw_body else None
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self._raw_body = self.rfile.read(length) if length else b''
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        if url.path.startswith('/auth/v1/'):
+            return self._auth(url.path[len('/auth/v1/'):])
+        if url.path.startswith('/rest/v1/rpc/'):
+            return self._rpc(url.path[len('/rest/v1/rpc/'):], params)
+        if url.path.startswith('/rest/v1/'):
+            return self._rest(url.path[len('/rest/v1/'):], params)
+        self._send(404, {"message": "not found"})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = _handle
+
+    # --- GoTrue ---
+    def _auth(self, action: str):
+        self.fake.calls[f"auth:{self.command} {action}"] += 1
+        token = (self.headers.get('Authorization') or '').removeprefix('Bearer ')
+        if action == 'user':
+            # Cualquier token no vacío es válido salvo 'invalid'
+            if not token or token == 'invalid':
+                return self._send(401, {"code": 401, "msg": "invalid JWT"})
+            return self._send(200, {
+                "id": f"user-{token[:8]}", "aud": "authenticated", "role": "authenticated",
+                "email": "recepcion@example.com", "created_at": "2026-01-01T00:00:00+00:00",
+                "app_metadata": {}, "user_metadata": {},
+            })
+        if action.startswith('logout'):
+            return self._send(204)
+        self._send(404, {"message": "not found"})
+
+    # --- RPC ---
+    def _rpc(self, function: str, params: list):
+        self.fake.calls[f"rpc:{function}"] += 1
+        handler = self.fake.rpc_handlers.get(function)
+        if handler is None:
+            return self._send(*postgrest_error(404, 'PGRST202', f"Could not find the function public.{function}"))
+        body = self._json_body() if self.command == 'POST' else dict(params)
+        with self.fake.lock:
+            status, result = handler(self.fake, body or {})
+        self._send(status, result)
+
+    # --- Tablas ---
+    def _rest(self, table: str, params: list):
+        fake = self.fake
+        fake.calls[f"{self.command} {table}"] += 1
+        if table in fake.views and self.command in ('GET', 'HEAD'):
+            select = parse_select(dict(params).get('select', '*'))
+            with fake.lock:
+                # Los recursos embebidos se resuelven con las FK de la tabla base
+                return self._select(fake.views[table][0], params, select, rows=fake.view_rows(table))
+        if table not in fake.tables:
+            return self._send(*postgrest_error(404, '42P01', f'relation "public.{table}" does not exist'))
+        select = parse_select(dict(params).get('select', '*'))
+        with fake.lock:
+            if self.command in ('GET', 'HEAD'):
+                return self._select(table, params, select)
+            if self.command == 'POST':
+                return self._insert(table, select)
+            if self.command == 'PATCH':
+                rows, _ = fake.query(table, params)
+                changes = self._json_body() or {}
+                for row in rows:
+                    row.update(changes)
+                    if 'updated_at' in row:
+                        row['updated_at'] = datetime.now(timezone.utc).isoformat()
+                return self._send(200, [fake.project(table, row, select) for row in rows])
+            if self.command == 'DELETE':
+                rows, _ = fake.query(table, params)
+                deleted = {id(row) for row in rows}
+                fake.tables[table] = [row for row in fake.tables[table] if id(row) not in deleted]
+                fake._index.pop(table, None)
+                if table == 'appointments' and 'appointment_tombstones' in fake.tables:
+                    # Trigger appointments_record_tombstone (solo si se cargó la tabla de marcas)
+                    now = datetime.now(timezone.utc).isoformat()
+                    fake.tables['appointment_tombstones'].extend(
+                        {"appointment_id": row['id'], "appointment_time": row.get('appointment_time'), "deleted_at": now}
+                        for row in rows)
+                return self._send(200, [fake.project(table, row, select) for row in rows])
+        self._send(405, {"message": "method not allowed"})
+
+    def _insert(self, table: str, select: list):
+        fake = self.fake
+        body = self._json_body()
+        created = []
+        now = datetime.now(timezone.utc).isoformat()
+        for row in (body if isinstance(body, list) else [body]):
+            row = dict(row)
+            row.setdefault('id', fake.next_id(table))
+            if table == 'appointments':
+                row.setdefault('created_at', now)
+                row.setdefault('updated_at', now)
+                row.setdefault('version', 1)
+                for column in ('arrival_time', 'consultation_start_time', 'consultation_end_time', 'notes', 'doctor_id'):
+                    row.setdefault(column, None)
+            fake.tables[table].append(row)
+            created.append(row)
+        self._send(201, [fake.project(table, row, select) for row in created])
+
+    def _select(self, table: str, params: list, select: list, rows: list = None):
+        fake = self.fake
+        options = dict(params)
+        rows, embedded_filters = fake.query(table, params, rows)
+        result = [fake.project(table, row, select) for row in rows]
+        # Un filtro sobre un recurso embebido (patient.name=ilike...) lo anula si no cumple
+        for key, value in embedded_filters:
+            alias, column = key.split('.', 1)
+            for item in result:
+                if item.get(alias) is not None and not eval_condition(item[alias], f"{column}.{value}"):
+                    item[alias] = None
+        for alias, _, sub, is_inner in select:
+            if sub is not None and is_inner:
+                result = [item for item in result if item.get(alias) is not None]
+
+        if options.get('order'):
+            # Orden estable: se aplican las claves de la última a la primera
+            for spec in reversed(_split_top_level(options['order'])):
+                column, direction = spec.rsplit('.', 1) if spec.endswith(('.asc', '.desc')) else (spec, 'asc')
+                foreign = re.match(r'^(\w+)\((\w+)\)$', column)
+
+                def sort_key(item, column=column, foreign=foreign):
+                    value = (item.get(foreign.group(1)) or {}).get(foreign.group(2)) if foreign else item.get(column)
+                    return (value is None, value if value is not None else 0)
+                result.sort(key=sort_key, reverse=(direction == 'desc'))
+
+        total = len(result)
+        offset = int(options.get('offset', 0))
+        limit = options.get('limit')
+        result = result[offset:offset + int(limit)] if limit is not None else result[offset:]
+
+        headers = {}
+        if 'count=' in (self.headers.get('Prefer') or ''):
+            headers['Content-Range'] = f"{offset}-{offset + len(result) - 1}/{total}" if result else f"*/{total}"
+        if 'vnd.pgrst.object' in (self.headers.get('Accept') or ''):
+            if len(result) != 1:
+                return self._send(*postgrest_error(406, 'PGRST116', "JSON object requested, multiple (or no) rows returned"))
+            return self._send(200, result[0], headers)
+        if self.command == 'HEAD':
+            return self._send(200, None, headers)
+        self._send(200, result, headers)
@@ -0,0 +1,115 @@
+# Benchmark por HTTP de un servidor real (servidor de desarrollo de Flask o gunicorn)
+#
+#   python -m benchmarks.http_load --server devserver --concurrency 16
+#   python -m benchmarks.http_load --server gunicorn --workers 2 --threads 16 --concurrency 16
+#
+# Arranca el Supabase falso en este proceso y el servidor de la API como
+# subproceso apuntando a él; después mide los mismos endpoints que
+# benchmarks.run, pero con clientes HTTP reales (keep-alive, gzip).
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from .run import add_common_arguments, start_fake, app_environment, select_scenarios, report, measure, bench_token
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 60 # segundos
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(args, port: int) -> tuple:
+    """(comando, variables de entorno extra) del servidor a medir."""
+    if args.server == 'devserver':
+        # Igual que `python run.py`, sin debug (el recargador y el depurador distorsionan la medición)
+        return [sys.executable, 'run.py'], {"PORT": str(port), "FLASK_DEBUG": "false"}
+    env = {"GUNICORN_BIND": f"127.0.0.1:{port}"}
+    if args.workers:
+        env["GUNICORN_WORKERS"] = str(args.workers)
+    if args.threads:
+        env["GUNICORN_THREADS"] = str(args.threads)
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], env
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {process.returncode})")
+        try:
+            if httpx.get(f"{base_url}/api/v1/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {STARTUP_TIMEOUT} s")
+
+
+def http_sender(base_url: str, scenario, headers: dict):
+    """Un httpx.Client con keep-alive por hilo cliente."""
+    def make_sender():
+        client = httpx.Client(base_url=base_url, headers=headers, timeout=60)
+
+        def send(i):
+            body = scenario.body(i) if scenario.body is not None else None
+            started = time.perf_counter()
+            response = client.request(scenario.method, scenario.path(i), json=body)
+            response.read()
+            return time.perf_counter() - started, response.status_code
+        return send
+    return make_sender
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.http_load',
+                                     description='Benchmark por HTTP del servidor de la API contra un Supabase falso.')
+    add_common_arguments(parser)
+    server = parser.add_argument_group('servidor')
+    server.add_argument('--server', choices=('devserver', 'gunicorn'), default='gunicorn',
+                        help="'devserver' (python run.py) o 'gunicorn' (gunicorn.conf.py)")
+    server.add_argument('--workers', type=int, help='GUNICORN_WORKERS (por defecto, el de gunicorn.conf.py)')
+    server.add_argument('--threads', type=int, help='GUNICORN_THREADS (por defecto, el de gunicorn.conf.py)')
+    server.add_argument('--server-log', metavar='RUTA', help='guardar la salida del servidor en este archivo')
+    parser.set_defaults(concurrency=16, iterations=200)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake, clinic = start_fake(args)
+    port = _free_port()
+    command, server_env = server_command(args, port)
+    env = {**app_environment(args, fake.url), **server_env}
+    base_url = f"http://127.0.0.1:{port}"
+
+    log = open(args.server_log, 'w', encoding='utf-8') if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=ROOT, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+    results = []
+    try:
+        wait_until_ready(base_url, process)
+        headers = {"Authorization": f"Bearer {bench_token()}"}
+        for scenario in select_scenarios(args, clinic):
+            sender = http_sender(base_url, scenario, headers)
+            results.append(measure(fake, scenario.name, sender, args.iterations, args.concurrency, args.warmup))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=35) # graceful_timeout de gunicorn
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if log is not subprocess.DEVNULL:
+            log.close()
+        fake.stop()
+    return report(args, clinic, env, results, server=args.server, workers=args.workers, threads=args.threads)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# Emulación en Python de las funciones y vistas SQL de supabase/migrations para el servidor falso
+#
+# Cada handler recibe (fake, body) y devuelve (status, resultado) con la misma forma
+# que la función de Postgres. Se ejecutan con fake.lock tomado.
+
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from .fake_supabase import postgrest_error
+
+# Transiciones permitidas (mismo criterio que update_appointment en SQL)
+ALLOWED_TRANSITIONS = {
+    'Programada': ['En Espera', 'Cancelada', 'No Asistió'],
+    'En Espera': ['En Consulta', 'Cancelada', 'No Asistió'],
+    'En Consulta': ['Completada', 'Cancelada', 'No Asistió'],
+}
+STATUS_TIMESTAMPS = {
+    'En Espera': 'arrival_time',
+    'En Consulta': 'consultation_start_time',
+    'Completada': 'consultation_end_time',
+}
+DOCTOR_SLOT = timedelta(minutes=30)
+
+
+def _ts(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _minutes(start, end):
+    if start is None or end is None or end < start:
+        return None
+    return int((end - start).total_seconds() // 60)
+
+
+def count_appointments_by_patient(fake, body):
+    wanted = set(body.get('patient_ids') or [])
+    counts = Counter(a['patient_id'] for a in fake.tables['appointments'] if a['patient_id'] in wanted)
+    return 200, [{"patient_id": pid, "appointment_count": count} for pid, count in counts.items()]
+
+
+def _normalize_name(value):
+    """normalize_patient_name: minúsculas y sin acentos."""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def search_patients(fake, body):
+    # Sin similitud trigram: solo coincidencias por subcadena, las que empiezan por el texto primero
+    term = _normalize_name(body.get('q'))
+    limit = min(max(int(body.get('max_results') or 10), 1), 50)
+    matches = [p for p in fake.tables['patients'] if term in _normalize_name(p['name'])]
+    matches.sort(key=lambda p: (not _normalize_name(p['name']).startswith(term), p['name'], p['id']))
+    return 200, [{"id": p['id'], "name": p['name'], "rank": 1.0} for p in matches[:limit]]
+
+
+def dashboard_month_summary(fake, body):
+    start, end = _ts(body['p_start']), _ts(body['p_end'])
+    rows = [a for a in fake.tables['appointments'] if start <= _ts(a['appointment_time']) <= end]
+    summary = {"total": len(rows), "wait_sum": 0, "wait_count": 0, "consult_sum": 0, "consult_count": 0}
+    daily, by_doctor, by_status = {}, {}, Counter()
+    for appointment in rows:
+        day = daily.setdefault(_ts(appointment['appointment_time']).astimezone(timezone.utc).day, {
+            "count": 0, "wait_sum": 0, "wait_count": 0, "consult_sum": 0, "consult_count": 0,
+        })
+        day['count'] += 1
+        arrival = _ts(appointment.get('arrival_time'))
+        consult_start = _ts(appointment.get('consultation_start_time'))
+        consult_end = _ts(appointment.get('consultation_end_time'))
+        for metric, value in (('wait', _minutes(arrival, consult_start)), ('consult', _minutes(consult_start, consult_end))):
+            if value is not None:
+                for target in (summary, day):
+                    target[f'{metric}_sum'] += value
+                    target[f'{metric}_count'] += 1
+        doctor_id = appointment.get('doctor_id')
+        if doctor_id is not None:
+            # left join: un doctor sin fila cuenta igual, con el nombre provisional
+            doctor = fake.get_row('doctors', doctor_id) or {"name": f"Doctor #{doctor_id}"}
+            entry = by_doctor.setdefault(doctor_id, {"id": doctor_id, "name": doctor['name'], "count": 0, "first": appointment['id']})
+            entry['count'] += 1
+            entry['first'] = min(entry['first'], appointment['id'])
+        by_status[appointment['status']] += 1
+    summary['daily'] = [{"day": number, **values} for number, values in sorted(daily.items())]
+    summary['by_doctor'] = [
+        {key: entry[key] for key in ('id', 'name', 'count')}
+        for entry in sorted(by_doctor.values(), key=lambda entry: entry['first'])
+    ]
+    summary['status_count'] = [{"status": status, "count": count} for status, count in by_status.items()]
+    return 200, summary
+
+
+def update_appointment(fake, body):
+    expected = body.get('p_expected_version')
+    if expected is None:
+        return postgrest_error(428, 'PT428', 'version_required')
+    row = fake.get_row('appointments', body.get('p_id'))
+    if row is None:
+        return postgrest_error(404, 'PT404', 'appointment_not_found')
+    version = row.setdefault('version', 1)
+    if expected != version:
+        return postgrest_error(409, 'PT409', 'version_conflict', str(version))
+
+    previous_time = row['appointment_time']
+    changes = body.get('p_changes') or {}
+    new_row = dict(row)
+    for column in ('doctor_id', 'appointment_time', 'notes'):
+        if column in changes:
+            new_row[column] = changes[column]
+
+    if 'doctor_id' in changes and new_row['doctor_id'] is not None:
+        when = _ts(new_row['appointment_time'])
+        for other in fake.tables['appointments']:
+            if (other['doctor_id'] == new_row['doctor_id'] and other['id'] != row['id']
+                    and abs(_ts(other['appointment_time']) - when) <= DOCTOR_SLOT):
+                return postgrest_error(409, 'PT409', 'doctor_unavailable', new_row['appointment_time'])
+
+    status = body.get('p_status')
+    if status and status != row['status']:
+        if status not in ALLOWED_TRANSITIONS.get(row['status'], []):
+            return postgrest_error(400, 'PT400', 'invalid_transition',
+                                   f"No se puede cambiar el estado de '{row['status']}' a '{status}'")
+        new_row['status'] = status
+        column = STATUS_TIMESTAMPS.get(status)
+        if column and not new_row.get(column):
+            new_row[column] = datetime.now(timezone.utc).isoformat()
+
+    if new_row != row:
+        new_row['version'] = version + 1
+        new_row['updated_at'] = datetime.now(timezone.utc).isoformat()
+        row.update(new_row)
+
+    patient = fake.get_row('patients', row.get('patient_id'))
+    doctor = fake.get_row('doctors', row.get('doctor_id'))
+    appointment = {key: row.get(key) for key in (
+        'id', 'appointment_time', 'status', 'notes', 'created_at',
+        'arrival_time', 'consultation_start_time', 'consultation_end_time', 'version',
+    )}
+    appointment['patient'] = {"id": patient['id'], "name": patient['name']} if patient else None
+    appointment['doctor'] = {"id": doctor['id'], "name": doctor['name']} if doctor else None
+    return 200, {"appointment": appointment, "previous_appointment_time": previous_time}
+
+
+def appointments_with_patient(fake, row):
+    """Columnas que añade la vista appointments_with_patient."""
+    patient = fake.get_row('patients', row.get('patient_id'))
+    name = patient['name'] if patient else None
+    return {"patient_name": name, "patient_sort_name": name.lower() if name else ''}
+
+
+# RPCs y vistas desplegados por las migraciones; con --no-rpc se omiten y la API usa sus alternativas
+VIEWS = {
+    'appointments_with_patient': ('appointments', appointments_with_patient),
+}
+
+RPC_HANDLERS = {
+    'count_appointments_by_patient': count_appointments_by_patient,
+    'dashboard_month_summary': dashboard_month_summary,
+    'search_patients': search_patients,
+    'update_appointment': update_appointment,
+}
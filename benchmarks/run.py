@@ -0,0 +1,302 @@
+# Benchmark de endpoints contra un Supabase falso con latencia configurable
+#
+#   python -m benchmarks.run --latency 20 --doctors 8 --patients 2000 --per-day 40 --days 30
+#   python -m benchmarks.run --cold --no-rpc --only dashboard --json resultados.json
+#
+# Para cada endpoint informa p50/p95 de latencia, peticiones por segundo y cuántas
+# llamadas a Supabase (PostgREST, RPC, GoTrue) hizo en promedio cada petición.
+
+import argparse
+import base64
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from .fake_supabase import FakeSupabase
+from .rpc import RPC_HANDLERS, VIEWS
+from .seed import seed_clinic
+
+
+
+def bench_token(lifetime: int = 3600) -> str:
+    """
+    JWT sin firma válida: el servidor falso acepta cualquier token y la API solo lee
+    su 'exp' para la caché de tokens (AUTH_VERIFY_MODE=remote).
+    """
+    def encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+    header = {"alg": "HS256", "typ": "JWT"}
+    payload = {"sub": "bench-user", "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + lifetime}
+    return '.'.join(encode(json.dumps(part).encode()) for part in (header, payload)) + '.' + encode(b'benchmark')
+
+
+# Entorno hermético: nada depende del .env del desarrollador
+BASE_ENV = {
+    "SUPABASE_KEY": "bench-anon-key",
+    "AUTH_VERIFY_MODE": "remote",
+    "DASHBOARD_CACHE_BACKEND": "memory",
+    "EVENTS_BACKEND": "memory",
+}
+# --cold: sin cachés de resultados ni de tokens, cada petición llega hasta Supabase.
+# La tabla de doctores sigue en memoria: con REFERENCE_DATA_TTL=0 se recargaría en
+# cada búsqueda de nombre, no una vez por petición
+COLD_ENV = {
+    "AUTH_CACHE_MAXSIZE": "0",
+    "DASHBOARD_CACHE_BACKEND": "none",
+    "AVAILABILITY_CACHE_MAXSIZE": "0",
+    "PATIENT_SEARCH_CACHE_MAXSIZE": "0",
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: object # callable(i) -> ruta
+    body: object = None # callable(i) -> dict, para PUT/POST
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    throughput: float
+    supabase_calls_per_request: float
+    supabase_calls: dict = field(default_factory=dict)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_scenarios(clinic: dict, start: date, days: int, seed: int) -> list:
+    """Endpoints a medir: listado y actualización de citas, y todas las rutas /dashboard/*."""
+    rng = random.Random(seed)
+    appointments = {row["id"]: row for row in clinic["appointments"]}
+    # Cada cita una vez por vuelta: dos hilos no editan a la vez la misma cita (sería un 409 de versión)
+    update_ids = rng.sample(list(appointments), len(appointments)) if appointments else [1]
+
+    def update_body(i):
+        # Las filas de la clínica son las del servidor falso: la versión está al día
+        row = appointments.get(update_ids[i % len(update_ids)], {})
+        return {"notes": f"benchmark {i}", "version": row.get("version", 1)}
+
+    def day(i):
+        return (start + timedelta(days=i % max(days, 1))).isoformat()
+
+    month = f"month={start.month}&year={start.year}"
+    last_day = (start + timedelta(days=max(days, 1) - 1)).isoformat()
+
+    scenarios = [
+        Scenario('get_appointments ?date', 'GET', lambda i: f"/api/v1/appointments?date={day(i)}"),
+        Scenario('get_appointments ?limit=50', 'GET', lambda i: "/api/v1/appointments?limit=50&count=exact"),
+        Scenario('update_appointment', 'PUT', lambda i: f"/api/v1/appointments/{update_ids[i % len(update_ids)]}",
+                 body=update_body),
+    ]
+    for route in ('stats', 'wait-time', 'consult-time', 'appointments-by-doctor', 'appointments-by-day',
+                  'doctors-details', 'appointments-summary', 'bundle'):
+        scenarios.append(Scenario(f"dashboard/{route}", 'GET', lambda i, route=route: f"/api/v1/dashboard/{route}?{month}"))
+    scenarios.append(Scenario('dashboard/export', 'GET',
+                              lambda i: f"/api/v1/dashboard/export?from={start.isoformat()}&to={last_day}&format=csv"))
+    return scenarios
+
+
+def measure(fake: FakeSupabase, name: str, make_sender, iterations: int, concurrency: int, warmup: int) -> Result:
+    """
+    Ejecuta `iterations` peticiones repartidas en `concurrency` hilos y resume latencias
+    y llamadas a Supabase. make_sender() crea, una vez por hilo, send(i) -> (segundos, status).
+    """
+    warmup_send = make_sender()
+    for i in range(warmup):
+        warmup_send(i)
+
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    counter = iter(range(warmup, warmup + iterations))
+
+    def worker():
+        nonlocal errors
+        send = make_sender()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            elapsed, status = send(i)
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors += 1
+
+    calls_before = Counter(fake.calls)
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    calls = fake.calls - calls_before
+
+    latencies.sort()
+    count = len(latencies)
+    return Result(
+        name=name,
+        requests=count,
+        errors=errors,
+        p50_ms=round(percentile(latencies, 50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 95) * 1000, 2),
+        mean_ms=round(sum(latencies) / count * 1000, 2) if count else 0.0,
+        throughput=round(count / wall, 1) if wall else 0.0,
+        supabase_calls_per_request=round(sum(calls.values()) / count, 2) if count else 0.0,
+        supabase_calls={key: round(value / count, 2) for key, value in sorted(calls.items())} if count else {},
+    )
+
+
+def test_client_sender(app, scenario: Scenario, headers: dict):
+    """Envía las peticiones del escenario con el cliente de pruebas de Flask (sin red ni servidor)."""
+    def make_sender():
+        client = app.test_client()
+
+        def send(i):
+            kwargs = {"headers": headers}
+            if scenario.body is not None:
+                kwargs["json"] = scenario.body(i)
+            started = time.perf_counter()
+            response = client.open(scenario.path(i), method=scenario.method, **kwargs)
+            response.get_data() # consume también las respuestas en streaming
+            elapsed = time.perf_counter() - started
+            response.close()
+            return elapsed, response.status_code
+        return send
+    return make_sender
+
+
+def print_report(results: list, settings: dict, out=sys.stdout):
+    print("Configuración: " + ", ".join(f"{key}={value}" for key, value in settings.items()), file=out)
+    width = max([len('endpoint')] + [len(result.name) for result in results])
+    header = f"{'endpoint':<{width}} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8} {'sb/req':>7}  llamadas a Supabase por petición"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    for result in results:
+        breakdown = ", ".join(f"{key}={value:g}" for key, value in result.supabase_calls.items())
+        print(f"{result.name:<{width}} {result.requests:>5} {result.errors:>4} {result.p50_ms:>9.2f} {result.p95_ms:>9.2f} "
+              f"{result.throughput:>8.1f} {result.supabase_calls_per_request:>7.2f}  {breakdown}", file=out)
+
+
+def add_common_arguments(parser):
+    """Opciones de clínica sintética, carga y salida compartidas por los benchmarks."""
+    clinic = parser.add_argument_group('clínica sintética')
+    clinic.add_argument('--doctors', type=int, default=8, help='número de doctores (N)')
+    clinic.add_argument('--patients', type=int, default=2000, help='número de pacientes (M)')
+    clinic.add_argument('--per-day', type=int, default=40, help='citas por día (K)')
+    clinic.add_argument('--days', type=int, default=30, help='días con citas a partir de --start')
+    clinic.add_argument('--start', type=date.fromisoformat, default=date(2026, 3, 1), help='primer día (YYYY-MM-DD)')
+    clinic.add_argument('--seed', type=int, default=1, help='semilla de los datos y de la carga')
+    load = parser.add_argument_group('carga')
+    load.add_argument('--latency', type=float, default=20.0, help='latencia simulada por llamada a Supabase (ms)')
+    load.add_argument('--iterations', type=int, default=30, help='peticiones medidas por endpoint')
+    load.add_argument('--warmup', type=int, default=2, help='peticiones previas no medidas por endpoint')
+    load.add_argument('--concurrency', type=int, default=1, help='hilos cliente simultáneos')
+    load.add_argument('--only', action='append', default=[], help='medir solo los endpoints que contengan este texto (repetible)')
+    app_group = parser.add_argument_group('aplicación')
+    app_group.add_argument('--cold', action='store_true', help='desactivar las cachés de la aplicación')
+    app_group.add_argument('--no-rpc', action='store_true', help='sin las funciones ni vistas SQL de las migraciones (caminos alternativos)')
+    app_group.add_argument('--env', action='append', default=[], metavar='CLAVE=VALOR', help='variable de configuración extra (repetible)')
+    parser.add_argument('--json', metavar='RUTA', help='guardar también los resultados en JSON')
+    return app_group
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmark de la API contra un Supabase falso.')
+    app_group = add_common_arguments(parser)
+    app_group.add_argument('--log-level', default='WARNING', help='nivel del logger de la aplicación durante la medición')
+    return parser.parse_args(argv)
+
+
+def start_fake(args):
+    """Servidor falso con la clínica sintética; devuelve (fake, clínica)."""
+    fake = FakeSupabase(latency_ms=args.latency, rpc_handlers={} if args.no_rpc else RPC_HANDLERS,
+                        views={} if args.no_rpc else VIEWS)
+    clinic = seed_clinic(fake, doctors=args.doctors, patients=args.patients, per_day=args.per_day,
+                         days=args.days, start=args.start, seed=args.seed)
+    fake.start()
+    return fake, clinic
+
+
+def app_environment(args, supabase_url: str) -> dict:
+    """Variables de entorno de la aplicación bajo prueba."""
+    env = {**BASE_ENV, **(COLD_ENV if args.cold else {}), "SUPABASE_URL": supabase_url}
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    return env
+
+
+def select_scenarios(args, clinic: dict) -> list:
+    scenarios = build_scenarios(clinic, args.start, args.days, args.seed)
+    if args.only:
+        scenarios = [s for s in scenarios if any(text in s.name for text in args.only)]
+    return scenarios
+
+
+def report(args, clinic: dict, env: dict, results: list, **extra_settings) -> int:
+    """Imprime la tabla, guarda el JSON si se pidió y devuelve el código de salida."""
+    settings = {
+        **extra_settings,
+        "doctors": args.doctors, "patients": args.patients, "per_day": args.per_day, "days": args.days,
+        "appointments": len(clinic["appointments"]), "latency_ms": args.latency,
+        "iterations": args.iterations, "concurrency": args.concurrency,
+        "cold": args.cold, "rpc": not args.no_rpc,
+    }
+    print_report(results, settings)
+    if args.json:
+        overrides = {key: value for key, value in env.items() if key not in ("SUPABASE_URL", "SUPABASE_KEY")}
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({"settings": {**settings, "overrides": overrides}, "results": [vars(result) for result in results]},
+                      handle, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.json}")
+    return 0 if not any(result.errors for result in results) else 1
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake, clinic = start_fake(args)
+
+    # create_app lee la configuración del entorno (load_config): debe estar listo antes
+    env = app_environment(args, fake.url)
+    os.environ.update(env)
+    from app import create_app
+
+    app = create_app()
+    app.logger.setLevel(getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    results = []
+    try:
+        for scenario in select_scenarios(args, clinic):
+            sender = test_client_sender(app, scenario, headers)
+            results.append(measure(fake, scenario.name, sender, args.iterations, args.concurrency, args.warmup))
+    finally:
+        fake.stop()
+    return report(args, clinic, env, results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# Clínica sintética reproducible para los benchmarks
+
+import random
+from datetime import date, datetime, timedelta, timezone
+
+STATUSES = ["Programada", "En Espera", "En Consulta", "Completada", "Cancelada", "No Asistió"]
+# Proporción aproximada de estados en un mes ya transcurrido
+STATUS_WEIGHTS = [10, 5, 3, 65, 10, 7]
+SPECIALTIES = ["Oftalmología", "Retina", "Glaucoma", "Córnea", "Pediatría"]
+FIRST_NAMES = ["Ana", "Luis", "María", "José", "Elena", "Carlos", "Lucía", "Jorge", "Sofía", "Miguel", "Valeria", "Andrés"]
+LAST_NAMES = ["García", "Martínez", "López", "Hernández", "González", "Pérez", "Rodríguez", "Sánchez", "Ramírez", "Torres"]
+
+# Jornada en la que se reparten las citas de cada día (UTC)
+DAY_START_HOUR = 8
+DAY_MINUTES = 10 * 60
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def build_clinic(doctors: int = 8, patients: int = 2000, per_day: int = 40, days: int = 30,
+                 start: date = date(2026, 3, 1), seed: int = 1) -> dict:
+    """
+    Devuelve {tabla: filas} con `doctors` doctores, `patients` pacientes y `per_day`
+    citas por día durante `days` días desde `start`. La misma semilla da los mismos datos.
+    """
+    rng = random.Random(seed)
+    doctor_rows = [{
+        "id": doctor_id,
+        "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "specialty": rng.choice(SPECIALTIES),
+        "email": f"doctor{doctor_id}@clinica.example",
+        "phone_number": f"55{doctor_id:08d}",
+    } for doctor_id in range(1, doctors + 1)]
+    patient_rows = [{
+        "id": patient_id,
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "contact_info": f"55{patient_id:08d}",
+        "date_of_birth": (date(1940, 1, 1) + timedelta(days=rng.randrange(80 * 365))).isoformat(),
+    } for patient_id in range(1, patients + 1)]
+
+    appointment_rows = []
+    interval = timedelta(minutes=max(1, DAY_MINUTES // max(per_day, 1)))
+    doctor_choices = [None] + [row["id"] for row in doctor_rows] # algunas citas sin doctor asignado
+    for day_offset in range(days):
+        day = start + timedelta(days=day_offset)
+        first_slot = datetime(day.year, day.month, day.day, DAY_START_HOUR, tzinfo=timezone.utc)
+        for slot in range(per_day):
+            appointment_time = first_slot + interval * slot
+            status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+            arrival = consult_start = consult_end = None
+            if status in ("En Espera", "En Consulta", "Completada"):
+                arrival = appointment_time + timedelta(minutes=rng.randint(-15, 10))
+            if status in ("En Consulta", "Completada"):
+                consult_start = arrival + timedelta(minutes=rng.randint(0, 45))
+            if status == "Completada":
+                consult_end = consult_start + timedelta(minutes=rng.randint(5, 40))
+            created_at = appointment_time - timedelta(days=rng.randint(1, 20))
+            appointment_rows.append({
+                "id": len(appointment_rows) + 1,
+                "patient_id": rng.randint(1, patients) if patients else None,
+                "doctor_id": rng.choice(doctor_choices) if doctors else None,
+                "appointment_time": _iso(appointment_time),
+                "status": status,
+                "notes": None,
+                "created_at": _iso(created_at),
+                "updated_at": _iso(consult_end or consult_start or arrival or created_at),
+                "version": 1,
+                "arrival_time": _iso(arrival),
+                "consultation_start_time": _iso(consult_start),
+                "consultation_end_time": _iso(consult_end),
+            })
+    return {"doctors": doctor_rows, "patients": patient_rows, "appointments": appointment_rows}
+
+
+def seed_clinic(fake, **kwargs) -> dict:
+    """Carga una clínica sintética en el servidor falso y devuelve las filas creadas."""
+    clinic = build_clinic(**kwargs)
+    for table, rows in clinic.items():
+        fake.load(table, rows)
+    return clinic
@@ -0,0 +1,132 @@
+# Tiempo de arranque de la API: importación, create_app() y primera respuesta de /api/v1/health
+#
+#   python -m benchmarks.startup --budget-ms 500
+#   python -m benchmarks.startup --eager --top 20
+#
+# Cada medición es un proceso nuevo de Python (como un worker que arranca). Con
+# SUPABASE_LAZY_INIT (por defecto) el paquete supabase no debería cargarse antes de
+# que health responda. Un perfil con `python -X importtime` muestra los paquetes que
+# más tardan en importarse. Termina con código 1 si la mediana supera el presupuesto.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from .run import BASE_ENV
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en el proceso medido; imprime una línea JSON
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get('/api/v1/health').status_code
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_health_ms": (answered - created) * 1000,
+    "total_ms": (answered - started) * 1000,
+    "health_status": status,
+    "supabase_loaded": 'supabase' in sys.modules,
+}))
+"""
+
+# Paquetes cuya carga se informa aparte (dependencias de supabase-py)
+SUPABASE_PACKAGES = ('supabase', 'postgrest', 'supabase_auth', 'realtime', 'storage3', 'supabase_functions')
+
+
+def probe_environment(eager: bool) -> dict:
+    # Nunca se contacta: health no usa Supabase y el cliente perezoso no llega a crearse
+    env = {**os.environ, **BASE_ENV, "SUPABASE_URL": "http://127.0.0.1:9", "LOG_LEVEL": "WARNING"}
+    env["SUPABASE_LAZY_INIT"] = "false" if eager else "true"
+    return env
+
+
+def run_probe(env: dict, importtime: bool = False) -> tuple:
+    """Lanza un proceso nuevo; devuelve (medidas, salida de -X importtime)."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"El proceso medido falló:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def parse_importtime(output: str) -> list:
+    """Paquetes de primer nivel (sin '.') con su tiempo acumulado en ms, de mayor a menor."""
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if '.' in name or name.startswith('_'):
+            continue
+        # Un paquete se importa una sola vez: la primera aparición es la que cuenta
+        packages.setdefault(name, int(cumulative) / 1000)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup',
+                                     description='Tiempo de arranque de la API (importación, create_app y primer health).')
+    parser.add_argument('--repeat', type=int, default=5, help='procesos medidos (se informa la mediana)')
+    parser.add_argument('--budget-ms', type=float, default=500.0, help='presupuesto para la mediana del tiempo total')
+    parser.add_argument('--eager', action='store_true', help='SUPABASE_LAZY_INIT=false (para comparar)')
+    parser.add_argument('--top', type=int, default=12, help='paquetes más lentos a mostrar del perfil de importación')
+    parser.add_argument('--json', metavar='RUTA', help='guardar también los resultados en JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = probe_environment(args.eager)
+
+    run_probe(env) # descartado: compila los .pyc
+    runs = [run_probe(env)[0] for _ in range(args.repeat)]
+    _, importtime_output = run_probe(env, importtime=True)
+    packages = parse_importtime(importtime_output)
+
+    median = {key: statistics.median(run[key] for run in runs)
+              for key in ('import_ms', 'create_app_ms', 'first_health_ms', 'total_ms')}
+    supabase_loaded = any(run["supabase_loaded"] for run in runs)
+    health_ok = all(run["health_status"] == 200 for run in runs)
+
+    print(f"Arranque ({'eager' if args.eager else 'lazy'}, mediana de {args.repeat} procesos)")
+    for key, label in (('import_ms', 'importar app'), ('create_app_ms', 'create_app()'),
+                       ('first_health_ms', 'primer /api/v1/health'), ('total_ms', 'total')):
+        print(f"  {label:<24}{median[key]:9.1f} ms")
+    print(f"  supabase cargado antes de responder: {'sí' if supabase_loaded else 'no'}")
+    print("\nPaquetes más lentos de importar (-X importtime, acumulado):")
+    for name, ms in packages[:args.top]:
+        marker = '  (supabase-py)' if name in SUPABASE_PACKAGES else ''
+        print(f"  {name:<24}{ms:9.1f} ms{marker}")
+
+    failures = []
+    if median['total_ms'] > args.budget_ms:
+        failures.append(f"total {median['total_ms']:.1f} ms > presupuesto {args.budget_ms:.0f} ms")
+    if not health_ok:
+        failures.append("/api/v1/health no respondió 200")
+    if supabase_loaded and not args.eager:
+        failures.append("el paquete supabase se cargó antes de responder a health (¿import a nivel de módulo?)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({"mode": 'eager' if args.eager else 'lazy', "median": median, "runs": runs,
+                       "packages_ms": dict(packages[:args.top]), "budget_ms": args.budget_ms, "failures": failures},
+                      handle, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.json}")
+
+    for failure in failures:
+        print(f"FALLO: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import apiClient from './apiClient'; // Importar la instancia configurada de Axios
+import apiClient, { API_URL } from './apiClient'; // Importar la instancia configurada de Axios
 
 /**
  * Obtiene las citas con filtros opcionales.
@@ -35,6 +35,81 @@ export const getAppointments = async (filters = {}) => {
   }
 };
 
+/**
+ * Obtiene una página de citas (paginación por cursor).
+ * @param {object} filters - Mismos filtros que getAppointments.
+ * @param {object} page - { limit, after, count } (count: 'exact' | 'estimated' para pedir el total).
+ * @returns {Promise<object>} - Promesa que resuelve con { items, next_cursor, has_more, limit, total }.
+ */
+export const getAppointmentsPage = async (filters = {}, { limit = 50, after = null, count = null } = {}) => {
+  const params = { ...filters, limit };
+  if (after) params.after = after;
+  if (count) params.count = count;
+  return getAppointments(params);
+};
+
+/**
+ * Obtiene una cita por su ID (con paciente, doctor y tiempos calculados).
+ * @param {number} id - ID de la cita.
+ * @returns {Promise<object>} - Promesa que resuelve con la cita.
+ */
+export const getAppointmentById = async (id) => {
+  try {
+    const response = await apiClient.get(`/appointments/${id}`);
+    return response.data;
+  } catch (error) {
+    console.error(`Error en servicio getAppointmentById (ID: ${id}):`, error.response || error.message);
+    throw error.response?.data || { message: 'Error al obtener la cita.' };
+  }
+};
+
+/**
+ * Obtiene las citas modificadas y borradas desde un cursor (sincronización incremental).
+ * @param {string|null} since - Cursor devuelto por la llamada anterior; null para obtener el cursor actual.
+ * @returns {Promise<object>} - Promesa que resuelve con { changes, deleted, cursor, has_more, reset? }.
+ */
+export const getAppointmentChanges = async (since = null) => {
+  try {
+    const response = await apiClient.get('/appointments/changes', { params: since ? { since } : {} });
+    return response.data;
+  } catch (error) {
+    console.error("Error en servicio getAppointmentChanges:", error.response || error.message);
+    throw error.response?.data || { message: 'Error al sincronizar las citas.' };
+  }
+};
+
+/**
+ * Pide un ticket de un solo uso para abrir el stream SSE.
+ * EventSource no permite headers y el JWT no debe viajar en la URL.
+ * @returns {Promise<string>} - Ticket para openAppointmentsStream.
+ */
+export const getStreamTicket = async () => {
+  try {
+    const response = await apiClient.post('/appointments/stream/ticket');
+    return response.data.ticket;
+  } catch (error) {
+    console.error("Error en servicio getStreamTicket:", error.response || error.message);
+    throw error.response?.data || { message: 'Error al abrir el stream de citas.' };
+  }
+};
+
+/**
+ * Abre el stream SSE de cambios en citas.
+ * El ticket se canjea una sola vez: tras un error hay que cerrar y abrir con otro ticket.
+ * @param {string} ticket - Ticket de getStreamTicket.
+ * @param {object} handlers - { onChange(event), onResync(), onOpen(), onError() }.
+ * @returns {EventSource} - Conexión abierta (cerrar con .close()).
+ */
+export const openAppointmentsStream = (ticket, { onChange, onResync, onOpen, onError } = {}) => {
+  const url = `${API_URL}/appointments/stream?ticket=${encodeURIComponent(ticket)}`;
+  const source = new EventSource(url);
+  source.addEventListener('ready', () => onOpen?.());
+  source.addEventListener('appointment', (message) => onChange?.(JSON.parse(message.data)));
+  source.addEventListener('resync', () => onResync?.());
+  source.onerror = () => onError?.();
+  return source;
+};
+
 /**
  * Actualiza el estado (y otros campos) de una cita.
  * @param {number} id - ID de la cita a actualizar.
@@ -100,6 +175,10 @@ export const deleteAppointment = async (id) => {
 // Exportar las funciones
 export default {
   getAppointments,
+  getAppointmentsPage,
+  getAppointmentById,
+  getAppointmentChanges,
+  openAppointmentsStream,
   updateAppointment,
   createAppointment,
   deleteAppointment
@@ -14,6 +14,14 @@ const apiClient = axios.create({
   retryDelay: 1000
 });
 
+// Respuestas GET con ETag: { url -> { etag, data } }. Se revalidan con If-None-Match
+// y un 304 devuelve una copia de los datos guardados (sin volver a descargar el cuerpo).
+const ETAG_CACHE_MAX_ENTRIES = 100;
+const etagCache = new Map();
+let etagCacheToken = null;
+
+const etagCacheKey = (config) => apiClient.getUri(config);
+
 // Interceptor para añadir el token de autorización a CADA petición
 apiClient.interceptors.request.use(
   (config) => {
@@ -22,6 +30,19 @@ apiClient.interceptors.request.use(
     if (token) {
       config.headers['Authorization'] = `Bearer ${token}`;
     }
+    // Las respuestas guardadas son de la sesión actual
+    if (token !== etagCacheToken) {
+      etagCache.clear();
+      etagCacheToken = token;
+    }
+    if ((config.method || 'get').toLowerCase() === 'get') {
+      const cached = etagCache.get(etagCacheKey(config));
+      if (cached) {
+        config.headers['If-None-Match'] = cached.etag;
+      }
+      // 304 no es un error: el interceptor de respuesta lo resuelve con la copia guardada
+      config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+    }
     return config;
   },
   (error) => {
@@ -34,6 +55,20 @@ apiClient.interceptors.request.use(
 apiClient.interceptors.response.use(
   (response) => {
     // Procesar respuesta exitosa
+    if ((response.config.method || 'get').toLowerCase() === 'get') {
+      const key = etagCacheKey(response.config);
+      if (response.status === 304 && etagCache.has(key)) {
+        // Copia: los stores modifican los arrays que reciben
+        response.data = structuredClone(etagCache.get(key).data);
+        response.status = 200;
+      } else if (response.headers.etag) {
+        etagCache.delete(key); // Reinsertar al final (orden LRU)
+        etagCache.set(key, { etag: response.headers.etag, data: structuredClone(response.data) });
+        if (etagCache.size > ETAG_CACHE_MAX_ENTRIES) {
+          etagCache.delete(etagCache.keys().next().value);
+        }
+      }
+    }
     return response;
   },
   (error) => {
@@ -71,4 +106,5 @@ apiClient.interceptors.response.use(
   }
 );
 
+export { API_URL };
 export default apiClient;
\ No newline at end of file
@@ -130,6 +130,35 @@ export default {
     }
   },
   
+  /**
+   * Obtiene varios paneles del dashboard en una sola petición
+   * @param {number} month - Mes (1-12)
+   * @param {number} year - Año
+   * @param {Array<string>} [panels] - Paneles a incluir (por defecto los del DashboardView)
+   * @returns {Promise<Object>} Objeto con una clave por panel ({ stats, 'wait-time', ... })
+   */
+  async getDashboardBundle(month, year, panels = null) {
+    try {
+      const params = { month, year };
+      if (Array.isArray(panels) && panels.length > 0) {
+        params.panels = panels.join(',');
+      }
+      const response = await apiClient.get(`/dashboard/bundle`, {
+        params,
+        timeout: 10000
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error al obtener el bundle del dashboard:', error);
+      if (error.code === 'ECONNABORTED') {
+        throw new Error('Tiempo de espera agotado. Verifica tu conexión a internet.');
+      } else if (error.message === 'Network Error') {
+        throw new Error('Error de red. Verifica tu conexión o que el servidor esté en funcionamiento.');
+      }
+      throw error;
+    }
+  },
+
   /**
    * Verifica la conexión al servidor
    * @returns {Promise<boolean>} Estado de la conexión
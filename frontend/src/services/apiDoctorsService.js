@@ -15,6 +15,26 @@ export const getDoctors = async () => {
   }
 };
 
+/**
+ * Obtiene los horarios libres de un doctor en un día (UTC).
+ * @param {number|string} doctorId - ID del doctor.
+ * @param {string} date - Día en formato YYYY-MM-DD.
+ * @param {number} [slotMinutes=30] - Duración de cada hueco en minutos.
+ * @returns {Promise<Object>} - Promesa que resuelve con { free_slots, booked, ... }.
+ */
+export const getDoctorAvailability = async (doctorId, date, slotMinutes = 30) => {
+  try {
+    const response = await apiClient.get(`/doctors/${doctorId}/availability`, {
+      params: { date, slot_minutes: slotMinutes },
+    });
+    return response.data;
+  } catch (error) {
+    console.error("Error en servicio getDoctorAvailability:", error.response || error.message);
+    throw error.response?.data || { message: 'Error al obtener la disponibilidad del doctor.' };
+  }
+};
+
 export default {
     getDoctors,
+    getDoctorAvailability,
 };
\ No newline at end of file
@@ -11,6 +11,42 @@ export const getPatients = async (searchTerm = '') => {
   }
 };
 
+/**
+ * Obtiene una página de pacientes ordenados por nombre (paginación por cursor).
+ * @param {string} searchTerm - Texto a buscar en el nombre (opcional).
+ * @param {object} page - { limit, after, count } (count: 'exact' | 'estimated' para pedir el total).
+ * @returns {Promise<object>} - Promesa que resuelve con { items, next_cursor, has_more, limit, total }.
+ */
+export const getPatientsPage = async (searchTerm = '', { limit = 50, after = null, count = null } = {}) => {
+  try {
+    const params = { limit };
+    if (searchTerm) params.search = searchTerm;
+    if (after) params.after = after;
+    if (count) params.count = count;
+    const response = await apiClient.get('/patients', { params });
+    return response.data;
+  } catch (error) {
+    console.error("Error en servicio getPatientsPage:", error.response || error.message);
+    throw error.response?.data || { message: 'Error al obtener los pacientes.' };
+  }
+};
+
+/**
+ * Búsqueda rápida de pacientes por nombre (type-ahead).
+ * @param {string} query - Texto a buscar (mínimo 2 caracteres).
+ * @param {number} limit - Número máximo de resultados.
+ * @returns {Promise<Array>} - Promesa que resuelve con [{ id, name }] ordenados por relevancia.
+ */
+export const searchPatients = async (query, limit = 10) => {
+  try {
+    const response = await apiClient.get('/patients/search', { params: { q: query, limit } });
+    return response.data;
+  } catch (error) {
+    console.error("Error en servicio searchPatients:", error.response || error.message);
+    throw error.response?.data || { message: 'Error al buscar pacientes.' };
+  }
+};
+
 export const createPatient = async (patientData) => {
     try {
         const response = await apiClient.post('/patients', patientData);
@@ -55,6 +91,8 @@ export const deletePatient = async (id) => {
 
 export default {
     getPatients,
+    getPatientsPage,
+    searchPatients,
     createPatient,
     updatePatient, // Añadido
     deletePatient, // Añadido
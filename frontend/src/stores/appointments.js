@@ -1,6 +1,10 @@
 import { defineStore } from 'pinia';
 import { ref, computed } from 'vue';
 import apiAppointmentsService from '@/services/apiAppointmentsService';
+import { useAuthStore } from '@/stores/auth';
+
+// Citas por página (el servidor limita a PAGINATION_MAX_LIMIT)
+const PAGE_SIZE = 50;
 
 const getTodayDateString = () => {
     const today = new Date();
@@ -18,6 +22,16 @@ export const useAppointmentsStore = defineStore('appointments', () => {
   const sortDirection = ref('asc'); // Nuevo: dirección de ordenamiento
   const isLoading = ref(false);
   const error = ref(null);
+  const nextCursor = ref(null); // Cursor de la siguiente página (null si no hay más)
+  const totalCount = ref(null); // Total de citas que coinciden con los filtros
+  const isLoadingMore = ref(false);
+  const isLive = ref(false); // Stream SSE conectado: los cambios llegan como eventos
+  let eventSource = null;
+  let streamWanted = false; // La vista quiere el stream abierto (se reabre tras un corte)
+  let streamRetryTimer = null;
+  const syncCursor = ref(null); // Cursor de /appointments/changes (null: sincronización no disponible)
+  let isSyncing = false;
+  let syncTimer = null;
 
   // Getters
   const appointments = computed(() => appointmentsList.value);
@@ -29,6 +43,10 @@ export const useAppointmentsStore = defineStore('appointments', () => {
   const currentSortDirection = computed(() => sortDirection.value); // Nuevo: getter para dirección de orden
   const loading = computed(() => isLoading.value);
   const currentError = computed(() => error.value);
+  const hasMore = computed(() => nextCursor.value !== null);
+  const total = computed(() => totalCount.value);
+  const loadingMore = computed(() => isLoadingMore.value);
+  const live = computed(() => isLive.value);
   
   // Getter para los filtros y ordenamiento actuales
   const currentFilters = computed(() => {
@@ -109,34 +127,246 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     isLoading.value = true;
     error.value = null;
     appointmentsList.value = [];
+    nextCursor.value = null;
     try {
-      const data = await apiAppointmentsService.getAppointments(currentFilters.value);
-      appointmentsList.value = data || [];
+      // El cursor de cambios se pide junto con la lista; los cambios que se crucen se aplican dos veces sin efecto
+      const cursorRequest = apiAppointmentsService.getAppointmentChanges().catch(() => null);
+      // Solo la primera página; el resto se pide bajo demanda con fetchMoreAppointments
+      const page = await apiAppointmentsService.getAppointmentsPage(currentFilters.value, { limit: PAGE_SIZE, count: 'exact' });
+      syncCursor.value = (await cursorRequest)?.cursor ?? null;
+      appointmentsList.value = page.items || [];
+      nextCursor.value = page.next_cursor;
+      totalCount.value = page.total;
     } catch (err) {
       console.error("Error fetching appointments:", err);
       error.value = err.message || 'Error al cargar citas.';
       appointmentsList.value = [];
+      totalCount.value = null;
     } finally {
       isLoading.value = false;
     }
   }
 
+  /**
+   * Carga la siguiente página de citas con los filtros actuales y la añade a la lista.
+   */
+  async function fetchMoreAppointments() {
+    if (!nextCursor.value || isLoadingMore.value) return;
+    isLoadingMore.value = true;
+    error.value = null;
+    try {
+      const page = await apiAppointmentsService.getAppointmentsPage(currentFilters.value, { limit: PAGE_SIZE, after: nextCursor.value });
+      const knownIds = new Set(appointmentsList.value.map(appt => appt.id));
+      appointmentsList.value.push(...(page.items || []).filter(appt => !knownIds.has(appt.id)));
+      nextCursor.value = page.next_cursor;
+    } catch (err) {
+      console.error("Error fetching more appointments:", err);
+      error.value = err.message || 'Error al cargar más citas.';
+    } finally {
+      isLoadingMore.value = false;
+    }
+  }
+
+  // Versión conocida de la cita (control optimista): el servidor la exige (428 si falta)
+  // y responde 409 si otra persona modificó la cita después de leerla
+  async function withKnownVersion(id, payload) {
+    if (payload.version != null) return payload;
+    let current = appointmentsList.value.find(appt => appt.id === id);
+    if (current?.version == null) {
+      // Cita fuera de la lista cargada: se lee para conocer su versión
+      current = await apiAppointmentsService.getAppointmentById(id);
+    }
+    return current?.version != null ? { ...payload, version: current.version } : payload;
+  }
+
+  // La cita cambió en otro puesto (o no se conocía su versión): recargar para mostrar su estado real
+  function isStaleVersionError(err) {
+    return err?.error_type === 'version_conflict' || err?.error_type === 'version_required';
+  }
+
   async function updateAppointmentStatus(id, newStatus) {
      error.value = null;
      try {
-        const updatedAppointment = await apiAppointmentsService.updateAppointment(id, { status: newStatus });
-        const idx = appointmentsList.value.findIndex(appt => appt.id === id);
-        if (idx !== -1) {
-            appointmentsList.value[idx] = updatedAppointment;
-        } else {
-             fetchAppointments();
-        }
+        const updatedAppointment = await apiAppointmentsService.updateAppointment(id, await withKnownVersion(id, { status: newStatus }));
+        upsertAppointment(updatedAppointment);
      } catch (err) {
         console.error(`Error updating appointment ${id} status:`, err);
         error.value = err.message || 'Error al actualizar estado.';
+        if (isStaleVersionError(err)) {
+            fetchAppointments();
+        }
      }
   }
 
+  // ¿La cita entra en los filtros actuales? (mismo criterio que el servidor; la fecha es el día UTC)
+  function matchesFilters(appt) {
+    const filters = currentFilters.value;
+    if (filters.date && (appt.appointment_time || '').slice(0, 10) !== filters.date) return false;
+    if (filters.status && appt.status !== filters.status) return false;
+    if (filters.exclude_statuses && filters.exclude_statuses.includes(appt.status)) return false;
+    if (filters.doctor_id && String(appt.doctor?.id ?? '') !== String(filters.doctor_id)) return false;
+    if (filters.patient_name && !(appt.patient?.name || '').toLowerCase().includes(filters.patient_name.toLowerCase())) return false;
+    return true;
+  }
+
+  // Comparador con el orden actual de la lista (mismo desempate por id que el servidor)
+  function compareAppointments(a, b) {
+    const valueOf = (appt) => sortBy.value === 'patient.name'
+      ? (appt.patient?.name || '').toLowerCase()
+      : (appt[sortBy.value] ?? '');
+    const va = valueOf(a);
+    const vb = valueOf(b);
+    const result = va < vb ? -1 : va > vb ? 1 : a.id - b.id;
+    return sortDirection.value === 'desc' ? -result : result;
+  }
+
+  /**
+   * Coloca la cita en la lista (reemplaza, inserta en orden o quita si ya no entra en los filtros).
+   * Con más páginas pendientes, una cita que iría después de la última cargada se deja para esas páginas.
+   */
+  function upsertAppointment(appt) {
+    const idx = appointmentsList.value.findIndex(item => item.id === appt.id);
+    if (idx !== -1) appointmentsList.value.splice(idx, 1);
+    if (!matchesFilters(appt)) {
+      if (idx !== -1 && totalCount.value != null) totalCount.value -= 1;
+      return;
+    }
+    const list = appointmentsList.value;
+    const last = list[list.length - 1];
+    if (nextCursor.value && last && compareAppointments(appt, last) > 0) {
+      if (idx !== -1 && totalCount.value != null) totalCount.value -= 1;
+      return;
+    }
+    const position = list.findIndex(item => compareAppointments(appt, item) < 0);
+    list.splice(position === -1 ? list.length : position, 0, appt);
+    if (idx === -1 && totalCount.value != null) totalCount.value += 1;
+  }
+
+  function removeAppointment(id) {
+    const before = appointmentsList.value.length;
+    appointmentsList.value = appointmentsList.value.filter(appt => appt.id !== id);
+    if (appointmentsList.value.length < before && totalCount.value != null) totalCount.value -= 1;
+  }
+
+  /**
+   * Aplica un evento del stream: borra la cita, o pide solo esa cita (con paciente,
+   * doctor y tiempos calculados) y la coloca en la lista.
+   */
+  async function handleRealtimeUpdate(event) {
+    if (event.type === 'deleted') {
+      removeAppointment(event.id);
+      return;
+    }
+    const known = appointmentsList.value.some(appt => appt.id === event.id);
+    // Citas de otros días que no están en la lista no interesan
+    if (!known && selectedDate.value && (event.appointment_time || '').slice(0, 10) !== selectedDate.value) return;
+    try {
+      upsertAppointment(await apiAppointmentsService.getAppointmentById(event.id));
+    } catch (err) {
+      console.error(`Error aplicando evento de la cita ${event.id}:`, err);
+    }
+  }
+
+  /**
+   * Sincronización incremental: aplica solo las citas modificadas o borradas desde el último cursor.
+   */
+  async function syncChanges() {
+    if (!syncCursor.value || isSyncing || isLoading.value) return;
+    isSyncing = true;
+    try {
+      let hasMoreChanges = true;
+      while (hasMoreChanges) {
+        const delta = await apiAppointmentsService.getAppointmentChanges(syncCursor.value);
+        if (delta.reset) {
+          // El cursor es más viejo que las marcas de borrado conservadas
+          await fetchAppointments();
+          return;
+        }
+        (delta.changes || []).forEach(upsertAppointment);
+        (delta.deleted || []).forEach(removeAppointment);
+        syncCursor.value = delta.cursor;
+        hasMoreChanges = delta.has_more;
+      }
+    } catch (err) {
+      console.error("Error sincronizando citas:", err);
+    } finally {
+      isSyncing = false;
+    }
+  }
+
+  // Sincronización periódica como respaldo cuando el stream SSE no está conectado
+  function startPeriodicSync(intervalMs = 30000) {
+    stopPeriodicSync();
+    syncTimer = setInterval(() => {
+      if (!isLive.value) syncChanges();
+    }, intervalMs);
+  }
+
+  function stopPeriodicSync() {
+    clearInterval(syncTimer);
+    syncTimer = null;
+  }
+
+  // Recuperar eventos perdidos: cambios desde el cursor, o la lista completa si no hay cursor
+  function resync() {
+    if (syncCursor.value) {
+      syncChanges();
+    } else {
+      fetchAppointments();
+    }
+  }
+
+  // Stream SSE de cambios: mantiene la lista al día sin recargar el día completo
+  function subscribeToRealtimeUpdates() {
+    if (streamWanted || !useAuthStore().token || typeof EventSource === 'undefined') return;
+    streamWanted = true;
+    openStream(false);
+  }
+
+  async function openStream(reconnecting) {
+    let ticket;
+    try {
+      ticket = await apiAppointmentsService.getStreamTicket();
+    } catch {
+      scheduleStreamReconnect();
+      return;
+    }
+    if (!streamWanted) return; // Se cerró la vista mientras se pedía el ticket
+    eventSource = apiAppointmentsService.openAppointmentsStream(ticket, {
+      onChange: handleRealtimeUpdate,
+      onOpen: () => {
+        isLive.value = true;
+        // Tras un corte pudieron perderse eventos: pedir solo lo que cambió
+        if (reconnecting) resync();
+      },
+      onResync: resync,
+      onError: () => {
+        // El ticket ya se canjeó: EventSource no puede reconectar con la misma URL
+        isLive.value = false;
+        eventSource?.close();
+        eventSource = null;
+        scheduleStreamReconnect();
+      },
+    });
+  }
+
+  function scheduleStreamReconnect() {
+    if (!streamWanted || streamRetryTimer) return;
+    streamRetryTimer = setTimeout(() => {
+      streamRetryTimer = null;
+      if (streamWanted) openStream(true);
+    }, 5000);
+  }
+
+  function unsubscribeFromRealtimeUpdates() {
+    streamWanted = false;
+    clearTimeout(streamRetryTimer);
+    streamRetryTimer = null;
+    eventSource?.close();
+    eventSource = null;
+    isLive.value = false;
+  }
+
   /**
    * Crea una nueva cita y la añade a la lista si es del día seleccionado.
    * @param {object} appointmentData - Datos de la cita.
@@ -147,8 +377,12 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     error.value = null;
     try {
         const newAppointment = await apiAppointmentsService.createAppointment(appointmentData);
-        // Refrescar la lista con los filtros actuales
-        await fetchAppointments();
+        if (isLive.value) {
+          // El evento 'created' del stream la añadirá; aquí solo se pide esa cita
+          await handleRealtimeUpdate({ type: 'created', id: newAppointment.id, appointment_time: newAppointment.appointment_time });
+        } else {
+          await fetchAppointments();
+        }
         return true; // Indicar éxito
     } catch (err) {
         console.error("Error creating appointment:", err);
@@ -174,7 +408,7 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     try {
       await apiAppointmentsService.deleteAppointment(id);
       // Eliminar la cita de la lista local
-      appointmentsList.value = appointmentsList.value.filter(appt => appt.id !== id);
+      removeAppointment(id);
       return true; // Indicar éxito
     } catch (err) {
       console.error(`Error deleting appointment ${id}:`, err);
@@ -195,13 +429,16 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     isLoading.value = true;
     error.value = null;
     try {
-      const updatedAppointment = await apiAppointmentsService.updateAppointment(id, appointmentData);
-      // Refrescar la lista con los filtros actuales
-      await fetchAppointments();
+      const updatedAppointment = await apiAppointmentsService.updateAppointment(id, await withKnownVersion(id, appointmentData));
+      // La respuesta ya trae la cita completa: colocarla en la lista sin recargar
+      upsertAppointment(updatedAppointment);
       return true; // Indicar éxito
     } catch (err) {
       console.error(`Error updating appointment ${id}:`, err);
       error.value = err.message || 'Error al actualizar la cita.';
+      if (isStaleVersionError(err)) {
+        fetchAppointments();
+      }
       // Si es el error específico de doctor no disponible, propagarlo
       if (err.error_type === 'doctor_unavailable') {
         throw err; // Propagar el error con su tipo específico
@@ -212,11 +449,6 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     }
   }
 
-  // Realtime (placeholder)
-  function handleRealtimeUpdate(payload) { console.log("Realtime Update:", payload); fetchAppointments(); }
-  function subscribeToRealtimeUpdates() { console.log("Subscribing..."); }
-  function unsubscribeFromRealtimeUpdates() { console.log("Unsubscribing..."); }
-
   return {
     // State
     appointmentsList, selectedDate, isLoading, error, 
@@ -225,11 +457,13 @@ export const useAppointmentsStore = defineStore('appointments', () => {
     // Getters
     appointments, date, loading, currentError, 
     status, doctorId, patientName, currentFilters,
+    hasMore, total, loadingMore, live,
     currentSortBy, currentSortDirection, // Nuevos getters
     // Actions
-    setSelectedDate, fetchAppointments, updateAppointmentStatus,
+    setSelectedDate, fetchAppointments, fetchMoreAppointments, updateAppointmentStatus,
     createAppointment, deleteAppointment, updateAppointmentData,
     subscribeToRealtimeUpdates, unsubscribeFromRealtimeUpdates,
+    syncChanges, startPeriodicSync, stopPeriodicSync,
     setSelectedStatus, setSelectedDoctorId, setSearchPatientName, clearFilters,
     setSorting, toggleSortDirection // Nuevas acciones
   };
@@ -23,11 +23,18 @@ export const useDashboardStore = defineStore('dashboard', () => {
     avgConsultTime: 0,
     appointmentsByDoctor: []
   });
+  // Series diarias para los gráficos (se llenan con fetchDashboardBundle)
+  const dailyCharts = ref({
+    waitTime: [],
+    consultTime: [],
+    appointmentsByDay: []
+  });
   const isLoading = ref(false);
   const error = ref(null);
   
   // Getters
   const stats = computed(() => dashboardStats.value);
+  const charts = computed(() => dailyCharts.value);
   const loading = computed(() => isLoading.value);
   const currentError = computed(() => error.value);
   
@@ -61,6 +68,43 @@ export const useDashboardStore = defineStore('dashboard', () => {
     }
   }
   
+  /**
+   * Carga estadísticas, citas por doctor y las series diarias en una sola petición.
+   * @param {number} month - Mes (1-12)
+   * @param {number} year - Año
+   */
+  async function fetchDashboardBundle(month, year) {
+    isLoading.value = true;
+    error.value = null;
+    
+    try {
+      const bundle = await apiDashboardService.getDashboardBundle(month, year);
+      dashboardStats.value = {
+        ...bundle.stats,
+        appointmentsByDoctor: bundle['appointments-by-doctor'] || []
+      };
+      dailyCharts.value = {
+        waitTime: bundle['wait-time'] || [],
+        consultTime: bundle['consult-time'] || [],
+        appointmentsByDay: bundle['appointments-by-day'] || []
+      };
+    } catch (err) {
+      console.error('Error al cargar el bundle del dashboard:', err);
+      error.value = err.message || 'Error al cargar estadísticas.';
+      
+      // Si estamos en modo desarrollo, usar datos de prueba
+      if (import.meta.env.DEV) {
+        console.warn('Usando datos de prueba para el dashboard');
+        dashboardStats.value = { ...mockData };
+        dailyCharts.value = { waitTime: [], consultTime: [], appointmentsByDay: [] };
+        // Eliminar el error para que se muestren los datos de prueba
+        error.value = null;
+      }
+    } finally {
+      isLoading.value = false;
+    }
+  }
+  
   async function fetchWaitTimeData(month, year) {
     try {
       // Obtener datos reales del API
@@ -153,9 +197,11 @@ export const useDashboardStore = defineStore('dashboard', () => {
   
   return {
     stats,
+    charts,
     loading,
     currentError,
     fetchDashboardStats,
+    fetchDashboardBundle,
     fetchWaitTimeData,
     fetchConsultTimeData,
     fetchAppointmentsByDoctor,
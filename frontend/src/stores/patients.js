@@ -2,18 +2,31 @@ import { defineStore } from 'pinia';
 import { ref, computed } from 'vue';
 import apiPatientsService from '@/services/apiPatientsService';
 
+// Pacientes por página (el servidor limita a PAGINATION_MAX_LIMIT)
+const PAGE_SIZE = 50;
+
 export const usePatientsStore = defineStore('patients', () => {
   // State
   const patientList = ref([]);
   const isLoading = ref(false);
   const error = ref(null);
   const searchTerm = ref('');
+  const nextCursor = ref(null); // Cursor de la siguiente página (null si no hay más)
+  const totalCount = ref(null); // Total de pacientes que coinciden (primera página)
+  const isLoadingMore = ref(false);
+  const searchResults = ref([]); // Resultados de la búsqueda rápida (type-ahead)
+  const isSearching = ref(false);
 
   // Getters
   const patients = computed(() => patientList.value);
   const loading = computed(() => isLoading.value);
   const currentError = computed(() => error.value);
   const currentSearchTerm = computed(() => searchTerm.value);
+  const hasMore = computed(() => nextCursor.value !== null);
+  const total = computed(() => totalCount.value);
+  const loadingMore = computed(() => isLoadingMore.value);
+  const quickSearchResults = computed(() => searchResults.value);
+  const searching = computed(() => isSearching.value);
 
   // Actions
   async function fetchPatients(force = false, search = '') {
@@ -34,18 +47,68 @@ export const usePatientsStore = defineStore('patients', () => {
     isLoading.value = true;
     error.value = null;
     try {
-      const data = await apiPatientsService.getPatients(searchTerm.value);
-      patientList.value = data || [];
-      patientList.value.sort((a, b) => a.name.localeCompare(b.name));
+      // Solo la primera página; el resto se pide bajo demanda con fetchMorePatients
+      const page = await apiPatientsService.getPatientsPage(searchTerm.value, { limit: PAGE_SIZE, count: 'exact' });
+      patientList.value = page.items || [];
+      nextCursor.value = page.next_cursor;
+      totalCount.value = page.total;
     } catch (err) {
       console.error("Error fetching patients:", err);
       error.value = err.message || 'Error al cargar pacientes.';
       patientList.value = [];
+      nextCursor.value = null;
+      totalCount.value = null;
     } finally {
       isLoading.value = false;
     }
   }
 
+  /**
+   * Carga la siguiente página de pacientes y la añade a la lista.
+   */
+  async function fetchMorePatients() {
+    if (!nextCursor.value || isLoadingMore.value) return;
+    isLoadingMore.value = true;
+    error.value = null;
+    try {
+      const page = await apiPatientsService.getPatientsPage(searchTerm.value, { limit: PAGE_SIZE, after: nextCursor.value });
+      const knownIds = new Set(patientList.value.map(p => p.id));
+      patientList.value.push(...(page.items || []).filter(p => !knownIds.has(p.id)));
+      nextCursor.value = page.next_cursor;
+    } catch (err) {
+      console.error("Error fetching more patients:", err);
+      error.value = err.message || 'Error al cargar más pacientes.';
+    } finally {
+      isLoadingMore.value = false;
+    }
+  }
+
+  /**
+   * Búsqueda rápida por nombre (type-ahead). No modifica la lista paginada.
+   * @param {string} query - Texto escrito por el usuario.
+   * @param {number} limit - Número máximo de resultados.
+   */
+  let lastSearchId = 0;
+  async function searchPatients(query, limit = 10) {
+    const term = (query || '').trim();
+    if (term.length < 2) {
+      searchResults.value = [];
+      return;
+    }
+    const searchId = ++lastSearchId;
+    isSearching.value = true;
+    try {
+      const results = await apiPatientsService.searchPatients(term, limit);
+      // Ignorar respuestas de búsquedas anteriores que lleguen tarde
+      if (searchId === lastSearchId) searchResults.value = results || [];
+    } catch (err) {
+      console.error("Error searching patients:", err);
+      if (searchId === lastSearchId) searchResults.value = [];
+    } finally {
+      if (searchId === lastSearchId) isSearching.value = false;
+    }
+  }
+
   async function createPatient(patientData) {
     // isLoading.value = true; // Podrías usar un loading específico
     error.value = null;
@@ -108,6 +171,9 @@ export const usePatientsStore = defineStore('patients', () => {
 
   return {
     patients, loading, currentError, currentSearchTerm,
-    fetchPatients, createPatient, updatePatient, deletePatient, // Añadidos update y delete
+    hasMore, total, loadingMore,
+    quickSearchResults, searching,
+    fetchPatients, fetchMorePatients, searchPatients,
+    createPatient, updatePatient, deletePatient, // Añadidos update y delete
   };
 });
\ No newline at end of file
@@ -0,0 +1,86 @@
+# Configuración de gunicorn para producción
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# La API pasa casi todo el tiempo esperando a Supabase (I/O), así que se usan pocos
+# procesos con muchos hilos (gthread): los hilos esperan en paralelo y las cachés
+# por worker (tokens, dashboard, doctores) se comparten entre más peticiones.
+# Cada stream SSE (/appointments/stream) ocupa un hilo mientras está abierto; EVENTS_MAX_STREAMS
+# acota cuántos por worker (por defecto 8 de los 16 hilos) y por encima responde 503.
+# Todos los valores se pueden ajustar con variables de entorno.
+
+import multiprocessing
+import os
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Procesos: uno por núcleo (el trabajo de CPU, JSON y agregaciones, no escala con hilos por el GIL)
+workers = _int_env('GUNICORN_WORKERS', _int_env('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count())))
+# La app lo lee (WEB_CONCURRENCY en su configuración) para acotar las cachés que no se comparten entre workers
+os.environ['WEB_CONCURRENCY'] = str(workers)
+# Hilos por proceso: llamadas concurrentes a Supabase y conexiones SSE abiertas
+worker_class = 'gthread'
+threads = _int_env('GUNICORN_THREADS', 16)
+
+# La fábrica se ejecuta una vez en el master y los workers la heredan (copy-on-write).
+# Lo que no sobrevive al fork (conexiones, hilos) se reabre en post_fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Reciclar workers cada N peticiones (con jitter para no reiniciarlos todos a la vez):
+# acota el crecimiento de memoria de las cachés por proceso
+max_requests = _int_env('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _int_env('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# timeout: un worker que no da señales en este tiempo se reinicia. Con gthread la
+# señal la da el bucle principal, así que un stream SSE largo no lo dispara
+timeout = _int_env('GUNICORN_TIMEOUT', 30)
+# Tiempo para terminar las peticiones en curso al reiniciar o reciclar un worker.
+# Los streams SSE se cortan y EventSource reconecta solo
+graceful_timeout = _int_env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _int_env('GUNICORN_KEEPALIVE', 5)
+
+# El heartbeat de los workers en memoria (en Docker /tmp puede ser un overlay lento)
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None # '-' para stdout; la API ya registra un resumen por petición
+# Formato por defecto, pero con la ruta sin query string (%(U)s en lugar de %(r)s):
+# las credenciales que viajan en la URL (tickets de /appointments/stream) no llegan al log
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    from app.config import load_config
+    Config = load_config() # carga también el .env
+    if preload_app and Config.SUPABASE_LAZY_INIT:
+        # Con preload conviene crear el cliente de Supabase (y cargar sus paquetes)
+        # una sola vez en el master: los workers lo heredan ya construido
+        from app.extensions import get_supabase
+        get_supabase()
+        server.log.info("Cliente de Supabase creado en el master (preload)")
+    if workers > 1:
+        if Config.EVENTS_BACKEND == 'memory':
+            server.log.warning("EVENTS_BACKEND=memory con varios workers: los eventos SSE no llegan a los clientes de otros workers (usar 'redis')")
+        if Config.AUTH_REVOCATION_BACKEND == 'memory' and Config.AUTH_CACHE_MAXSIZE > 0:
+            server.log.warning("AUTH_REVOCATION_BACKEND=memory con varios workers: tras un logout los demás workers aceptan el token hasta AUTH_CACHE_TTL (usar 'redis')")
+        if Config.DASHBOARD_CACHE_BACKEND == 'memory':
+            server.log.warning("DASHBOARD_CACHE_BACKEND=memory con varios workers: cada worker invalida solo su propia caché; los paneles se guardan como mucho DASHBOARD_CACHE_MEMORY_MAX_TTL (usar 'redis')")
+
+
+def post_fork(server, worker):
+    """Recursos por worker: pool de conexiones a Supabase y pool de hilos propios."""
+    if not preload_app:
+        return # Sin preload cada worker crea la app después del fork
+    from wsgi import app
+    from app.extensions import reset_supabase_connections, init_fanout_executor
+    reset_supabase_connections()
+    init_fanout_executor(app.config.get('FANOUT_MAX_WORKERS', 8))
+    server.log.info(f"Worker {worker.pid}: conexiones a Supabase y pool de hilos reiniciados")
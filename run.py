@@ -12,6 +12,7 @@ app = create_app()
 if __name__ == '__main__':
     # Obtener puerto del entorno o usar 5000 por defecto
     port = int(os.environ.get('PORT', 5000))
-    # Ejecutar en modo debug SOLO para desarrollo (leer desde variable de entorno es mejor)
-    debug_mode = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
+    # Servidor de desarrollo; en producción usar gunicorn (gunicorn -c gunicorn.conf.py wsgi:app).
+    # El modo debug (recarga y depurador interactivo) solo se activa con FLASK_DEBUG=true
+    debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     app.run(debug=debug_mode, host='0.0.0.0', port=port)
\ No newline at end of file
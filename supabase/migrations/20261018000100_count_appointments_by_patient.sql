@@ -0,0 +1,19 @@
+-- Conteo de citas por paciente en una sola consulta.
+-- Usado por GET /api/v1/appointments para calcular is_recurring_patient
+-- sin lanzar una consulta por fila.
+
+create index if not exists appointments_patient_id_idx
+    on public.appointments (patient_id);
+
+create or replace function public.count_appointments_by_patient(patient_ids bigint[])
+returns table (patient_id bigint, appointment_count bigint)
+language sql
+stable
+as $$
+    select a.patient_id, count(*) as appointment_count
+    from public.appointments a
+    where a.patient_id = any (patient_ids)
+    group by a.patient_id;
+$$;
+
+grant execute on function public.count_appointments_by_patient(bigint[]) to anon, authenticated;
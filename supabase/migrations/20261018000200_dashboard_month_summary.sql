@@ -0,0 +1,76 @@
+-- Métricas del dashboard calculadas en Postgres.
+-- Devuelve totales, sumas/conteos de espera y consulta, citas por día, por doctor
+-- y por estado del rango indicado, sin enviar las filas de citas a la API.
+-- Los promedios se calculan en Python a partir de sumas y conteos para conservar
+-- el mismo redondeo que el cálculo en memoria.
+-- Como el cálculo en memoria, 'by_doctor' cuenta también las citas de un doctor sin
+-- fila en public.doctors (nombre 'Doctor #<id>') y omite las citas sin doctor.
+
+create index if not exists appointments_appointment_time_idx
+    on public.appointments (appointment_time);
+
+create or replace function public.dashboard_month_summary(p_start timestamptz, p_end timestamptz)
+returns jsonb
+language sql
+stable
+as $$
+    with month_appointments as (
+        select
+            a.id,
+            a.doctor_id,
+            a.status,
+            extract(day from a.appointment_time at time zone 'UTC')::int as day,
+            case when a.consultation_start_time >= a.arrival_time
+                 then floor(extract(epoch from (a.consultation_start_time - a.arrival_time)) / 60)::int
+            end as wait_minutes,
+            case when a.consultation_end_time >= a.consultation_start_time
+                 then floor(extract(epoch from (a.consultation_end_time - a.consultation_start_time)) / 60)::int
+            end as consult_minutes
+        from public.appointments a
+        where a.appointment_time >= p_start
+          and a.appointment_time <= p_end
+    )
+    select jsonb_build_object(
+        'total', (select count(*) from month_appointments),
+        'wait_sum', (select coalesce(sum(wait_minutes), 0) from month_appointments),
+        'wait_count', (select count(wait_minutes) from month_appointments),
+        'consult_sum', (select coalesce(sum(consult_minutes), 0) from month_appointments),
+        'consult_count', (select count(consult_minutes) from month_appointments),
+        'daily', coalesce((
+            select jsonb_agg(d order by d.day)
+            from (
+                select day,
+                       count(*) as count,
+                       coalesce(sum(wait_minutes), 0) as wait_sum,
+                       count(wait_minutes) as wait_count,
+                       coalesce(sum(consult_minutes), 0) as consult_sum,
+                       count(consult_minutes) as consult_count
+                from month_appointments
+                group by day
+            ) d
+        ), '[]'::jsonb),
+        'by_doctor', coalesce((
+            select jsonb_agg(jsonb_build_object('id', d.id, 'name', d.name, 'count', d.count) order by d.first_id)
+            from (
+                select m.doctor_id as id,
+                       coalesce(doc.name, 'Doctor #' || m.doctor_id) as name,
+                       count(*) as count,
+                       min(m.id) as first_id
+                from month_appointments m
+                left join public.doctors doc on doc.id = m.doctor_id
+                where m.doctor_id is not null
+                group by m.doctor_id, doc.name
+            ) d
+        ), '[]'::jsonb),
+        'status_count', coalesce((
+            select jsonb_agg(s)
+            from (
+                select status, count(*) as count
+                from month_appointments
+                group by status
+            ) s
+        ), '[]'::jsonb)
+    );
+$$;
+
+grant execute on function public.dashboard_month_summary(timestamptz, timestamptz) to anon, authenticated;
@@ -0,0 +1,19 @@
+-- Vista de citas con el nombre del paciente como columna propia.
+-- Permite a GET /api/v1/appointments?sort_by=patient.name ordenar y paginar
+-- (keyset sobre patient_sort_name, id) en la base de datos en lugar de en Python.
+-- security_invoker: la vista respeta las políticas RLS de appointments y patients.
+
+create index if not exists patients_lower_name_idx
+    on public.patients (lower(name), id);
+
+create or replace view public.appointments_with_patient
+with (security_invoker = true)
+as
+select
+    a.*,
+    p.name as patient_name,
+    coalesce(lower(p.name), '') as patient_sort_name
+from public.appointments a
+left join public.patients p on p.id = a.patient_id;
+
+grant select on public.appointments_with_patient to anon, authenticated;
@@ -0,0 +1,45 @@
+-- Búsqueda de pacientes por nombre (type-ahead) sin recorrer toda la tabla.
+-- Índice trigram sobre el nombre normalizado (minúsculas y sin acentos) y
+-- función search_patients que devuelve los mejores k resultados ordenados:
+-- primero los nombres que empiezan por el texto, luego por similitud.
+-- % y _ en el texto se buscan literalmente (se escapan antes de usarlo en LIKE).
+
+create extension if not exists pg_trgm with schema extensions;
+create extension if not exists unaccent with schema extensions;
+
+-- unaccent() no es IMMUTABLE; este envoltorio fija el diccionario para poder indexarlo
+create or replace function public.normalize_patient_name(value text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select lower(extensions.unaccent('extensions.unaccent'::regdictionary, coalesce(value, '')));
+$$;
+
+create index if not exists patients_name_trgm_idx
+    on public.patients using gin (public.normalize_patient_name(name) extensions.gin_trgm_ops);
+
+create or replace function public.search_patients(q text, max_results int default 10)
+returns table (id bigint, name text, rank real)
+language sql
+stable
+as $$
+    with normalized as (
+        select public.normalize_patient_name(q) as value
+    ), term as (
+        select value,
+               replace(replace(replace(value, '\', '\\'), '%', '\%'), '_', '\_') as pattern
+        from normalized
+    )
+    select p.id, p.name,
+           (case when public.normalize_patient_name(p.name) like term.pattern || '%' escape '\' then 1 else 0 end
+            + extensions.word_similarity(term.value, public.normalize_patient_name(p.name)))::real as rank
+    from public.patients p, term
+    where public.normalize_patient_name(p.name) like '%' || term.pattern || '%' escape '\'
+       or term.value operator(extensions.<%) public.normalize_patient_name(p.name)
+    order by rank desc, p.name, p.id
+    limit least(greatest(max_results, 1), 50);
+$$;
+
+grant execute on function public.search_patients(text, int) to anon, authenticated;
@@ -0,0 +1,147 @@
+-- Actualización atómica de citas en un solo viaje (PUT /api/v1/appointments/<id>).
+-- La función bloquea la fila, valida la máquina de estados, registra las marcas de
+-- tiempo, comprueba la disponibilidad del doctor (±30 minutos) y devuelve la cita
+-- con paciente y doctor. La columna version permite un control optimista: el
+-- cliente envía la versión que vio y, si otra recepcionista ya modificó la cita,
+-- se responde 409 en lugar de sobrescribir. La versión es obligatoria.
+--
+-- Errores (PostgREST traduce los SQLSTATE PTxxx al código HTTP xxx):
+--   PT428 version_required
+--   PT404 appointment_not_found
+--   PT409 version_conflict   (detail: versión actual)
+--   PT409 doctor_unavailable (detail: hora solicitada)
+--   PT400 invalid_transition (detail: mensaje para el usuario)
+
+alter table public.appointments
+    add column if not exists version integer not null default 1;
+
+-- La vista de ordenamiento expande a.*: se recrea para incluir la nueva columna
+drop view if exists public.appointments_with_patient;
+create view public.appointments_with_patient
+with (security_invoker = true)
+as
+select
+    a.*,
+    p.name as patient_name,
+    coalesce(lower(p.name), '') as patient_sort_name
+from public.appointments a
+left join public.patients p on p.id = a.patient_id;
+
+grant select on public.appointments_with_patient to anon, authenticated;
+
+create index if not exists appointments_doctor_time_idx
+    on public.appointments (doctor_id, appointment_time);
+
+create or replace function public.update_appointment(
+    p_id bigint,
+    p_changes jsonb default '{}'::jsonb,
+    p_status text default null,
+    p_expected_version integer default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    current_row public.appointments%rowtype;
+    new_row public.appointments%rowtype;
+    allowed text[];
+    now_utc timestamptz := now();
+begin
+    if p_expected_version is null then
+        raise exception 'version_required' using errcode = 'PT428';
+    end if;
+
+    select * into current_row from public.appointments where id = p_id for update;
+    if not found then
+        raise exception 'appointment_not_found' using errcode = 'PT404';
+    end if;
+
+    if current_row.version <> p_expected_version then
+        raise exception 'version_conflict' using errcode = 'PT409', detail = current_row.version::text;
+    end if;
+
+    new_row := current_row;
+    if p_changes ? 'doctor_id' then
+        new_row.doctor_id := (p_changes ->> 'doctor_id')::bigint;
+    end if;
+    if p_changes ? 'appointment_time' then
+        new_row.appointment_time := (p_changes ->> 'appointment_time')::timestamptz;
+    end if;
+    if p_changes ? 'notes' then
+        new_row.notes := p_changes ->> 'notes';
+    end if;
+
+    -- Disponibilidad del doctor: solo si se envía doctor_id (mismo criterio que la API)
+    if p_changes ? 'doctor_id' and new_row.doctor_id is not null then
+        -- Serializa las asignaciones concurrentes al mismo doctor
+        perform pg_advisory_xact_lock(hashtext('appointments:doctor:' || new_row.doctor_id));
+        if exists (
+            select 1
+            from public.appointments a
+            where a.doctor_id = new_row.doctor_id
+              and a.id <> p_id
+              and a.appointment_time between new_row.appointment_time - interval '30 minutes'
+                                         and new_row.appointment_time + interval '30 minutes'
+        ) then
+            raise exception 'doctor_unavailable' using errcode = 'PT409',
+                detail = to_jsonb(new_row.appointment_time) #>> '{}';
+        end if;
+    end if;
+
+    if p_status is not null and p_status is distinct from current_row.status then
+        allowed := case current_row.status
+            when 'Programada' then array['En Espera', 'Cancelada', 'No Asistió']
+            when 'En Espera' then array['En Consulta', 'Cancelada', 'No Asistió']
+            when 'En Consulta' then array['Completada', 'Cancelada', 'No Asistió']
+            else array[]::text[]
+        end;
+        if not (p_status = any (allowed)) then
+            raise exception 'invalid_transition' using errcode = 'PT400',
+                detail = format('No se puede cambiar el estado de ''%s'' a ''%s''', current_row.status, p_status);
+        end if;
+        new_row.status := p_status;
+        if p_status = 'En Espera' and new_row.arrival_time is null then
+            new_row.arrival_time := now_utc;
+        elsif p_status = 'En Consulta' and new_row.consultation_start_time is null then
+            new_row.consultation_start_time := now_utc;
+        elsif p_status = 'Completada' and new_row.consultation_end_time is null then
+            new_row.consultation_end_time := now_utc;
+        end if;
+    end if;
+
+    if new_row is distinct from current_row then
+        update public.appointments
+        set doctor_id = new_row.doctor_id,
+            appointment_time = new_row.appointment_time,
+            notes = new_row.notes,
+            status = new_row.status,
+            arrival_time = new_row.arrival_time,
+            consultation_start_time = new_row.consultation_start_time,
+            consultation_end_time = new_row.consultation_end_time,
+            version = current_row.version + 1
+        where id = p_id
+        returning * into new_row;
+    end if;
+
+    return jsonb_build_object(
+        'appointment', jsonb_build_object(
+            'id', new_row.id,
+            'appointment_time', new_row.appointment_time,
+            'status', new_row.status,
+            'notes', new_row.notes,
+            'created_at', new_row.created_at,
+            'arrival_time', new_row.arrival_time,
+            'consultation_start_time', new_row.consultation_start_time,
+            'consultation_end_time', new_row.consultation_end_time,
+            'version', new_row.version,
+            'patient', (select jsonb_build_object('id', p.id, 'name', p.name)
+                        from public.patients p where p.id = new_row.patient_id),
+            'doctor', (select jsonb_build_object('id', d.id, 'name', d.name)
+                       from public.doctors d where d.id = new_row.doctor_id)
+        ),
+        'previous_appointment_time', current_row.appointment_time
+    );
+end;
+$$;
+
+grant execute on function public.update_appointment(bigint, jsonb, text, integer) to anon, authenticated;
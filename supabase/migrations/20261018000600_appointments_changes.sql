@@ -0,0 +1,78 @@
+-- Sincronización incremental de citas (GET /api/v1/appointments/changes?since=).
+-- updated_at se mantiene con un trigger en cada insert/update; las citas borradas
+-- dejan una marca (tombstone) para que los clientes las quiten de su lista.
+-- clock_timestamp() (y no now()) para que dos cambios de la misma transacción
+-- larga no compartan la hora de inicio de la transacción.
+
+alter table public.appointments
+    add column if not exists updated_at timestamptz;
+
+update public.appointments
+set updated_at = coalesce(created_at, now())
+where updated_at is null;
+
+alter table public.appointments
+    alter column updated_at set default clock_timestamp(),
+    alter column updated_at set not null;
+
+create index if not exists appointments_updated_at_idx
+    on public.appointments (updated_at, id);
+
+create or replace function public.appointments_touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists appointments_touch_updated_at on public.appointments;
+create trigger appointments_touch_updated_at
+    before insert or update on public.appointments
+    for each row execute function public.appointments_touch_updated_at();
+
+create table if not exists public.appointment_tombstones (
+    appointment_id bigint primary key,
+    appointment_time timestamptz,
+    deleted_at timestamptz not null default clock_timestamp()
+);
+
+create index if not exists appointment_tombstones_deleted_at_idx
+    on public.appointment_tombstones (deleted_at, appointment_id);
+
+create or replace function public.appointments_record_tombstone()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.appointment_tombstones (appointment_id, appointment_time, deleted_at)
+    values (old.id, old.appointment_time, clock_timestamp())
+    on conflict (appointment_id) do update
+        set appointment_time = excluded.appointment_time,
+            deleted_at = excluded.deleted_at;
+    return old;
+end;
+$$;
+
+drop trigger if exists appointments_record_tombstone on public.appointments;
+create trigger appointments_record_tombstone
+    after delete on public.appointments
+    for each row execute function public.appointments_record_tombstone();
+
+alter table public.appointment_tombstones enable row level security;
+
+drop policy if exists "appointment_tombstones_read" on public.appointment_tombstones;
+create policy "appointment_tombstones_read"
+    on public.appointment_tombstones for select
+    to anon, authenticated
+    using (true);
+
+grant select on public.appointment_tombstones to anon, authenticated;
+
+-- Las marcas solo sirven a clientes que estuvieron desconectados poco tiempo;
+-- se pueden purgar periódicamente, p. ej.:
+--   delete from public.appointment_tombstones where deleted_at < now() - interval '30 days';
@@ -0,0 +1,38 @@
+-- Comprobación definitiva de disponibilidad del doctor al crear citas (POST /api/v1/appointments).
+-- La API descarta antes los choques con el índice de disponibilidad en memoria
+-- (app/appointments/availability.py), que en otros workers puede ir hasta
+-- AVAILABILITY_CACHE_TTL atrasado; este trigger es la garantía. Mismo criterio
+-- (±30 minutos) y mismo bloqueo por doctor que update_appointment, que ya hace la
+-- comprobación al actualizar.
+--
+-- Error (PostgREST traduce el SQLSTATE PT409 a HTTP 409):
+--   PT409 doctor_unavailable (detail: hora solicitada)
+
+create or replace function public.appointments_check_doctor_available()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.doctor_id is null then
+        return new;
+    end if;
+    -- Serializa las asignaciones concurrentes al mismo doctor
+    perform pg_advisory_xact_lock(hashtext('appointments:doctor:' || new.doctor_id));
+    if exists (
+        select 1
+        from public.appointments a
+        where a.doctor_id = new.doctor_id
+          and a.appointment_time between new.appointment_time - interval '30 minutes'
+                                     and new.appointment_time + interval '30 minutes'
+    ) then
+        raise exception 'doctor_unavailable' using errcode = 'PT409',
+            detail = to_jsonb(new.appointment_time) #>> '{}';
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists appointments_doctor_available on public.appointments;
+create trigger appointments_doctor_available
+    before insert on public.appointments
+    for each row execute function public.appointments_check_doctor_available();
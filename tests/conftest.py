@@ -0,0 +1,118 @@
+# Configuración común de las pruebas (python -m pytest)
+#
+# Las pruebas no contactan Supabase. Con `app`, SUPABASE_URL apunta a un puerto cerrado
+# y el cliente se crea en el primer uso (SUPABASE_LAZY_INIT), que esas pruebas no
+# alcanzan. Con `api`, la app habla con el Supabase falso de benchmarks/ (PostgREST,
+# GoTrue y las funciones SQL emuladas en Python) cargado con una clínica pequeña.
+
+import os
+import sys
+from datetime import date
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+TEST_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "test-anon-key",
+    "SUPABASE_LAZY_INIT": "true",
+    "LOG_LEVEL": "WARNING",
+    "LOG_QUEUE": "false",
+}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """App creada con TEST_ENV (la configuración se lee en create_app)."""
+    for key, value in TEST_ENV.items():
+        monkeypatch.setenv(key, value)
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# Primer día de la clínica de prueba (6 días, 8 citas por día)
+CLINIC_START = date(2026, 3, 2)
+
+# Comprobaciones de migraciones y estado que cada proceso guarda una sola vez
+PROCESS_STATE = [
+    ('app.appointments.transitions', '_rpc_available', True),
+    ('app.appointments.transitions', '_version_available', None),
+    ('app.appointments.sorting', '_view_available', None),
+    ('app.appointments.recurrence', '_rpc_available', True),
+    ('app.appointments.changes', '_changes_available', True),
+    ('app.patients.search', '_rpc_available', True),
+    ('app.dashboard.aggregation', '_summary_rpc_available', True),
+    ('app.dashboard.cache', '_seen_reference_generation', None),
+]
+
+
+@pytest.fixture
+def fake_supabase():
+    """Supabase falso con la clínica de prueba en `fake.clinic` y todas las funciones SQL."""
+    from benchmarks.fake_supabase import FakeSupabase
+    from benchmarks.rpc import RPC_HANDLERS
+    from benchmarks.seed import seed_clinic
+    fake = FakeSupabase(rpc_handlers=dict(RPC_HANDLERS))
+    fake.clinic = seed_clinic(fake, doctors=3, patients=40, per_day=8, days=6, start=CLINIC_START)
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def api_env():
+    """Variables de entorno extra para `api` (se redefine en cada módulo si hace falta)."""
+    return {}
+
+
+@pytest.fixture
+def api(monkeypatch, fake_supabase, api_env):
+    """App conectada al Supabase falso (`api.fake`), sin estado de otras pruebas."""
+    import importlib
+    env = {
+        **TEST_ENV,
+        "SUPABASE_URL": fake_supabase.url,
+        "AUTH_VERIFY_MODE": 'remote',
+        "DASHBOARD_CACHE_BACKEND": 'memory',
+        "EVENTS_BACKEND": 'memory',
+        **api_env,
+    }
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    for module, name, value in PROCESS_STATE:
+        monkeypatch.setattr(importlib.import_module(module), name, value)
+    from app import create_app
+    app = create_app()
+    app.fake = fake_supabase
+    return app
+
+
+@pytest.fixture
+def auth_headers():
+    from benchmarks.run import bench_token
+    return {"Authorization": f"Bearer {bench_token()}"}
+
+
+class FakeClock:
+    """Sustituye time.monotonic en app.utils.cache para controlar la expiración."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from app.utils import cache as cache_module
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', fake)
+    return fake
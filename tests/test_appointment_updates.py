@@ -0,0 +1,90 @@
+# PUT /appointments/<id>: actualización atómica (RPC update_appointment) y control por versión
+
+import pytest
+
+
+def first_appointment(fake, status='Programada'):
+    return next(row for row in fake.tables['appointments'] if row['status'] == status)
+
+
+@pytest.fixture(params=['rpc', 'legacy'])
+def update_api(request, api):
+    """Mismo comportamiento con el RPC y con el flujo de varias consultas (sin el RPC)."""
+    if request.param == 'legacy':
+        api.fake.rpc_handlers.pop('update_appointment')
+    return api
+
+
+def test_list_and_detail_include_version(api, auth_headers):
+    client = api.test_client()
+    listed = client.get('/api/v1/appointments?date=2026-03-02', headers=auth_headers).get_json()
+    assert listed and all(row['version'] == 1 for row in listed)
+
+    page = client.get('/api/v1/appointments?limit=5&sort_by=status', headers=auth_headers).get_json()
+    assert all('version' in row for row in page['items'])
+
+    detail = client.get(f"/api/v1/appointments/{listed[0]['id']}", headers=auth_headers).get_json()
+    assert detail['version'] == 1
+
+
+def test_update_with_current_version_increments_it(update_api, auth_headers):
+    row = first_appointment(update_api.fake)
+    response = update_api.test_client().put(f"/api/v1/appointments/{row['id']}", headers=auth_headers,
+                                            json={"notes": 'Trae estudios', "version": 1})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['notes'] == 'Trae estudios' and body['version'] == 2
+    assert row['version'] == 2
+
+
+def test_update_without_version_is_rejected(update_api, auth_headers):
+    row = first_appointment(update_api.fake)
+    response = update_api.test_client().put(f"/api/v1/appointments/{row['id']}", headers=auth_headers,
+                                            json={"notes": 'Sin versión'})
+    assert response.status_code == 428
+    assert response.get_json()['error_type'] == 'version_required'
+    assert row['notes'] is None
+
+
+@pytest.mark.parametrize('version', [True, '1', 1.0])
+def test_non_integer_version_is_rejected(api, auth_headers, version):
+    row = first_appointment(api.fake)
+    response = api.test_client().put(f"/api/v1/appointments/{row['id']}", headers=auth_headers,
+                                     json={"notes": 'x', "version": version})
+    assert response.status_code == 400
+
+
+def test_stale_version_returns_409_and_keeps_the_other_write(update_api, auth_headers):
+    client = update_api.test_client()
+    row = first_appointment(update_api.fake)
+    url = f"/api/v1/appointments/{row['id']}"
+    assert client.put(url, headers=auth_headers, json={"notes": 'Primera', "version": 1}).status_code == 200
+
+    response = client.put(url, headers=auth_headers, json={"notes": 'Segunda', "version": 1})
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['error_type'] == 'version_conflict'
+    if 'update_appointment' in update_api.fake.rpc_handlers:
+        assert body['current_version'] == 2
+    assert row['notes'] == 'Primera' and row['version'] == 2
+
+
+def test_status_transition_sets_timestamp_and_rejects_invalid(update_api, auth_headers):
+    client = update_api.test_client()
+    row = first_appointment(update_api.fake)
+    url = f"/api/v1/appointments/{row['id']}"
+
+    response = client.put(url, headers=auth_headers, json={"status": 'En Espera', "version": row['version']})
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'En Espera'
+    assert row['arrival_time'] is not None
+
+    response = client.put(url, headers=auth_headers, json={"status": 'Programada', "version": row['version']})
+    assert response.status_code == 400
+    assert row['status'] == 'En Espera'
+
+
+def test_unknown_appointment_returns_404(update_api, auth_headers):
+    response = update_api.test_client().put('/api/v1/appointments/999999', headers=auth_headers,
+                                            json={"notes": 'x', "version": 1})
+    assert response.status_code == 404
@@ -0,0 +1,92 @@
+# Disponibilidad de doctores: índice por (doctor, día), huecos libres y choques al crear o mover citas
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.appointments.availability import DoctorDayIndex
+
+
+def booked(fake, doctor_id=None):
+    """Una cita con doctor de la clínica de prueba y su hora como datetime."""
+    row = next(a for a in fake.tables['appointments'] if a['doctor_id'] and (doctor_id is None or a['doctor_id'] == doctor_id))
+    return row, datetime.fromisoformat(row['appointment_time'])
+
+
+def test_day_index_conflict_window():
+    start = datetime(2026, 3, 2, 10, 0, tzinfo=timezone.utc)
+    index = DoctorDayIndex([(start, 1), (start + timedelta(hours=2), 2)])
+    assert index.conflicts(start + timedelta(minutes=30)) == [1]
+    assert index.conflicts(start + timedelta(minutes=31)) == []
+    assert index.conflicts(start, exclude_id=1) == []
+    assert index.is_free(start + timedelta(hours=1))
+
+
+def test_free_slots_skip_booked_times(api, auth_headers):
+    row, when = booked(api.fake)
+    response = api.test_client().get(f"/api/v1/doctors/{row['doctor_id']}/availability", headers=auth_headers,
+                                     query_string={"date": when.date().isoformat(), "start": '00:00', "end": '23:59'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert when.isoformat() in body['booked']
+    free = [datetime.fromisoformat(slot) for slot in body['free_slots']]
+    assert all(abs(slot - when) > timedelta(minutes=30) for slot in free)
+
+
+def test_create_rejects_doctor_conflict_and_accepts_free_time(api, auth_headers):
+    client = api.test_client()
+    row, when = booked(api.fake)
+    appointments_before = len(api.fake.tables['appointments'])
+
+    response = client.post('/api/v1/appointments', headers=auth_headers, json={
+        "patient_id": row['patient_id'], "doctor_id": row['doctor_id'],
+        "appointment_time": (when + timedelta(minutes=10)).isoformat(),
+    })
+    assert response.status_code == 409
+    assert response.get_json()['error_type'] == 'doctor_unavailable'
+    assert len(api.fake.tables['appointments']) == appointments_before
+
+    response = client.post('/api/v1/appointments', headers=auth_headers, json={
+        "patient_id": row['patient_id'], "doctor_id": row['doctor_id'],
+        "appointment_time": '2026-04-20T03:00:00+00:00',
+    })
+    assert response.status_code == 201
+    assert response.get_json()['version'] == 1
+
+
+def test_create_does_not_trust_a_stale_day_index(api, auth_headers):
+    """Una cita creada por otro worker no está en la caché de este: create relee el día."""
+    client = api.test_client()
+    row, _ = booked(api.fake)
+    day = '2026-04-21'
+    warm = client.get(f"/api/v1/doctors/{row['doctor_id']}/availability", headers=auth_headers, query_string={"date": day})
+    assert warm.get_json()['booked'] == []
+
+    api.fake.tables['appointments'].append({
+        **row, "id": 9001, "appointment_time": f'{day}T10:00:00+00:00', "status": 'Programada', "version": 1,
+    })
+    response = client.post('/api/v1/appointments', headers=auth_headers, json={
+        "patient_id": row['patient_id'], "doctor_id": row['doctor_id'], "appointment_time": f'{day}T10:15:00+00:00',
+    })
+    assert response.status_code == 409
+
+
+def test_create_rejects_invalid_doctor_id(api, auth_headers):
+    response = api.test_client().post('/api/v1/appointments', headers=auth_headers, json={
+        "patient_id": 1, "doctor_id": 'uno', "appointment_time": '2026-04-20T03:00:00+00:00',
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('with_rpc', [True, False])
+def test_update_rejects_moving_into_a_taken_slot(api, auth_headers, with_rpc):
+    if not with_rpc:
+        api.fake.rpc_handlers.pop('update_appointment')
+    row, when = booked(api.fake)
+    other = next(a for a in api.fake.tables['appointments']
+                 if a['id'] != row['id'] and abs(datetime.fromisoformat(a['appointment_time']) - when) > timedelta(hours=1))
+    response = api.test_client().put(f"/api/v1/appointments/{other['id']}", headers=auth_headers, json={
+        "doctor_id": row['doctor_id'], "appointment_time": (when + timedelta(minutes=20)).isoformat(),
+        "version": other['version'],
+    })
+    assert response.status_code == 409
+    assert response.get_json()['error_type'] == 'doctor_unavailable'
+    assert other['appointment_time'] != (when + timedelta(minutes=20)).isoformat()
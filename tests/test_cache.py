@@ -0,0 +1,48 @@
+# TTLCache: caché LRU con expiración por entrada (tokens, búsquedas, disponibilidad)
+
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=5)
+    clock.now += 10
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    clock.now += 25
+    assert cache.get('a', 'caducado') == 'caducado'
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a') # 'b' pasa a ser la menos usada
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_ttl_cache_invalidation(clock):
+    cache = TTLCache(maxsize=10, ttl=30)
+    for key in [('jose', 10), ('jose', 20), ('ana', 10)]:
+        cache.set(key, key[0])
+    assert cache.delete(('ana', 10)) is True
+    assert cache.delete(('ana', 10)) is False
+    assert cache.delete_matching(lambda key: key[0] == 'jose') == 2
+    assert len(cache) == 0
+
+    cache.set('x', 1)
+    cache.clear()
+    assert cache.get('x') is None
+
+
+def test_ttl_cache_ignores_non_positive_ttl_and_counts_hits(clock):
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set('a', 1, ttl=0)
+    assert cache.get('a') is None
+    cache.set('b', 2)
+    cache.get('b')
+    assert cache.stats() == {"size": 1, "maxsize": 10, "hits": 1, "misses": 1, "hitRatio": 0.5}
@@ -0,0 +1,95 @@
+# Sincronización incremental: GET /appointments/changes?since=
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.pagination import encode_cursor
+
+CHANGES_URL = '/api/v1/appointments/changes'
+
+
+@pytest.fixture
+def api_env():
+    # Sin margen de asentamiento: los cambios recién hechos ya entran en la respuesta
+    return {"APPOINTMENT_CHANGES_SETTLE_SECONDS": '0'}
+
+
+@pytest.fixture
+def sync_api(api):
+    """Supabase falso con la migración de sincronización (tabla de marcas de borrado)."""
+    api.fake.tables['appointment_tombstones'] = []
+    return api
+
+
+def get_changes(client, headers, since=None, **params):
+    query = {**params, **({"since": since} if since else {})}
+    response = client.get(CHANGES_URL, headers=headers, query_string=query)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def edit(client, headers, fake, appointment_id):
+    row = fake.get_row('appointments', appointment_id)
+    response = client.put(f'/api/v1/appointments/{appointment_id}', headers=headers,
+                          json={"notes": 'cambio', "version": row['version']})
+    assert response.status_code == 200
+
+
+def test_first_call_returns_only_a_cursor(sync_api, auth_headers):
+    body = get_changes(sync_api.test_client(), auth_headers)
+    assert body["changes"] == [] and body["deleted"] == [] and body["has_more"] is False
+    assert body["cursor"]
+
+
+def test_updates_and_deletes_after_cursor(sync_api, auth_headers):
+    client = sync_api.test_client()
+    cursor = get_changes(client, auth_headers)["cursor"]
+
+    edit(client, auth_headers, sync_api.fake, 3)
+    assert client.delete('/api/v1/appointments/5', headers=auth_headers).status_code == 204
+
+    body = get_changes(client, auth_headers, cursor)
+    assert [row["id"] for row in body["changes"]] == [3]
+    assert body["changes"][0]["notes"] == 'cambio'
+    assert body["deleted"] == [5]
+
+    # El cursor nuevo ya no devuelve lo entregado
+    again = get_changes(client, auth_headers, body["cursor"])
+    assert again["changes"] == [] and again["deleted"] == []
+
+
+def test_changes_are_paged(sync_api, auth_headers):
+    client = sync_api.test_client()
+    cursor = get_changes(client, auth_headers)["cursor"]
+    for appointment_id in (2, 4, 6):
+        edit(client, auth_headers, sync_api.fake, appointment_id)
+
+    first = get_changes(client, auth_headers, cursor, limit=2)
+    assert len(first["changes"]) == 2 and first["has_more"] is True
+    second = get_changes(client, auth_headers, first["cursor"], limit=2)
+    assert second["has_more"] is False
+    ids = [row["id"] for row in first["changes"] + second["changes"]]
+    assert sorted(ids) == [2, 4, 6]
+
+
+def test_invalid_cursor_and_limit(sync_api, auth_headers):
+    client = sync_api.test_client()
+    assert client.get(CHANGES_URL, headers=auth_headers, query_string={"since": 'no-es-un-cursor'}).status_code == 400
+    assert client.get(CHANGES_URL, headers=auth_headers, query_string={"limit": 0}).status_code == 400
+
+
+def test_cursor_older_than_retention_asks_for_reset(sync_api, auth_headers):
+    old = (datetime.now(timezone.utc) - timedelta(days=90)).isoformat()
+    body = get_changes(sync_api.test_client(), auth_headers, encode_cursor({"u": [old, 0], "d": [old, 0]}))
+    assert body["reset"] is True
+    assert body["cursor"]
+
+
+def test_without_migration_returns_501_and_is_not_retried(api, auth_headers):
+    client = api.test_client()
+    cursor = get_changes(client, auth_headers)["cursor"]
+    for _ in range(2):
+        response = client.get(CHANGES_URL, headers=auth_headers, query_string={"since": cursor})
+        assert response.status_code == 501
+    assert api.fake.calls['GET appointment_tombstones'] == 1
@@ -0,0 +1,63 @@
+# run_concurrently: consultas independientes en paralelo dentro de una petición
+
+import threading
+
+import pytest
+from flask import g
+
+from app.extensions import init_fanout_executor
+from app.utils.concurrency import run_concurrently, FanOutTimeout
+
+
+@pytest.fixture
+def request_context(app):
+    with app.test_request_context():
+        yield
+
+
+def test_calls_run_in_parallel(request_context):
+    # Con ejecución secuencial la barrera nunca se completa
+    barrier = threading.Barrier(2, timeout=2)
+
+    def call(value):
+        barrier.wait()
+        return value
+
+    assert run_concurrently({"a": lambda: call(1), "b": lambda: call(2)}) == {"a": 1, "b": 2}
+
+
+def test_tasks_see_the_request_context(request_context):
+    g.user_id = 'user-1'
+    results = run_concurrently({"a": lambda: g.user_id, "b": lambda: g.get('user_id')})
+    assert results == {"a": 'user-1', "b": 'user-1'}
+
+
+def test_errors_propagate(request_context):
+    def fail():
+        raise ValueError("sin conexión")
+
+    with pytest.raises(ValueError, match="sin conexión"):
+        run_concurrently({"ok": lambda: 1, "fail": fail})
+
+
+def test_slow_call_times_out(request_context):
+    release = threading.Event()
+    try:
+        with pytest.raises(FanOutTimeout):
+            run_concurrently({"slow": (lambda: release.wait(2), 0.05), "fast": lambda: 1})
+    finally:
+        release.set()
+
+
+def test_nested_fan_out_runs_inline(request_context):
+    # Con un solo hilo, un fan-out anidado enviado al pool esperaría para siempre
+    init_fanout_executor(1)
+    inner = lambda: run_concurrently({"x": lambda: 1, "y": lambda: 2}, timeout=1)
+    assert run_concurrently({"a": inner, "b": inner}, timeout=2) == {"a": {"x": 1, "y": 2}, "b": {"x": 1, "y": 2}}
+
+
+def test_without_executor_runs_sequentially(request_context):
+    init_fanout_executor(0)
+    order = []
+    run_concurrently({"a": lambda: order.append('a'), "b": lambda: order.append('b')})
+    assert order == ['a', 'b']
@@ -0,0 +1,92 @@
+# Paneles del dashboard frente al cálculo por endpoint que había antes del agregado único
+
+from calendar import monthrange
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from conftest import CLINIC_START
+
+YEAR, MONTH = CLINIC_START.year, CLINIC_START.month
+DAYS = range(1, monthrange(YEAR, MONTH)[1] + 1)
+
+
+@pytest.fixture
+def api_env():
+    return {"DASHBOARD_CACHE_BACKEND": 'none'}
+
+
+@pytest.fixture(params=['rpc', 'python'])
+def dashboard_api(request, api):
+    """Resumen calculado por el RPC o por el agregado en Python."""
+    if request.param == 'python':
+        del api.fake.rpc_handlers['dashboard_month_summary']
+    return api
+
+
+def parse(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def minutes(start, end):
+    start, end = parse(start), parse(end)
+    if start is None or end is None or end < start:
+        return None
+    return int((end - start).total_seconds() / 60)
+
+
+def average(values):
+    return round(sum(values) / len(values)) if values else 0
+
+
+def expected_panels(fake):
+    """Mismas reglas que los endpoints originales, cada uno con su propio recorrido."""
+    appointments = [a for a in fake.tables['appointments'] if parse(a['appointment_time']).month == MONTH]
+    waits, consults = {}, {}
+    for appointment in appointments:
+        day = parse(appointment['appointment_time']).day
+        wait = minutes(appointment.get('arrival_time'), appointment.get('consultation_start_time'))
+        consult = minutes(appointment.get('consultation_start_time'), appointment.get('consultation_end_time'))
+        if wait is not None:
+            waits.setdefault(day, []).append(wait)
+        if consult is not None:
+            consults.setdefault(day, []).append(consult)
+
+    by_doctor = {}
+    for appointment in appointments:
+        doctor = fake.get_row('doctors', appointment['doctor_id']) if appointment['doctor_id'] else None
+        if doctor:
+            entry = by_doctor.setdefault(doctor['id'], {"doctorName": doctor['name'], "appointmentCount": 0})
+            entry["appointmentCount"] += 1
+
+    per_day = Counter(parse(a['appointment_time']).day for a in appointments)
+    return {
+        "stats": {
+            "totalAppointments": len(appointments),
+            "avgWaitTime": average([w for day in waits.values() for w in day]),
+            "avgConsultTime": average([c for day in consults.values() for c in day]),
+        },
+        "wait-time": [{"day": day, "avgWaitTime": average(waits.get(day, []))} for day in DAYS],
+        "consult-time": [{"day": day, "avgConsultTime": average(consults.get(day, []))} for day in DAYS],
+        "appointments-by-doctor": list(by_doctor.values()),
+        "appointments-by-day": [{"day": day, "count": per_day.get(day, 0)} for day in DAYS],
+    }
+
+
+@pytest.mark.parametrize('panel', ["stats", "wait-time", "consult-time", "appointments-by-doctor", "appointments-by-day"])
+def test_panel_matches_original_calculation(dashboard_api, auth_headers, panel):
+    response = dashboard_api.test_client().get(
+        f'/api/v1/dashboard/{panel}?month={MONTH}&year={YEAR}', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json() == expected_panels(dashboard_api.fake)[panel]
+
+
+def test_panels_share_one_month_query(api, auth_headers):
+    del api.fake.rpc_handlers['dashboard_month_summary']
+    response = api.test_client().get(
+        f'/api/v1/dashboard/bundle?month={MONTH}&year={YEAR}&panels=stats,appointments-summary,doctors-details',
+        headers=auth_headers)
+    assert response.status_code == 200
+    # El resumen y los paneles por cita salen del mismo recorrido de las citas del mes
+    assert api.fake.calls['GET appointments'] == 1
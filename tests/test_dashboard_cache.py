@@ -0,0 +1,94 @@
+# Caché de resultados del dashboard: backend en memoria e invalidación por mes
+
+import pytest
+from app.utils.cache import MemoryCacheBackend
+
+
+def test_memory_backend_get_set_delete_and_counters(clock):
+    backend = MemoryCacheBackend(maxsize=10)
+    backend.set('panel', {"total": 3}, ttl=60)
+    assert backend.get('panel') == {"total": 3}
+    backend.delete('panel')
+    assert backend.get('panel') is None
+
+    backend.set('corto', 1, ttl=1)
+    clock.now += 2
+    assert backend.get('corto') is None
+
+    assert backend.get_counter('gen') == 0
+    assert backend.incr('gen') == 1
+    assert backend.incr('gen') == 2
+    assert backend.get_counter('gen') == 2
+    assert backend.stats()["backend"] == 'memory'
+
+
+@pytest.fixture
+def dashboard_cache(app):
+    """Backend 'memory' dentro de un contexto de app; se deshabilita al terminar."""
+    from app.extensions import init_dashboard_cache
+    with app.app_context():
+        init_dashboard_cache('memory', maxsize=16)
+        yield
+        init_dashboard_cache('none')
+
+
+class Builder:
+    """Cuenta cuántas veces se calcula el panel."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"build": self.calls}
+
+
+# Un mes futuro nunca está cerrado: no se consulta Supabase para elegir el TTL
+YEAR, MONTH = 2099, 5
+
+
+def test_panels_are_invalidated_by_month(dashboard_cache):
+    from app.dashboard.cache import cached_panel, invalidate_month, invalidate_for_appointment_times
+    builder = Builder()
+    assert cached_panel('stats', YEAR, MONTH, builder) == {"build": 1}
+    assert cached_panel('stats', YEAR, MONTH, builder) == {"build": 1}
+
+    invalidate_month(YEAR, MONTH)
+    assert cached_panel('stats', YEAR, MONTH, builder) == {"build": 2}
+
+    invalidate_month(YEAR, MONTH + 1) # otro mes: no afecta
+    assert cached_panel('stats', YEAR, MONTH, builder) == {"build": 2}
+
+    invalidate_for_appointment_times('2099-05-20T10:00:00+00:00', None)
+    assert cached_panel('stats', YEAR, MONTH, builder) == {"build": 3}
+
+
+def test_reference_invalidation_drops_every_month(dashboard_cache, monkeypatch):
+    from app.dashboard import cache as dashboard_cache_module
+    from app.dashboard.cache import cached_panel, invalidate_reference_panels
+    monkeypatch.setattr(dashboard_cache_module, '_seen_reference_generation', None)
+    may, june = Builder(), Builder()
+    cached_panel('by-doctor', YEAR, MONTH, may)
+    cached_panel('by-doctor', YEAR, MONTH + 1, june)
+
+    invalidate_reference_panels()
+    assert cached_panel('by-doctor', YEAR, MONTH, may) == {"build": 2}
+    assert cached_panel('by-doctor', YEAR, MONTH + 1, june) == {"build": 2}
+
+
+def test_reference_generation_from_another_worker_reloads_doctors(dashboard_cache, monkeypatch):
+    from app.dashboard import cache as dashboard_cache_module
+    from app.dashboard.cache import cached_panel, REFERENCE_GENERATION_KEY
+    from app.extensions import get_dashboard_cache, get_reference_data
+    monkeypatch.setattr(dashboard_cache_module, '_seen_reference_generation', None)
+    invalidated = []
+    monkeypatch.setattr(get_reference_data(), 'invalidate', lambda name=None: invalidated.append(name))
+
+    builder = Builder()
+    cached_panel('by-doctor', YEAR, MONTH, builder)
+    assert invalidated == []
+
+    # Otro worker invalidó los doctores en el backend compartido
+    get_dashboard_cache().incr(REFERENCE_GENERATION_KEY)
+    assert cached_panel('by-doctor', YEAR, MONTH, builder) == {"build": 2}
+    assert invalidated == [None]
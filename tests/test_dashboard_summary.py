@@ -0,0 +1,70 @@
+# Paridad del resumen mensual: RPC dashboard_month_summary frente al agregado en Python
+
+import pytest
+
+from conftest import CLINIC_START
+
+MONTH_QUERY = f"month={CLINIC_START.month}&year={CLINIC_START.year}"
+
+
+@pytest.fixture
+def api_env():
+    # Sin caché de paneles: cada petición calcula el resumen
+    return {"DASHBOARD_CACHE_BACKEND": 'none'}
+
+
+@pytest.fixture
+def api_client(api):
+    fake = api.fake
+    # Citas de un doctor sin fila en la tabla de doctores y sin doctor asignado
+    for doctor_id, minute in ((99, 1), (99, 2), (None, 3)):
+        fake.tables['appointments'].append({
+            "id": fake.next_id('appointments'),
+            "patient_id": 1,
+            "doctor_id": doctor_id,
+            "appointment_time": f"{CLINIC_START.isoformat()}T07:{minute:02d}:00+00:00",
+            "status": 'Completada',
+            "version": 1,
+            "arrival_time": f"{CLINIC_START.isoformat()}T07:00:00+00:00",
+            "consultation_start_time": f"{CLINIC_START.isoformat()}T07:10:00+00:00",
+            "consultation_end_time": f"{CLINIC_START.isoformat()}T07:25:00+00:00",
+        })
+    return api.test_client()
+
+
+def get_bundle(api_client, auth_headers):
+    response = api_client.get(f'/api/v1/dashboard/bundle?{MONTH_QUERY}', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_rpc_and_python_aggregate_match(api, api_client, auth_headers):
+    from_rpc = get_bundle(api_client, auth_headers)
+    assert api.fake.calls['rpc:dashboard_month_summary'] == 1
+    assert api.fake.calls['GET appointments'] == 0
+
+    del api.fake.rpc_handlers['dashboard_month_summary']
+    from_python = get_bundle(api_client, auth_headers)
+    assert api.fake.calls['GET appointments'] == 1
+
+    assert from_rpc == from_python
+
+
+def test_doctor_without_row_is_counted(api_client, auth_headers):
+    by_doctor = get_bundle(api_client, auth_headers)["appointments-by-doctor"]
+    assert {"doctorName": "Doctor #99", "appointmentCount": 2} in by_doctor
+    assert all(entry["doctorName"] != 'Sin asignar' for entry in by_doctor)
+
+
+def test_appointments_summary_counts_stored_statuses(api, api_client, auth_headers):
+    from collections import Counter
+    response = api_client.get(f'/api/v1/dashboard/appointments-summary?{MONTH_QUERY}', headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+
+    expected = Counter(appointment["status"] for appointment in api.fake.tables['appointments'])
+    status_count = body["statusCount"]
+    assert {status: count for status, count in status_count.items() if count} == dict(expected)
+    assert sum(status_count.values()) == body["totalAppointments"]
+    # Los estados sin citas aparecen con 0
+    assert set(status_count) >= {"Programada", "En Espera", "En Consulta", "Completada", "Cancelada", "No Asistió"}
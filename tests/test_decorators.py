@@ -0,0 +1,67 @@
+# conditional_get: ETag, Cache-Control y respuestas 304
+
+import pytest
+from flask import Flask, jsonify
+from app.utils.decorators import conditional_get, CACHE_REFERENCE
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    state = {"stats": {"total": 3}}
+
+    @app.route('/stats', methods=['GET', 'POST'])
+    @conditional_get()
+    def stats():
+        return jsonify(state["stats"])
+
+    @app.route('/doctors')
+    @conditional_get(CACHE_REFERENCE)
+    def doctors():
+        return jsonify([{"id": 1, "name": 'Ana'}])
+
+    @app.route('/missing')
+    @conditional_get()
+    def missing():
+        return jsonify({"message": 'No encontrado'}), 404
+
+    client = app.test_client()
+    client.state = state
+    return client
+
+
+def test_get_adds_etag_and_cache_headers(client):
+    response = client.get('/stats')
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Authorization' in response.headers['Vary']
+    assert client.get('/doctors').headers['Cache-Control'] == CACHE_REFERENCE
+
+
+def test_matching_if_none_match_returns_304(client):
+    etag = client.get('/stats').headers['ETag']
+    response = client.get('/stats', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_changed_body_returns_200_with_new_etag(client):
+    etag = client.get('/stats').headers['ETag']
+    client.state["stats"] = {"total": 4}
+    response = client.get('/stats', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json() == {"total": 4}
+
+
+def test_errors_and_non_get_are_not_marked(client):
+    response = client.get('/missing')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+    etag = client.get('/stats').headers['ETag']
+    response = client.post('/stats', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
@@ -0,0 +1,91 @@
+# Exportación de citas en streaming (CSV / NDJSON) por páginas keyset
+
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+
+from conftest import CLINIC_START
+from app.dashboard.export import EXPORT_COLUMNS
+
+PAGE_SIZE = 5
+LAST_DAY = CLINIC_START + timedelta(days=5)
+
+
+@pytest.fixture
+def api_env():
+    return {"EXPORT_PAGE_SIZE": str(PAGE_SIZE)}
+
+
+@pytest.fixture
+def api_client(api):
+    return api.test_client()
+
+
+def export(client, headers, **params):
+    query = {"from": CLINIC_START.isoformat(), "to": LAST_DAY.isoformat(), **params}
+    return client.get('/api/v1/dashboard/export', headers=headers, query_string=query, buffered=False)
+
+
+def read_csv(response):
+    text = b''.join(response.response).decode('utf-8')
+    assert text.startswith('﻿')
+    return list(csv.DictReader(io.StringIO(text[1:])))
+
+
+def test_csv_export_covers_the_range_in_order(api, api_client, auth_headers):
+    response = export(api_client, auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == (
+        f'attachment; filename="citas_{CLINIC_START.isoformat()}_{LAST_DAY.isoformat()}.csv"')
+
+    rows = read_csv(response)
+    appointments = sorted(api.fake.tables['appointments'], key=lambda a: (a['appointment_time'], a['id']))
+    assert [int(row['id']) for row in rows] == [a['id'] for a in appointments]
+    assert list(rows[0]) == EXPORT_COLUMNS
+
+
+def test_export_streams_one_chunk_per_page(api, api_client, auth_headers):
+    total = len(api.fake.tables['appointments'])
+    pages = -(-total // PAGE_SIZE)
+    response = export(api_client, auth_headers, format='ndjson')
+    chunks = list(response.response)
+    assert len(chunks) == pages
+    assert api.fake.calls['GET appointments'] == pages
+
+
+def test_ndjson_rows_include_computed_minutes(api, api_client, auth_headers):
+    response = export(api_client, auth_headers, format='ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = b''.join(response.response).decode('utf-8').splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == len(api.fake.tables['appointments'])
+    completed = next(row for row in rows if row['consultation_end_time'])
+    assert completed['consult_minutes'] is not None and completed['consult_minutes'] >= 0
+
+
+def test_single_day_and_empty_range(api_client, auth_headers):
+    day = export(api_client, auth_headers, to=CLINIC_START.isoformat())
+    assert len(read_csv(day)) == 8
+    empty = export(api_client, auth_headers, **{"from": '2030-01-01', "to": '2030-01-31'})
+    assert empty.status_code == 200
+    assert read_csv(empty) == []
+
+
+def test_export_is_not_compressed(api_client, auth_headers):
+    response = export(api_client, {**auth_headers, "Accept-Encoding": 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    response.close()
+
+
+@pytest.mark.parametrize('params', [
+    {"format": 'xlsx'},
+    {"from": '02/03/2026'},
+    {"to": ''},
+    {"from": '2026-03-10', "to": '2026-03-01'},
+])
+def test_invalid_parameters(api_client, auth_headers, params):
+    assert export(api_client, auth_headers, **params).status_code == 400
@@ -0,0 +1,79 @@
+# Serialización con orjson y compresión de respuestas
+
+import gzip
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.json_provider import OrjsonProvider
+
+pytest.importorskip('orjson')
+
+PAYLOAD = {
+    "b": [1, 2.5, None, True],
+    "a": "José Núñez",
+    "when": datetime(2026, 3, 2, 9, 30, tzinfo=timezone.utc),
+    "day": date(2026, 3, 2),
+    "amount": Decimal('10.50'),
+    "uuid": uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    "by_day": {1: 3, 2: 5}, # claves numéricas: se convierten a texto
+}
+
+
+def test_orjson_matches_default_provider(app):
+    expected = DefaultJSONProvider(app).dumps(PAYLOAD)
+    actual = OrjsonProvider(app).dumps(PAYLOAD)
+    assert json.loads(actual) == json.loads(expected)
+    # Mismo orden de claves que Flask (sort_keys)
+    assert list(json.loads(actual)) == list(json.loads(expected))
+
+
+def test_auto_provider_uses_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+
+
+def test_default_provider_can_be_forced(monkeypatch):
+    from conftest import TEST_ENV
+    for key, value in {**TEST_ENV, "JSON_PROVIDER": 'default'}.items():
+        monkeypatch.setenv(key, value)
+    from app import create_app
+    assert not isinstance(create_app().json, OrjsonProvider)
+
+
+@pytest.fixture
+def payload_client(app):
+    @app.route('/_test/payload/<int:size>')
+    def payload(size):
+        return jsonify([{"id": i, "name": f"Paciente {i}"} for i in range(size)])
+    return app.test_client()
+
+
+def test_large_json_is_gzipped(payload_client):
+    response = payload_client.get('/_test/payload/200', headers={"Accept-Encoding": 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))[-1] == {"id": 199, "name": "Paciente 199"}
+
+
+def test_small_or_unaccepted_responses_are_not_compressed(payload_client):
+    small = payload_client.get('/_test/payload/1', headers={"Accept-Encoding": 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    plain = payload_client.get('/_test/payload/200')
+    assert 'Content-Encoding' not in plain.headers
+
+
+def test_compressed_etag_is_weak_and_revalidates(api, auth_headers):
+    client = api.test_client()
+    headers = {**auth_headers, "Accept-Encoding": 'gzip'}
+    response = client.get('/api/v1/appointments', headers=headers)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    again = client.get('/api/v1/appointments', headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,125 @@
+# Verificación local de tokens (decode_supabase_token): HS256, JWKS y expiración
+
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.utils import jwt_auth
+from app.utils.jwt_auth import decode_supabase_token, TokenVerificationError, LocalVerificationUnavailable
+
+SECRET = 'test-jwt-secret-de-al-menos-32-bytes'
+JWKS_URL = 'https://proyecto.supabase.co/auth/v1/.well-known/jwks.json'
+CONFIG = {
+    "SUPABASE_JWT_SECRET": SECRET,
+    "SUPABASE_JWKS_URL": JWKS_URL,
+    "SUPABASE_JWT_AUDIENCE": 'authenticated',
+}
+
+
+def make_claims(**overrides):
+    claims = {"sub": 'user-1', "aud": 'authenticated', "email": 'ana@example.com', "exp": int(time.time()) + 600}
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+@pytest.fixture(scope='module')
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def jwks(monkeypatch, rsa_key):
+    """JWKS servido sin red: PyJWKClient.fetch_data devuelve la clave pública de prueba."""
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(rsa_key.public_key(), as_dict=True)
+    jwk.update({"kid": 'clave-1', "alg": 'RS256', "use": 'sig'})
+    monkeypatch.setattr(jwt.PyJWKClient, 'fetch_data', lambda self: {"keys": [jwk]})
+    monkeypatch.setattr(jwt_auth, '_jwks_clients', {})
+    return jwk
+
+
+def test_hs256_valid_token_returns_claims():
+    token = jwt.encode(make_claims(), SECRET, algorithm='HS256')
+    claims = decode_supabase_token(token, CONFIG)
+    assert claims["sub"] == 'user-1'
+    assert claims["email"] == 'ana@example.com'
+
+
+def test_hs256_wrong_secret_is_rejected():
+    token = jwt.encode(make_claims(), 'otro-secreto-de-al-menos-32-bytes!!', algorithm='HS256')
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_hs256_without_secret_is_unavailable():
+    token = jwt.encode(make_claims(), SECRET, algorithm='HS256')
+    with pytest.raises(LocalVerificationUnavailable):
+        decode_supabase_token(token, {**CONFIG, "SUPABASE_JWT_SECRET": None})
+
+
+def test_expired_token_is_rejected():
+    token = jwt.encode(make_claims(exp=int(time.time()) - 60), SECRET, algorithm='HS256')
+    with pytest.raises(TokenVerificationError, match='expired'):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_expiry_within_leeway_is_accepted():
+    token = jwt.encode(make_claims(exp=int(time.time()) - 2), SECRET, algorithm='HS256')
+    assert decode_supabase_token(token, CONFIG)["sub"] == 'user-1'
+
+
+def test_token_without_exp_is_rejected():
+    token = jwt.encode(make_claims(exp=None), SECRET, algorithm='HS256')
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_wrong_audience_is_rejected():
+    token = jwt.encode(make_claims(aud='anon'), SECRET, algorithm='HS256')
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_unsupported_algorithm_and_garbage_are_rejected():
+    token = jwt.encode(make_claims(), SECRET * 2, algorithm='HS512')
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token('no-es-un-jwt', CONFIG)
+
+
+def test_rs256_token_is_verified_with_jwks(jwks, rsa_key):
+    token = jwt.encode(make_claims(), rsa_key, algorithm='RS256', headers={"kid": 'clave-1'})
+    assert decode_supabase_token(token, CONFIG)["sub"] == 'user-1'
+
+
+def test_rs256_expired_token_is_rejected(jwks, rsa_key):
+    token = jwt.encode(make_claims(exp=int(time.time()) - 60), rsa_key, algorithm='RS256', headers={"kid": 'clave-1'})
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_rs256_token_signed_with_another_key_is_rejected(jwks):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    token = jwt.encode(make_claims(), other_key, algorithm='RS256', headers={"kid": 'clave-1'})
+    with pytest.raises(TokenVerificationError):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_unknown_kid_or_unreachable_jwks_is_unavailable(jwks, rsa_key, monkeypatch):
+    token = jwt.encode(make_claims(), rsa_key, algorithm='RS256', headers={"kid": 'otra-clave'})
+    with pytest.raises(LocalVerificationUnavailable):
+        decode_supabase_token(token, CONFIG)
+
+    def unreachable(self):
+        raise jwt.PyJWKClientConnectionError('sin conexión')
+    monkeypatch.setattr(jwt.PyJWKClient, 'fetch_data', unreachable)
+    monkeypatch.setattr(jwt_auth, '_jwks_clients', {})
+    token = jwt.encode(make_claims(), rsa_key, algorithm='RS256', headers={"kid": 'clave-1'})
+    with pytest.raises(LocalVerificationUnavailable):
+        decode_supabase_token(token, CONFIG)
+
+
+def test_rs256_without_jwks_url_is_unavailable(rsa_key):
+    token = jwt.encode(make_claims(), rsa_key, algorithm='RS256', headers={"kid": 'clave-1'})
+    with pytest.raises(LocalVerificationUnavailable):
+        decode_supabase_token(token, {**CONFIG, "SUPABASE_JWKS_URL": None})
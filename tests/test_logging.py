@@ -0,0 +1,84 @@
+# Logging: formato JSON, cola con formateo en otro hilo y resúmenes perezosos
+
+import io
+import json
+import logging
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import log_config
+from app.utils.log_config import JsonFormatter, DeferredQueueHandler, summarize_response
+
+
+def make_record(msg='Hola %s', args=('mundo',), **extra):
+    record = logging.LogRecord('app', logging.INFO, __file__, 10, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_outputs_one_object_per_line():
+    summary = {"status": 200, "path": '/api/v1/citas/ñ'}
+    line = JsonFormatter().format(make_record(request_summary=summary))
+    assert '\n' not in line
+    entry = json.loads(line)
+    assert entry["message"] == 'Hola mundo'
+    assert entry["level"] == 'INFO'
+    assert entry["request_summary"] == summary
+    assert 'ñ' in line # sin escapar
+
+
+def test_json_formatter_includes_exception():
+    try:
+        raise ValueError("fallo")
+    except ValueError:
+        record = logging.LogRecord('app', logging.ERROR, __file__, 10, 'error', None, sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert 'ValueError: fallo' in entry["exception"]
+
+
+def test_deferred_queue_handler_only_resolves_the_message():
+    try:
+        raise ValueError("fallo")
+    except ValueError:
+        record = logging.LogRecord('app', logging.ERROR, __file__, 10, 'cita %s', (7,), sys.exc_info())
+    prepared = DeferredQueueHandler(None).prepare(record)
+    assert prepared.msg == 'cita 7' and prepared.args is None
+    # La traza se formatea en el hilo del listener, no aquí
+    assert prepared.exc_info is not None and prepared.exc_text is None
+    assert record.args == (7,)
+
+
+def test_summarize_response():
+    assert str(summarize_response(SimpleNamespace(data=[{}, {}], count=None))) == '2 fila(s)'
+    assert str(summarize_response(SimpleNamespace(data={"id": 1}, count=5))) == '1 fila(s), count=5'
+    assert str(summarize_response(None)) == 'sin respuesta'
+
+
+def test_summary_is_not_computed_when_level_is_disabled(app):
+    class Exploding:
+        data = property(lambda self: pytest.fail("resumen calculado con DEBUG desactivado"))
+
+    app.logger.setLevel(logging.INFO)
+    app.logger.debug("Respuesta: %s", summarize_response(Exploding()))
+
+
+@pytest.fixture
+def json_app(monkeypatch):
+    from conftest import TEST_ENV
+    for key, value in {**TEST_ENV, "LOG_LEVEL": 'INFO', "LOG_FORMAT": 'json', "LOG_QUEUE": 'true'}.items():
+        monkeypatch.setenv(key, value)
+    from app import create_app
+    app = create_app()
+    yield app
+    log_config._pipeline.stop()
+
+
+def test_queue_pipeline_writes_json_lines(json_app):
+    output = io.StringIO()
+    log_config._pipeline.target.setStream(output)
+    json_app.logger.info("cita %s creada", 42)
+    log_config._pipeline.stop() # vacía la cola
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert {"message": 'cita 42 creada', "level": 'INFO'}.items() <= lines[-1].items()
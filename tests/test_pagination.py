@@ -0,0 +1,133 @@
+# Paginación por cursor: encode_cursor / decode_cursor / apply_keyset
+
+import base64
+import pytest
+from app.utils.pagination import encode_cursor, decode_cursor, apply_keyset, build_page
+
+
+class RecordingQuery:
+    """Imita el query builder de postgrest: registra las llamadas encadenadas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return method
+
+
+def test_cursor_round_trip():
+    values = {"appointment_time": '2026-03-01T09:30:00+00:00', "id": 42}
+    cursor = encode_cursor(values)
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor) == values
+
+
+def test_cursor_with_unicode_and_quotes():
+    values = {"name": 'José "Pepe" Núñez', "id": 7}
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+@pytest.mark.parametrize('cursor', [
+    'no-es-base64!!',
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    encode_cursor({"name": 'Ana'}),
+    encode_cursor({"name": 'Ana', "id": '7'}),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_without_id_when_not_required():
+    assert decode_cursor(encode_cursor({"day": '2026-03-01'}), require_id=False) == {"day": '2026-03-01'}
+
+
+def test_apply_keyset_first_page_only_orders_and_limits():
+    query = apply_keyset(RecordingQuery(), 'name', False, {"limit": 20, "cursor": None})
+    assert query.calls == [
+        ('order', ('name',), {"desc": False}),
+        ('order', ('id',), {"desc": False}),
+        ('range', (0, 20), {}),
+    ]
+
+
+def test_apply_keyset_ascending_filters_after_cursor():
+    page = {"limit": 10, "cursor": {"name": 'Ana', "id": 5}}
+    query = apply_keyset(RecordingQuery(), 'name', False, page)
+    assert query.calls[0] == ('or_', ('name.gt."Ana",and(name.eq."Ana",id.gt.5)',), {})
+    assert query.calls[-1] == ('range', (0, 10), {})
+
+
+def test_apply_keyset_descending_quotes_values():
+    page = {"limit": 10, "cursor": {"appointment_time": '2026-03-01T09:30:00+00:00', "id": 9}}
+    query = apply_keyset(RecordingQuery(), 'appointment_time', True, page)
+    assert query.calls[0][1][0] == (
+        'appointment_time.lt."2026-03-01T09:30:00+00:00",'
+        'and(appointment_time.eq."2026-03-01T09:30:00+00:00",id.lt.9)'
+    )
+    assert ('order', ('appointment_time',), {"desc": True}) in query.calls
+
+    page = {"limit": 10, "cursor": {"name": 'Ana "A", B\\C', "id": 3}}
+    query = apply_keyset(RecordingQuery(), 'name', False, page)
+    assert query.calls[0][1][0].startswith('name.gt."Ana \\"A\\", B\\\\C",')
+
+
+def test_build_page_cursor_continues_after_last_item():
+    rows = [{"id": i, "name": f'P{i}'} for i in range(1, 4)]
+    page = build_page(rows, 'name', {"limit": 2})
+    assert page["items"] == rows[:2] and page["has_more"] is True
+    assert decode_cursor(page["next_cursor"]) == {"name": 'P2', "id": 2}
+
+    last_page = build_page(rows[2:], 'name', {"limit": 2})
+    assert last_page["has_more"] is False and last_page["next_cursor"] is None
+
+
+def collect_pages(client, headers, query):
+    """Recorre todas las páginas siguiendo next_cursor; devuelve (páginas, filas)."""
+    pages, rows, after = [], [], None
+    while True:
+        params = {**query, **({"after": after} if after else {})}
+        response = client.get('/api/v1/appointments', query_string=params, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        pages.append(page)
+        rows.extend(page['items'])
+        after = page['next_cursor']
+        if not page['has_more']:
+            return pages, rows
+
+
+def test_keyset_pages_cover_the_list_once(api, auth_headers):
+    client = api.test_client()
+    total = len(api.fake.tables['appointments'])
+    pages, rows = collect_pages(client, auth_headers, {"limit": 7, "count": 'exact'})
+    assert pages[0]['total'] == total
+    assert all(len(page['items']) <= 7 for page in pages)
+    assert sorted(row['id'] for row in rows) == sorted(row['id'] for row in api.fake.tables['appointments'])
+    times = [row['appointment_time'] for row in rows]
+    assert times == sorted(times)
+
+
+def test_patient_name_sort_without_view_pages_by_offset(api, auth_headers):
+    """Sin la vista appointments_with_patient limit/after siguen aplicándose (no la tabla entera)."""
+    client = api.test_client()
+    response = client.get('/api/v1/appointments', query_string={"limit": 5, "sort_by": 'patient.name'}, headers=auth_headers)
+    first = response.get_json()
+    assert response.status_code == 200
+    assert len(first['items']) == 5 and first['has_more'] is True
+
+    pages, rows = collect_pages(client, auth_headers, {"limit": 5, "sort_by": 'patient.name'})
+    assert len(pages) > 1 and all(len(page['items']) <= 5 for page in pages)
+    assert len({row['id'] for row in rows}) == len(api.fake.tables['appointments'])
+    names = [row['patient']['name'] for row in rows]
+    assert names == sorted(names)
+
+
+def test_patient_name_sort_without_view_rejects_keyset_cursor(api, auth_headers):
+    cursor = encode_cursor({"appointment_time": '2026-03-02T08:00:00+00:00', "id": 3})
+    response = api.test_client().get('/api/v1/appointments', headers=auth_headers,
+                                     query_string={"limit": 5, "sort_by": 'patient.name', "after": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+# Búsqueda type-ahead de pacientes: RPC search_patients, alternativa ilike y caché
+
+import pytest
+
+from app.patients.search import normalize_query, escape_like
+
+EXTRA_PATIENTS = ['Xiomara Núñez', 'Ana Xiomara Ruiz', 'Cuarto 100% Libre']
+
+
+def test_normalize_query():
+    assert normalize_query('  José   ÁLVAREZ ') == 'jose alvarez'
+    assert normalize_query(None) == ''
+
+
+def test_escape_like():
+    assert escape_like('100%_a\\b') == '100\\%\\_a\\\\b'
+
+
+@pytest.fixture(params=['rpc', 'ilike'])
+def search_api(request, api):
+    fake = api.fake
+    for name in EXTRA_PATIENTS:
+        fake.tables['patients'].append({"id": fake.next_id('patients'), "name": name})
+    if request.param == 'ilike':
+        del fake.rpc_handlers['search_patients']
+    return api
+
+
+def search(client, headers, q, **params):
+    response = client.get('/api/v1/patients/search', headers=headers, query_string={"q": q, **params})
+    assert response.status_code == 200
+    return [row['name'] for row in response.get_json()]
+
+
+def test_prefix_matches_come_first(search_api, auth_headers):
+    assert search(search_api.test_client(), auth_headers, 'xio') == ['Xiomara Núñez', 'Ana Xiomara Ruiz']
+
+
+def test_rpc_ignores_accents(api, auth_headers):
+    api.fake.tables['patients'].append({"id": api.fake.next_id('patients'), "name": 'Xiomara Núñez'})
+    assert search(api.test_client(), auth_headers, 'NUNEZ') == ['Xiomara Núñez']
+
+
+def test_wildcards_are_literal(search_api, auth_headers):
+    client = search_api.test_client()
+    assert search(client, auth_headers, '0%') == ['Cuarto 100% Libre']
+    assert search(client, auth_headers, '%a') == []
+    assert search(client, auth_headers, 'a_') == []
+
+
+def test_limit_is_applied(search_api, auth_headers):
+    assert len(search(search_api.test_client(), auth_headers, 'ar', limit=3)) == 3
+
+
+def test_short_query_does_not_hit_supabase(api, auth_headers):
+    assert search(api.test_client(), auth_headers, 'a') == []
+    assert api.fake.calls['rpc:search_patients'] == 0
+    assert api.fake.calls['GET patients'] == 0
+
+
+@pytest.mark.parametrize('limit', ['0', '51', 'diez'])
+def test_invalid_limit(api, auth_headers, limit):
+    response = api.test_client().get('/api/v1/patients/search', headers=auth_headers,
+                                     query_string={"q": 'ana', "limit": limit})
+    assert response.status_code == 400
+
+
+def test_results_are_cached_until_a_patient_is_created(api, auth_headers):
+    client = api.test_client()
+    search(client, auth_headers, 'Xio')
+    search(client, auth_headers, 'Xio')
+    assert api.fake.calls['rpc:search_patients'] == 1
+
+    response = client.post('/api/v1/patients', headers=auth_headers, json={"name": 'Xiomara Pardo'})
+    assert response.status_code == 201
+    assert search(client, auth_headers, 'Xio') == ['Xiomara Pardo']
+    assert api.fake.calls['rpc:search_patients'] == 2
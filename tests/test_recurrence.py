@@ -0,0 +1,58 @@
+# Pacientes recurrentes en GET /appointments: un solo conteo en lote por página
+
+from collections import Counter
+
+import pytest
+
+from conftest import CLINIC_START
+
+
+@pytest.fixture(params=['rpc', 'select'])
+def recurrence_api(request, api):
+    """Con el RPC count_appointments_by_patient o con la consulta alternativa paginada."""
+    if request.param == 'select':
+        del api.fake.rpc_handlers['count_appointments_by_patient']
+    api.mode = request.param
+    return api
+
+
+def appointment_counts(fake):
+    return Counter(appointment['patient_id'] for appointment in fake.tables['appointments'])
+
+
+def get_day(client, headers):
+    response = client.get(f'/api/v1/appointments?date={CLINIC_START.isoformat()}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_recurring_flag_matches_appointment_counts(recurrence_api, auth_headers):
+    client = recurrence_api.test_client()
+    appointments = get_day(client, auth_headers)
+    counts = appointment_counts(recurrence_api.fake)
+
+    assert appointments
+    for appointment in appointments:
+        assert appointment['is_recurring_patient'] == (counts[appointment['patient']['id']] > 1)
+    # Una sola llamada para toda la página, no una por paciente
+    assert recurrence_api.fake.calls['rpc:count_appointments_by_patient'] == 1
+
+
+def test_missing_rpc_is_probed_once(recurrence_api, auth_headers):
+    client = recurrence_api.test_client()
+    get_day(client, auth_headers)
+    get_day(client, auth_headers)
+    expected = 2 if recurrence_api.mode == 'rpc' else 1
+    assert recurrence_api.fake.calls['rpc:count_appointments_by_patient'] == expected
+
+
+def test_select_fallback_reads_every_page(api, auth_headers, monkeypatch):
+    from app.appointments import recurrence
+    del api.fake.rpc_handlers['count_appointments_by_patient']
+    monkeypatch.setattr(recurrence, 'FALLBACK_PAGE_SIZE', 2)
+
+    appointments = get_day(api.test_client(), auth_headers)
+    counts = appointment_counts(api.fake)
+    assert any(counts[appointment['patient']['id']] > 2 for appointment in appointments)
+    for appointment in appointments:
+        assert appointment['is_recurring_patient'] == (counts[appointment['patient']['id']] > 1)
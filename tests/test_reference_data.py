@@ -0,0 +1,50 @@
+# Pruebas de la tabla de doctores en memoria y de su endpoint de invalidación
+
+import pytest
+
+METRICS_TOKEN = 'metrics-secret'
+
+
+@pytest.fixture
+def api_env():
+    return {"METRICS_TOKEN": METRICS_TOKEN}
+
+
+@pytest.fixture
+def api_client(api):
+    return api.test_client()
+
+
+def doctor_loads(api):
+    return api.fake.calls['GET doctors']
+
+
+def test_doctors_are_loaded_once_per_worker(api, api_client, auth_headers):
+    first = api_client.get('/api/v1/doctors', headers=auth_headers)
+    second = api_client.get('/api/v1/doctors', headers=auth_headers)
+    assert first.status_code == second.status_code == 200
+    assert [doctor["name"] for doctor in first.get_json()] == sorted(doctor["name"] for doctor in api.fake.tables['doctors'])
+    assert doctor_loads(api) == 1
+
+
+def test_invalidate_requires_metrics_token(api_client, auth_headers):
+    assert api_client.post('/api/v1/doctors/cache/invalidate').status_code == 401
+    # Un usuario de la clínica no puede vaciar las cachés del worker
+    assert api_client.post('/api/v1/doctors/cache/invalidate', headers=auth_headers).status_code == 401
+
+
+def test_invalidate_reloads_doctors(api, api_client, auth_headers):
+    api_client.get('/api/v1/doctors', headers=auth_headers)
+    api.fake.tables['doctors'][0]['name'] = 'Dra. Renombrada'
+
+    response = api_client.post('/api/v1/doctors/cache/invalidate', headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    assert response.status_code == 200
+    assert response.get_json()["invalidated"] == ['doctors']
+
+    names = [doctor["name"] for doctor in api_client.get('/api/v1/doctors', headers=auth_headers).get_json()]
+    assert 'Dra. Renombrada' in names
+    assert doctor_loads(api) == 2
+
+
+def test_invalidate_hidden_without_metrics_token(client):
+    assert client.post('/api/v1/doctors/cache/invalidate').status_code == 404
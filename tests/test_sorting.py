@@ -0,0 +1,50 @@
+# Orden por nombre de paciente en la base de datos (vista appointments_with_patient)
+
+import pytest
+
+from test_pagination import collect_pages
+
+
+@pytest.fixture
+def view_api(api):
+    from benchmarks.rpc import VIEWS
+    api.fake.views.update(VIEWS)
+    return api
+
+
+def sort_key(fake, appointment):
+    patient = fake.get_row('patients', appointment['patient']['id']) if appointment['patient'] else None
+    return (patient['name'].lower() if patient else '', appointment['id'])
+
+
+@pytest.mark.parametrize('sort_dir', ['asc', 'desc'])
+def test_patient_name_sort_uses_view(view_api, auth_headers, sort_dir):
+    response = view_api.test_client().get('/api/v1/appointments', headers=auth_headers,
+                                          query_string={"sort_by": 'patient.name', "sort_dir": sort_dir})
+    assert response.status_code == 200
+    rows = response.get_json()
+
+    keys = [sort_key(view_api.fake, row) for row in rows]
+    assert keys == sorted(keys, reverse=(sort_dir == 'desc'))
+    assert len(rows) == len(view_api.fake.tables['appointments'])
+    # La clave de orden es interna de la vista
+    assert all('patient_sort_name' not in row for row in rows)
+    # Comprobación de la vista y la propia lista
+    assert view_api.fake.calls['GET appointments_with_patient'] == 2
+
+
+def test_patient_name_keyset_pages_over_view(view_api, auth_headers):
+    client = view_api.test_client()
+    pages, rows = collect_pages(client, auth_headers, {"limit": 7, "sort_by": 'patient.name'})
+    assert len(pages) > 1
+    keys = [sort_key(view_api.fake, row) for row in rows]
+    assert keys == sorted(keys)
+    assert sorted(row['id'] for row in rows) == sorted(row['id'] for row in view_api.fake.tables['appointments'])
+
+
+def test_missing_view_is_probed_once(api, auth_headers):
+    client = api.test_client()
+    for _ in range(2):
+        response = client.get('/api/v1/appointments', headers=auth_headers, query_string={"sort_by": 'patient.name'})
+        assert response.status_code == 200
+    assert api.fake.calls['GET appointments_with_patient'] == 1
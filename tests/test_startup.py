@@ -0,0 +1,42 @@
+# Arranque: importar la app no lee el entorno ni carga supabase-py
+
+import os
+import subprocess
+import sys
+import pytest
+from conftest import ROOT, TEST_ENV
+
+# Proceso nuevo: en este, otras pruebas pueden haber importado ya supabase
+PROBE = """
+import sys
+from app import create_app
+app = create_app()
+status = app.test_client().get('/api/v1/health').status_code
+print(status, 'supabase' in sys.modules)
+"""
+
+
+def test_health_does_not_load_supabase():
+    env = {**os.environ, **TEST_ENV}
+    completed = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                               capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split() == ['200', 'False']
+
+
+def test_config_is_read_in_create_app(monkeypatch):
+    import app.config # importar el módulo no fija valores
+    monkeypatch.setenv('COMPRESSION_MIN_SIZE', '4096')
+    for key, value in TEST_ENV.items():
+        monkeypatch.setenv(key, value)
+    from app import create_app
+    assert create_app().config['COMPRESSION_MIN_SIZE'] == 4096
+
+
+def test_create_app_requires_supabase_settings(monkeypatch):
+    from app import create_app
+    # Vacía y no ausente: load_dotenv no pisa variables ya definidas (el repo trae un .env)
+    monkeypatch.setenv('SUPABASE_URL', '')
+    monkeypatch.setenv('SUPABASE_KEY', TEST_ENV['SUPABASE_KEY'])
+    with pytest.raises(ValueError):
+        create_app()
@@ -0,0 +1,86 @@
+# Pruebas del stream SSE de citas: tickets de un solo uso y cupo de streams por worker
+
+import pytest
+
+from app.utils.stream_tickets import issue_stream_ticket
+from app.utils.jwt_auth import TokenUser
+
+
+@pytest.fixture
+def api_env():
+    return {"EVENTS_MAX_STREAMS": '2', "EVENTS_HEARTBEAT": '0.05'}
+
+
+@pytest.fixture
+def client(api):
+    return api.test_client()
+
+
+def get_ticket(client, headers):
+    response = client.post('/api/v1/appointments/stream/ticket', headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['ticket']
+
+
+def open_stream(client, ticket):
+    """Abre el stream y lee el primer mensaje; la respuesta queda abierta."""
+    response = client.get(f'/api/v1/appointments/stream?ticket={ticket}', buffered=False)
+    if response.status_code == 200:
+        response.first_chunk = next(response.response)
+    return response
+
+
+def test_ticket_requires_bearer_token(client):
+    assert client.post('/api/v1/appointments/stream/ticket').status_code == 401
+
+
+def test_stream_opens_with_ticket(client, auth_headers):
+    response = open_stream(client, get_ticket(client, auth_headers))
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert b'event: ready' in response.first_chunk
+    response.close()
+
+
+def test_ticket_is_single_use(client, auth_headers):
+    ticket = get_ticket(client, auth_headers)
+    open_stream(client, ticket).close()
+    assert open_stream(client, ticket).status_code == 401
+
+
+def test_stream_rejects_access_token_in_query(client, auth_headers):
+    token = auth_headers['Authorization'].split(' ')[1]
+    response = client.get(f'/api/v1/appointments/stream?access_token={token}')
+    assert response.status_code == 401
+
+
+def test_stream_rejects_tampered_and_expired_tickets(api, client, auth_headers):
+    ticket = get_ticket(client, auth_headers)
+    payload, signature = ticket.split('.')
+    assert open_stream(client, f"{payload}.{signature[::-1]}").status_code == 401
+
+    expired = issue_stream_ticket(TokenUser({'sub': 'user-1'}), 'token-key', api.config['SECRET_KEY'], ttl=-1)
+    assert open_stream(client, expired).status_code == 401
+
+
+def test_logout_revokes_pending_tickets(client, auth_headers):
+    ticket = get_ticket(client, auth_headers)
+    assert client.post('/api/v1/auth/logout', headers=auth_headers).status_code == 200
+    assert open_stream(client, ticket).status_code == 401
+
+
+def test_stream_limit_per_worker(client, auth_headers):
+    first = open_stream(client, get_ticket(client, auth_headers))
+    second = open_stream(client, get_ticket(client, auth_headers))
+    assert first.status_code == second.status_code == 200
+
+    rejected = open_stream(client, get_ticket(client, auth_headers))
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After']
+
+    # Al cerrar un stream se libera su hueco (en orden inverso: comparten hilo en la prueba)
+    second.close()
+    third = open_stream(client, get_ticket(client, auth_headers))
+    assert third.status_code == 200
+    third.close()
+    first.close()
@@ -0,0 +1,61 @@
+# Pruebas de token_required contra el Supabase falso: caché de tokens, logout y /auth/cache-stats
+
+import pytest
+
+METRICS_TOKEN = 'metrics-secret'
+
+
+@pytest.fixture
+def api_env():
+    return {"METRICS_TOKEN": METRICS_TOKEN}
+
+
+@pytest.fixture
+def api_client(api):
+    return api.test_client()
+
+
+def remote_checks(api):
+    return api.fake.calls['auth:GET user']
+
+
+def test_missing_or_malformed_token(api_client):
+    assert api_client.get('/api/v1/auth/me').status_code == 401
+    assert api_client.get('/api/v1/auth/me', headers={"Authorization": "Bearer"}).status_code == 401
+
+
+def test_invalid_token_is_rejected(api_client):
+    response = api_client.get('/api/v1/auth/me', headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
+
+
+def test_token_is_validated_once(api, api_client, auth_headers):
+    for _ in range(3):
+        assert api_client.get('/api/v1/auth/me', headers=auth_headers).status_code == 200
+    assert remote_checks(api) == 1
+
+
+def test_logout_revokes_cached_token(api, api_client, auth_headers):
+    assert api_client.get('/api/v1/auth/me', headers=auth_headers).status_code == 200
+    assert api_client.post('/api/v1/auth/logout', headers=auth_headers).status_code == 200
+
+    assert api_client.get('/api/v1/auth/me', headers=auth_headers).status_code == 401
+    # El rechazo sale de la lista de revocados, sin volver a preguntar a Supabase
+    assert remote_checks(api) == 1
+
+
+def test_cache_stats_requires_metrics_token(api_client, auth_headers):
+    assert api_client.get('/api/v1/auth/cache-stats').status_code == 401
+    # Un token de usuario no basta
+    assert api_client.get('/api/v1/auth/cache-stats', headers=auth_headers).status_code == 401
+
+    api_client.get('/api/v1/auth/me', headers=auth_headers)
+    response = api_client.get('/api/v1/auth/cache-stats', headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["enabled"] is True
+    assert body["misses"] == 1
+
+
+def test_cache_stats_hidden_without_metrics_token(client):
+    assert client.get('/api/v1/auth/cache-stats').status_code == 404
@@ -0,0 +1,99 @@
+# Instrumentación por petición: Server-Timing, resumen en el log y /api/v1/metrics
+
+import pytest
+
+from app import extensions
+from app.utils.metrics import Histogram
+from app.utils.tracing import RequestTrace, operation_name, server_timing_header
+
+METRICS_TOKEN = 'metrics-secret'
+
+
+def test_operation_name():
+    assert operation_name('GET', '/rest/v1/appointments') == 'GET appointments'
+    assert operation_name('POST', '/rest/v1/rpc/update_appointment') == 'rpc:update_appointment'
+    assert operation_name('GET', '/auth/v1/user') == 'auth:GET user'
+
+
+def test_server_timing_header_lists_slowest_operations():
+    trace = RequestTrace()
+    trace.record('GET appointments', 0.030, False)
+    trace.record('GET appointments', 0.010, False)
+    trace.record('auth:GET user', 0.005, False)
+    header = server_timing_header(trace, 0.100)
+    assert header.startswith('total;dur=100.0, supabase;desc="3 llamadas";dur=45.0, app;dur=55.0')
+    assert 'sb0;desc="GET appointments x2";dur=40.0' in header
+    assert 'sb1;desc="auth:GET user x1";dur=5.0' in header
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('demo_seconds', 'Demo', ('op',), buckets=(0.1, 1.0))
+    histogram.observe(('a',), 0.05)
+    histogram.observe(('a',), 0.5)
+    histogram.observe(('a',), 5)
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{op="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{op="a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{op="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{op="a"} 3' in lines
+
+
+@pytest.fixture
+def api_env():
+    return {"METRICS_ENABLED": 'true', "METRICS_TOKEN": METRICS_TOKEN, "LOG_LEVEL": 'INFO'}
+
+
+def test_server_timing_counts_supabase_calls(api, auth_headers):
+    headers = {**auth_headers, "Origin": 'http://localhost:5173'}
+    response = api.test_client().get('/api/v1/patients', headers=headers)
+    assert response.status_code == 200
+    calls = sum(api.fake.calls.values())
+    assert f'supabase;desc="{calls} llamadas"' in response.headers['Server-Timing']
+    # El navegador solo deja leer Server-Timing si CORS la expone
+    assert 'Server-Timing' in response.headers['Access-Control-Expose-Headers']
+
+
+def test_request_summary_is_logged(api, auth_headers, caplog):
+    api.logger.addHandler(caplog.handler) # app.logger no propaga al logger raíz
+    try:
+        api.test_client().get('/api/v1/patients', headers=auth_headers)
+    finally:
+        api.logger.removeHandler(caplog.handler)
+    summary = next(record.request_summary for record in caplog.records if hasattr(record, 'request_summary'))
+    assert summary["endpoint"] == '/api/v1/patients'
+    assert summary["status"] == 200
+    assert summary["supabase_calls"] == sum(op["calls"] for op in summary["operations"].values())
+    assert summary["operations"]["auth:GET user"]["calls"] == 1
+
+
+def test_metrics_require_the_token(api, auth_headers):
+    client = api.test_client()
+    client.get('/api/v1/patients', headers=auth_headers)
+    assert client.get('/api/v1/metrics').status_code == 401
+    assert client.get('/api/v1/metrics', headers=auth_headers).status_code == 401
+
+    response = client.get('/api/v1/metrics', headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/api/v1/patients",status="200"} 1' in body
+    assert 'supabase_request_duration_seconds_count{operation="auth:GET user"' in body
+
+
+def test_pool_stats_require_the_token(api):
+    client = api.test_client()
+    assert client.get('/api/v1/health/pool').status_code == 401
+    response = client.get('/api/v1/health/pool', headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    assert response.status_code == 200
+    assert 'enabled' in response.get_json()
+
+
+def test_metrics_disabled_returns_404(monkeypatch, app):
+    monkeypatch.setattr(extensions, 'request_metrics', None)
+    assert app.test_client().get('/api/v1/metrics').status_code == 404
+
+
+def test_server_timing_can_be_disabled(app):
+    app.config['SERVER_TIMING_ENABLED'] = False
+    assert 'Server-Timing' not in app.test_client().get('/api/v1/health').headers
@@ -0,0 +1,9 @@
+# Punto de entrada WSGI para producción
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# run.py queda para desarrollo (servidor de Flask).
+
+from app import create_app
+
+app = create_app()